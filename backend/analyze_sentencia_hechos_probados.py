@@ -42,52 +42,17 @@ async def analyze_sentencia_hechos_probados(pdf_path: str):
     
     segments = await nlp_service.segment_document(extracted_text, doc_type)
     print(f"   [OK] Segmentos encontrados:")
-    for section, content in segments.items():
-        if content:
-            print(f"      - {section}: {len(content)} caracteres")
+    for section in segments:
+        print(f"      - {section.name}: {section.end - section.start} caracteres "
+              f"(posición {section.start}, página {section.page})")
     print()
     
-    # Extraer hechos probados específicamente
+    # Extraer hechos probados específicamente (desde el índice de secciones)
     print("3. EXTRAYENDO HECHOS PROBADOS...")
     print("-" * 80)
     print()
     
-    hechos_probados = segments.get("antecedentes", "")
-    
-    # Si la sección antecedentes es muy corta, buscar en fundamentos o en todo el documento
-    if len(hechos_probados) < 500:
-        print(f"   [INFO] Sección 'antecedentes' muy corta ({len(hechos_probados)} chars)")
-        print("   Buscando 'hechos probados' en fundamentos y todo el documento...")
-        
-        # Buscar en fundamentos
-        fundamentos = segments.get("fundamentos", "")
-        if fundamentos:
-            # Buscar sección de hechos probados dentro de fundamentos
-            match = re.search(
-                r'(?i)(hechos probados|hecho probado|resulta probado|se declara probado)[\s\S]{0,3000}',
-                fundamentos
-            )
-            if match:
-                hechos_probados = match.group(0)
-                print(f"   [OK] Encontrado en fundamentos: {len(hechos_probados)} caracteres")
-        
-        # Si aún no se encuentra, buscar en todo el documento
-        if len(hechos_probados) < 500:
-            # Buscar patrones de hechos probados
-            patterns = [
-                r'(?i)(hechos probados|hecho probado)[\s\S]{0,5000}',
-                r'(?i)(resulta probado|se declara probado|se tiene por probado)[\s\S]{0,5000}',
-                r'(?i)(flexi[óo]n\s*(?:activa)?\s*(?:de|a|del)?\s*\d+[°º]|abducci[óo]n\s*(?:activa)?\s*(?:de|a|del)?\s*\d+[°º])[\s\S]{0,2000}',
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, extracted_text)
-                if match:
-                    context_start = max(0, match.start() - 500)
-                    context_end = min(len(extracted_text), match.end() + 2000)
-                    hechos_probados = extracted_text[context_start:context_end]
-                    print(f"   [OK] Encontrado con patrón alternativo: {len(hechos_probados)} caracteres")
-                    break
+    hechos_probados = segments.get("hechos_probados", "")
     
     if not hechos_probados or len(hechos_probados) < 100:
         print("   [ADVERTENCIA] No se encontró sección explícita de 'hechos probados'")
@@ -102,12 +67,12 @@ async def analyze_sentencia_hechos_probados(pdf_path: str):
             print(f"\n... (total: {len(hechos_probados)} caracteres)")
         print()
     
-    # Extraer entidades de hechos probados
+    # Extraer entidades (las métricas de hechos probados se marcan con el índice de secciones)
     print("4. EXTRAYENDO ENTIDADES DE HECHOS PROBADOS...")
     print("-" * 80)
     print()
     
-    entities = await nlp_service.extract_entities(hechos_probados, doc_type, segments)
+    entities = await nlp_service.extract_entities(extracted_text, doc_type, segments)
     
     # Mostrar métricas de hechos probados
     print("MÉTRICAS FUNCIONALES EN HECHOS PROBADOS:")
@@ -127,7 +92,10 @@ async def analyze_sentencia_hechos_probados(pdf_path: str):
     
     # Mostrar diagnósticos de hechos probados
     print("DIAGNÓSTICOS EN HECHOS PROBADOS:")
-    diagnoses = entities.get("DIAGNOSIS", [])
+    diagnoses = [
+        d for d in entities.get("DIAGNOSIS", [])
+        if segments.in_section("hechos_probados", d.get("start", -1))
+    ] or entities.get("DIAGNOSIS", [])
     print(f"   Diagnósticos encontrados: {len(diagnoses)}")
     for i, diag in enumerate(diagnoses[:10], 1):
         print(f"   {i}. {diag.get('text', '')[:100]}")
@@ -139,7 +107,7 @@ async def analyze_sentencia_hechos_probados(pdf_path: str):
     print()
     
     legal_engine = LegalEngine()
-    analysis = await legal_engine.analyze(entities, doc_type, segments)
+    analysis = await legal_engine.analyze(entities, doc_type)
     
     # Mostrar método de valoración usado
     valuation_method = analysis.get("valuation_method", "")
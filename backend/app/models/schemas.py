@@ -92,3 +92,16 @@ class ClassificationResponse(BaseModel):
     class Config:
         populate_by_name = True
 
+
+
+class WhatIfDeficiency(BaseModel):
+    """Deficiencia valorada (p. ej. un elemento de legal_analysis.chapter_valuations)"""
+    diagnosis: Optional[str] = None
+    chapter: Optional[str] = None
+    percentage: float = Field(ge=0, le=100, allow_inf_nan=False)
+
+
+class WhatIfRequest(BaseModel):
+    """Request para simular la valoración al quitar o añadir deficiencias"""
+    chapter_valuations: List[WhatIfDeficiency] = []
+    candidates: List[WhatIfDeficiency] = []
@@ -0,0 +1,227 @@
+"""
+Caché de análisis legales direccionada por las entidades del documento.
+La clave es el SHA-256 de una representación canónica de los diagnósticos y métricas
+(solo los campos que lee el motor legal), el tipo de documento, la huella de las tablas
+del baremo y la versión del motor, de modo que volver a analizar el mismo conjunto de
+entidades devuelve el análisis sin repetir deduplicación, agrupación ni clasificación.
+Se guarda en memoria (LRU por número de entradas, serializado con pickle para que cada
+acierto devuelva una copia independiente) y, opcionalmente, en SQLite como JSON (LRU por
+tamaño total) para conservarlo entre reinicios.
+"""
+import hashlib
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+# Campos de cada tipo de entidad que determinan el análisis
+FINGERPRINT_FIELDS: Mapping[str, Sequence[str]] = {
+    "DIAGNOSIS": ("text", "start", "end", "source"),
+    "METRIC": ("type", "value", "side", "body_part"),
+}
+
+
+def analysis_key(entities: Dict[str, List[Dict]], doc_type: Optional[str], rules_version: str,
+                 engine_version: str) -> str:
+    """Clave de caché: SHA-256 de las entidades (en orden) + tipo de documento + versiones"""
+    canonical = {
+        entity_type: [[entity.get(field) for field in fields] for entity in entities.get(entity_type, [])]
+        for entity_type, fields in FINGERPRINT_FIELDS.items()
+    }
+    payload = json.dumps([canonical, doc_type], ensure_ascii=False, sort_keys=True,
+                         separators=(",", ":"), default=str)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"{digest}:{rules_version}:{engine_version}"
+
+
+class AnalysisCache:
+    """
+    Caché de análisis en dos niveles: memoria (LRU) y, si se indica `disk_path`, SQLite
+
+    Args:
+        max_entries: Análisis guardados en memoria (0 = caché desactivada)
+        disk_path: Fichero SQLite del nivel persistente (None = solo memoria)
+        disk_max_bytes: Tamaño máximo del nivel persistente (expulsión LRU)
+    """
+
+    def __init__(self, max_entries: int = 512, disk_path: Optional[str] = None,
+                 disk_max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.disk_max_bytes = disk_max_bytes
+        self._lock = threading.Lock()
+        # Clave -> análisis serializado (cada acierto devuelve una copia independiente)
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._conn = None
+        if disk_path and max_entries > 0:
+            self._conn = sqlite3.connect(disk_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    key TEXT PRIMARY KEY,
+                    analysis TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analysis_cache_access ON analysis_cache (last_access)"
+            )
+            self._conn.commit()
+        # Métricas
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._disk_evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Devuelve una copia del análisis si la clave está en caché (un acierto en disco pasa a memoria)"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            serialized = self._memory.get(key)
+            if serialized is not None:
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+        if serialized is not None:
+            return pickle.loads(serialized)
+        with self._lock:
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT analysis FROM analysis_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE analysis_cache SET last_access = ? WHERE key = ?", (time.time(), key)
+                    )
+                    self._conn.commit()
+                    self._disk_hits += 1
+                    analysis = json.loads(row[0])
+                    self._remember(key, pickle.dumps(analysis, protocol=pickle.HIGHEST_PROTOCOL))
+                    return analysis
+            self._misses += 1
+            return None
+
+    def put(self, key: str, analysis: Dict[str, Any]):
+        """Guarda un análisis (los que no se pueden serializar no se cachean)"""
+        if not self.enabled:
+            return
+        try:
+            serialized = pickle.dumps(analysis, protocol=pickle.HIGHEST_PROTOCOL)
+            analysis_json = json.dumps(analysis, ensure_ascii=False) if self._conn is not None else None
+        except (TypeError, ValueError, pickle.PicklingError):
+            return
+        with self._lock:
+            self._remember(key, serialized)
+            if self._conn is not None:
+                size = len(analysis_json.encode("utf-8"))
+                if size > self.disk_max_bytes:
+                    return
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, analysis, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, analysis_json, size, time.time()),
+                )
+                self._evict_disk()
+                self._conn.commit()
+
+    def _remember(self, key: str, serialized: bytes):
+        """Guarda en memoria y expulsa las entradas menos usadas si se supera el máximo"""
+        self._memory[key] = serialized
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._evictions += 1
+
+    def _evict_disk(self):
+        """Expulsa del disco las entradas con acceso más antiguo hasta quedar por debajo del tamaño máximo"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM analysis_cache").fetchone()[0]
+        if total <= self.disk_max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM analysis_cache ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.disk_max_bytes:
+                break
+            self._conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+            total -= size
+            self._disk_evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM analysis_cache")
+                self._conn.commit()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métricas de la caché: aciertos por nivel, fallos, entradas y expulsiones"""
+        with self._lock:
+            hits = self._memory_hits + self._disk_hits
+            lookups = hits + self._misses
+            metrics = {
+                "enabled": self.enabled,
+                "hits": hits,
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_hit_rate": round(self._memory_hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "evictions": self._evictions,
+                "disk": None,
+            }
+            if self._conn is not None:
+                entries, size = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis_cache"
+                ).fetchone()
+                metrics["disk"] = {
+                    "path": self.disk_path,
+                    "entries": entries,
+                    "size_bytes": size,
+                    "max_bytes": self.disk_max_bytes,
+                    "evictions": self._disk_evictions,
+                }
+            return metrics
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_cache: Optional[AnalysisCache] = None
+_cache_lock = threading.Lock()
+
+
+def configure_analysis_cache(max_entries: int = 512, disk_path: Optional[str] = None,
+                             disk_max_bytes: int = 64 * 1024 * 1024) -> AnalysisCache:
+    """Crea (o sustituye) la caché de análisis del proceso"""
+    global _cache
+    cache = AnalysisCache(max_entries, disk_path=disk_path, disk_max_bytes=disk_max_bytes)
+    with _cache_lock:
+        previous, _cache = _cache, cache
+    if previous is not None:
+        previous.close()
+    return cache
+
+
+def analysis_cache() -> AnalysisCache:
+    """Caché de análisis del proceso (solo en memoria, con el tamaño por defecto, si no se ha configurado)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnalysisCache()
+    return _cache
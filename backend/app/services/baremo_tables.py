@@ -0,0 +1,357 @@
+"""
+Tablas del baremo del RD 888/2022 (capítulos, clases y VIA, umbrales de movilidad,
+grupos jerárquicos, reglas de clasificación y sinónimos médicos) cargadas desde un fichero de datos versionado.
+El fichero se lee, valida y compila una sola vez por proceso en estructuras inmutables
+que comparten todas las instancias de LegalEngine; si cambia en disco se recarga sin
+reiniciar el servidor (si la nueva versión no es válida se conservan las tablas anteriores).
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from app.services.chapter_matcher import ChapterMatcher
+from app.services.classification_rules import RULE_FLAGS, RULE_SCOPES, ClassificationRules
+from app.services.combined_valuation import ClassRanges
+from app.services.normalized_text import fold_text
+from app.services.pathology_groups import PathologyGroupIndex
+from app.services.rom_index import MAX_ROM_DEGREES, ROM_METRIC_TYPES, SEVERITY_CLASSES, RomIntervalIndex
+
+DEFAULT_BAREMO_PATH = Path(__file__).resolve().parent.parent / "data" / "baremo_rd888.json"
+
+SEVERITY_LEVELS = tuple(SEVERITY_CLASSES)
+
+
+class BaremoTablesError(ValueError):
+    """Fichero de tablas del baremo ausente, mal formado o con valores incoherentes"""
+
+
+def _freeze(value: Any) -> Any:
+    """Convierte diccionarios y listas anidados en MappingProxyType y tuplas"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _require(condition: bool, message: str):
+    if not condition:
+        raise BaremoTablesError(message)
+
+
+def _is_string_list(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) and item for item in value)
+
+
+def _is_range(value: Any) -> bool:
+    return (
+        isinstance(value, list) and len(value) == 2
+        and all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in value)
+        and value[0] <= value[1]
+    )
+
+
+def validate_baremo_data(data: Any):
+    """Comprueba la estructura y coherencia del contenido del fichero (BaremoTablesError si no es válido)"""
+    _require(isinstance(data, dict), "El fichero del baremo debe contener un objeto JSON")
+    _require(isinstance(data.get("version"), str) and data["version"], "Falta la versión de las tablas ('version')")
+
+    system_patterns = data.get("system_patterns")
+    _require(isinstance(system_patterns, dict) and system_patterns, "'system_patterns' debe ser un objeto no vacío")
+    for chapter, system_data in system_patterns.items():
+        _require(isinstance(system_data, dict), f"Capítulo {chapter}: debe ser un objeto")
+        for field in ("keywords", "patterns"):
+            _require(_is_string_list(system_data.get(field, [])),
+                     f"Capítulo {chapter}: '{field}' debe ser una lista de cadenas no vacías")
+        for pattern in system_data.get("patterns", []):
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise BaremoTablesError(f"Capítulo {chapter}: patrón no válido {pattern!r}: {e}")
+
+    chapter_priority = data.get("chapter_priority")
+    _require(_is_string_list(chapter_priority), "'chapter_priority' debe ser una lista de capítulos")
+    for chapter in chapter_priority:
+        _require(chapter in system_patterns, f"'chapter_priority': el capítulo {chapter} no está en 'system_patterns'")
+    for field in ("musculoskeletal_terms", "general_terms"):
+        _require(_is_string_list(data.get(field)), f"'{field}' debe ser una lista de cadenas no vacías")
+
+    classes_via = data.get("classes_via")
+    _require(isinstance(classes_via, dict) and "1" in classes_via, "'classes_via' debe definir al menos la clase 1")
+    for class_num, class_data in classes_via.items():
+        _require(isinstance(class_data, dict) and _is_range(class_data.get("range")),
+                 f"Clase {class_num}: 'range' debe ser [mínimo, máximo]")
+        via = class_data.get("via")
+        _require(isinstance(via, (int, float)) and class_data["range"][0] <= via <= class_data["range"][1],
+                 f"Clase {class_num}: 'via' debe estar dentro de su rango")
+        _require(isinstance(class_data.get("description"), str), f"Clase {class_num}: falta 'description'")
+    # La clase de un porcentaje se busca por bisección: los rangos no pueden solaparse
+    ordered_ranges = sorted((class_data["range"], class_num) for class_num, class_data in classes_via.items())
+    for (previous, previous_class), (current, current_class) in zip(ordered_ranges, ordered_ranges[1:]):
+        _require(previous[1] < current[0], f"Clases {previous_class} y {current_class}: los rangos se solapan")
+
+    rom_thresholds = data.get("rom_thresholds")
+    _require(isinstance(rom_thresholds, dict), "'rom_thresholds' debe ser un objeto")
+    for joint, movements in rom_thresholds.items():
+        _require(isinstance(movements, dict) and movements, f"Umbrales de {joint}: sin movimientos")
+        joint_metrics = set()
+        for movement, spec in movements.items():
+            where = f"Umbrales de {joint}/{movement}"
+            _require(isinstance(spec, dict), f"{where}: debe ser un objeto con 'metrics' y 'levels'")
+            metrics = spec.get("metrics")
+            _require(_is_string_list(metrics) and metrics, f"{where}: 'metrics' debe ser una lista de cadenas")
+            unknown = set(metrics) - set(ROM_METRIC_TYPES)
+            _require(not unknown, f"{where}: métricas desconocidas {sorted(unknown)}")
+            # Cada métrica se clasifica con un solo movimiento de la articulación
+            _require(not joint_metrics & set(metrics), f"{where}: métrica ya usada en otro movimiento de {joint}")
+            joint_metrics.update(metrics)
+            levels = spec.get("levels")
+            _require(isinstance(levels, dict) and set(levels) == set(SEVERITY_LEVELS),
+                     f"{where}: se esperan los niveles {', '.join(SEVERITY_LEVELS)}")
+            for level, level_range in levels.items():
+                _require(_is_range(level_range) and 0 <= level_range[0] and level_range[1] <= MAX_ROM_DEGREES,
+                         f"{where}/{level}: rango no válido")
+            # La clase de un valor se busca por bisección: los rangos no pueden solaparse
+            ordered_levels = sorted((level_range, level) for level, level_range in levels.items())
+            for (previous, previous_level), (current, current_level) in zip(ordered_levels, ordered_levels[1:]):
+                _require(previous[1] < current[0], f"{where}: los rangos {previous_level} y {current_level} se solapan")
+
+    joint_aliases = data.get("rom_joint_aliases", {})
+    _require(isinstance(joint_aliases, dict), "'rom_joint_aliases' debe ser un objeto")
+    for body_part, joint in joint_aliases.items():
+        _require(joint in rom_thresholds, f"Alias de articulación {body_part!r}: {joint!r} no tiene umbrales")
+
+    hierarchical_groups = data.get("hierarchical_groups")
+    _require(isinstance(hierarchical_groups, list), "'hierarchical_groups' debe ser una lista")
+    for index, group in enumerate(hierarchical_groups):
+        _require(isinstance(group, dict), f"Grupo jerárquico {index}: debe ser un objeto")
+        for field in ("name", "chapter", "body_part"):
+            _require(isinstance(group.get(field), str) and group[field], f"Grupo jerárquico {index}: falta '{field}'")
+        for field in ("primary_keywords", "secondary_keywords"):
+            _require(_is_string_list(group.get(field)), f"Grupo jerárquico {index}: '{field}' debe ser una lista de cadenas")
+
+    _validate_classification_rules(data.get("classification_rules"), classes_via)
+
+    medical_synonyms = data.get("medical_synonyms")
+    _require(isinstance(medical_synonyms, dict), "'medical_synonyms' debe ser un objeto")
+    for canonical, synonyms in medical_synonyms.items():
+        _require(_is_string_list(synonyms), f"Sinónimos de {canonical!r}: debe ser una lista de cadenas")
+
+
+def _validate_outcome(outcome: Any, classes_via: Dict, where: str, class_required: bool):
+    """Clase (del Anexo I) y confianza de una regla o de un valor por defecto"""
+    _require(isinstance(outcome, dict), f"{where}: debe ser un objeto")
+    class_num = outcome.get("class")
+    if class_required or class_num is not None:
+        _require(class_num in classes_via, f"{where}: la clase {class_num!r} no está en 'classes_via'")
+    for field in ("confidence", "grouped_confidence"):
+        value = outcome.get(field)
+        if value is None and field == "grouped_confidence":
+            continue
+        _require(isinstance(value, (int, float)) and not isinstance(value, bool) and 0 <= value <= 1,
+                 f"{where}: '{field}' debe ser un número entre 0 y 1")
+
+
+def _validate_classification_rules(rules: Any, classes_via: Dict):
+    _require(isinstance(rules, dict), "'classification_rules' debe ser un objeto")
+    _validate_outcome(rules.get("default"), classes_via, "Reglas de clasificación: 'default'", True)
+    _require(isinstance(rules.get("chapters", []), list), "'classification_rules.chapters' debe ser una lista")
+    seen_chapters = set()
+    for index, entry in enumerate(rules.get("chapters", [])):
+        where = f"Reglas de clasificación {index}"
+        _require(isinstance(entry, dict) and _is_string_list(entry.get("chapters")), f"{where}: falta 'chapters'")
+        for chapter in entry["chapters"]:
+            _require(chapter not in seen_chapters, f"{where}: el capítulo {chapter} ya tiene reglas")
+            seen_chapters.add(chapter)
+        if "default" in entry:
+            _validate_outcome(entry["default"], classes_via, f"{where}: 'default'", True)
+        _require(isinstance(entry.get("rules", []), list), f"{where}: 'rules' debe ser una lista")
+        for rule_index, rule in enumerate(entry.get("rules", [])):
+            rule_where = f"{where}, regla {rule_index}"
+            _validate_outcome(rule, classes_via, rule_where, False)
+            for field in ("any", "unless"):
+                _require(_is_string_list(rule.get(field, [])), f"{rule_where}: '{field}' debe ser una lista de cadenas")
+            _require(rule.get("requires") in (None, *RULE_FLAGS), f"{rule_where}: 'requires' debe ser uno de {RULE_FLAGS}")
+            _require(rule.get("scope", "diagnosis") in RULE_SCOPES, f"{rule_where}: 'scope' debe ser uno de {RULE_SCOPES}")
+
+
+class BaremoTables:
+    """
+    Tablas del baremo compiladas e inmutables (se comparten entre instancias y peticiones)
+
+    Attributes:
+        version: Versión declarada en el fichero
+        fingerprint: Versión + SHA-256 del contenido (cambia aunque se edite el fichero sin cambiar la versión)
+        system_patterns: Capítulo -> {"name", "keywords", "patterns"}
+        chapter_priority: Capítulos en el orden en que se prueban
+        classes_via: Clase -> {"range": (min, max), "via", "description"} (Anexo I)
+        rom_thresholds: Articulación -> movimiento -> {"metrics", "levels": nivel -> (min, max)}
+        rom_joint_aliases: Parte del cuerpo -> articulación de rom_thresholds
+        hierarchical_groups: Grupos de patologías relacionadas (principal y consecuencias)
+        medical_synonyms: Término canónico -> sinónimos
+        synonym_canonical: Palabra sin tildes -> término canónico (el primer grupo que la contiene)
+        chapter_matcher: Buscador compilado de capítulos
+        class_ranges: Rangos de clase ordenados (clase de un porcentaje por bisección)
+        rom_index: Umbrales de movilidad indexados por intervalos (bisección / searchsorted)
+        pathology_groups: Buscador compilado de las palabras clave de los grupos jerárquicos
+        classification_rules: Reglas de clase/confianza por capítulo, compiladas
+    """
+
+    def __init__(self, data: Dict[str, Any], source: Optional[Path] = None):
+        validate_baremo_data(data)
+        self.source = source
+        self.loaded_at = time.time()
+        self.version: str = data["version"]
+        digest = hashlib.sha256(json.dumps(data, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+        self.fingerprint = f"{self.version}:{digest[:16]}"
+        self.system_patterns: Mapping[str, Mapping[str, Any]] = _freeze(data["system_patterns"])
+        self.chapter_priority: Tuple[str, ...] = tuple(data["chapter_priority"])
+        self.musculoskeletal_terms: Tuple[str, ...] = tuple(data["musculoskeletal_terms"])
+        self.general_terms: Tuple[str, ...] = tuple(data["general_terms"])
+        self.classes_via: Mapping[str, Mapping[str, Any]] = _freeze(data["classes_via"])
+        self.rom_thresholds: Mapping[str, Mapping[str, Any]] = _freeze(data["rom_thresholds"])
+        self.rom_joint_aliases: Mapping[str, str] = _freeze(data.get("rom_joint_aliases", {}))
+        self.hierarchical_groups: Tuple[Mapping[str, Any], ...] = _freeze(data["hierarchical_groups"])
+        self.medical_synonyms: Mapping[str, Tuple[str, ...]] = _freeze(data["medical_synonyms"])
+        self.class_ranges = ClassRanges(self.classes_via)
+        self.rom_index = RomIntervalIndex(self.rom_thresholds, self.rom_joint_aliases)
+        self.pathology_groups = PathologyGroupIndex(self.hierarchical_groups)
+        self.classification_rules = ClassificationRules(data["classification_rules"])
+
+        synonym_canonical: Dict[str, str] = {}
+        for canonical, synonyms in self.medical_synonyms.items():
+            for word in (canonical, *synonyms):
+                synonym_canonical.setdefault(fold_text(word), canonical)
+        self.synonym_canonical: Mapping[str, str] = MappingProxyType(synonym_canonical)
+
+        self.chapter_matcher = ChapterMatcher(
+            tuple(
+                (chapter,
+                 tuple(self.system_patterns[chapter].get("patterns", ())),
+                 tuple(self.system_patterns[chapter].get("keywords", ())))
+                for chapter in self.chapter_priority
+            ),
+            (("8", self.musculoskeletal_terms), ("1", self.general_terms))
+        )
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "fingerprint": self.fingerprint,
+            "source": str(self.source) if self.source else None,
+            "loaded_at": self.loaded_at,
+            "chapter_cache": self.chapter_matcher.cache_info()._asdict(),
+        }
+
+
+def load_baremo_tables(path: Path) -> BaremoTables:
+    """Lee, valida y compila el fichero de tablas (BaremoTablesError si no es válido)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except OSError as e:
+        raise BaremoTablesError(f"No se pudo leer el fichero del baremo {path}: {e}")
+    except json.JSONDecodeError as e:
+        raise BaremoTablesError(f"El fichero del baremo {path} no es JSON válido: {e}")
+    return BaremoTables(data, source=Path(path))
+
+
+class BaremoTablesStore:
+    """
+    Tablas vigentes con recarga en caliente
+
+    Args:
+        path: Fichero de tablas
+        reload_interval: Segundos entre comprobaciones de cambios en el fichero (0 = sin recarga)
+    """
+
+    def __init__(self, path: Path = DEFAULT_BAREMO_PATH, reload_interval: float = 5.0):
+        self.path = Path(path)
+        self.reload_interval = reload_interval
+        self.reloads = 0
+        self.failed_reloads = 0
+        self._lock = threading.Lock()
+        self._signature = self._file_signature()
+        self._tables = load_baremo_tables(self.path)
+        self._checked_at = time.monotonic()
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def current(self) -> BaremoTables:
+        """Tablas vigentes; si ha pasado el intervalo comprueba si el fichero ha cambiado"""
+        if self.reload_interval > 0 and time.monotonic() - self._checked_at >= self.reload_interval:
+            with self._lock:
+                if time.monotonic() - self._checked_at >= self.reload_interval:
+                    self._checked_at = time.monotonic()
+                    signature = self._file_signature()
+                    if signature is not None and signature != self._signature:
+                        self._reload(signature)
+        return self._tables
+
+    def reload(self) -> BaremoTables:
+        """Recarga el fichero inmediatamente (BaremoTablesError si no es válido)"""
+        with self._lock:
+            signature = self._file_signature()
+            self._tables = load_baremo_tables(self.path)
+            self._signature = signature
+            self._checked_at = time.monotonic()
+            self.reloads += 1
+            return self._tables
+
+    def _reload(self, signature: Tuple[int, int]):
+        try:
+            tables = load_baremo_tables(self.path)
+        except BaremoTablesError as e:
+            # No reintentar hasta el siguiente cambio del fichero; se siguen usando las tablas anteriores
+            self._signature = signature
+            self.failed_reloads += 1
+            print(f"[WARNING] Tablas del baremo no recargadas, se mantiene la versión {self._tables.version}: {e}",
+                  file=sys.stderr)
+            return
+        self._tables = tables
+        self._signature = signature
+        self.reloads += 1
+        print(f"[INFO] Tablas del baremo recargadas: versión {tables.version}")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self._tables.metrics(), "reloads": self.reloads, "failed_reloads": self.failed_reloads}
+
+
+_store: Optional[BaremoTablesStore] = None
+_store_lock = threading.Lock()
+
+
+def configure_baremo_tables(path: Optional[Path] = None, reload_interval: float = 5.0) -> BaremoTablesStore:
+    """Carga (o sustituye) las tablas del proceso desde `path` (por defecto, las incluidas en app/data)"""
+    global _store
+    store = BaremoTablesStore(path or DEFAULT_BAREMO_PATH, reload_interval=reload_interval)
+    with _store_lock:
+        _store = store
+    return store
+
+
+def baremo_store() -> BaremoTablesStore:
+    """Almacén de tablas del proceso (se crea con la configuración por defecto la primera vez)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = BaremoTablesStore()
+    return _store
+
+
+def baremo_tables() -> BaremoTables:
+    """Tablas vigentes del baremo"""
+    return baremo_store().current()
@@ -0,0 +1,66 @@
+"""
+Asignación compilada de capítulos del RD 888/2022 a un diagnóstico.
+Los patrones y palabras clave de cada capítulo se combinan en una sola expresión regular
+(alternancia) al construir el buscador, de modo que cada capítulo cuesta una búsqueda en
+lugar de una por patrón y palabra clave; el orden de prioridad entre capítulos se
+mantiene. El resultado se memoriza por texto en minúsculas en una caché LRU acotada.
+"""
+import re
+from functools import lru_cache
+from typing import List, Optional, Pattern, Sequence, Tuple
+
+# Capítulo: (id, patrones regex, palabras clave de palabra completa)
+ChapterSpec = Tuple[str, Tuple[str, ...], Tuple[str, ...]]
+
+
+def _keywords_branch(keywords: Sequence[str]) -> str:
+    """Palabras clave de palabra completa, sensibles a mayúsculas (como KeywordScanner)"""
+    # Las más largas primero; el retroceso de la expresión prueba igualmente las demás
+    alternatives = sorted({keyword for keyword in keywords if keyword}, key=lambda kw: (-len(kw), kw))
+    return r"(?-i:\b(?:" + "|".join(re.escape(keyword) for keyword in alternatives) + r")\b)"
+
+
+def _compile_chapter(patterns: Sequence[str], keywords: Sequence[str]) -> Optional[Pattern]:
+    """Una alternancia con todos los patrones (sin distinguir mayúsculas) y palabras clave del capítulo"""
+    branches = ["(?:" + pattern + ")" for pattern in patterns]
+    if any(keywords):
+        branches.append(_keywords_branch(keywords))
+    return re.compile("|".join(branches), re.IGNORECASE) if branches else None
+
+
+class ChapterMatcher:
+    """
+    Buscador compilado de capítulos por orden de prioridad
+
+    Args:
+        chapters: Capítulos en orden de prioridad con sus patrones y palabras clave
+        fallbacks: Capítulos de último recurso (solo palabras clave), también por prioridad
+        default: Capítulo devuelto si no coincide ninguno
+        cache_size: Textos distintos memorizados
+    """
+
+    def __init__(self, chapters: Sequence[ChapterSpec],
+                 fallbacks: Sequence[Tuple[str, Tuple[str, ...]]] = (),
+                 default: str = "unknown", cache_size: int = 4096):
+        self._compiled: List[Tuple[str, Pattern]] = []
+        for chapter, patterns, keywords in chapters:
+            compiled = _compile_chapter(patterns, keywords)
+            if compiled is not None:
+                self._compiled.append((chapter, compiled))
+        for chapter, keywords in fallbacks:
+            compiled = _compile_chapter((), keywords)
+            if compiled is not None:
+                self._compiled.append((chapter, compiled))
+        self.default = default
+        self.determine = lru_cache(maxsize=cache_size)(self._determine)
+
+    def _determine(self, text_lower: str) -> str:
+        """Primer capítulo (por prioridad) con algún patrón o palabra clave en el texto"""
+        for chapter, compiled in self._compiled:
+            if compiled.search(text_lower):
+                return chapter
+        return self.default
+
+    def cache_info(self):
+        return self.determine.cache_info()
+
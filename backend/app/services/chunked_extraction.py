@@ -0,0 +1,130 @@
+"""
+Extracción de entidades por fragmentos para documentos muy grandes.
+El texto se divide en fragmentos que terminan en un salto de página, un encabezado de
+sección o (en su defecto) un párrafo; cada fragmento se amplía con un solapamiento a
+ambos lados para no cortar las coincidencias de la frontera. Cada fragmento "posee" solo
+su tramo central: al reensamblar se descartan las entidades que empiezan fuera de él
+(las encontradas en el solapamiento las aporta el fragmento vecino) y los diagnósticos
+repetidos entre fragmentos, y las posiciones se trasladan al texto completo. Las entidades se
+reensamblan en el orden de la extracción de una sola pasada (estrategia o patrón y, dentro de
+cada uno, posición), y los diagnósticos repetidos se resuelven igual que en ella.
+El resultado coincide con el de una sola pasada mientras cada coincidencia quepa, con su
+contexto, en el solapamiento de los fragmentos que la ven.
+"""
+import re
+from bisect import bisect_right
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+from app.services.document_sections import PAGE_BREAK, Section
+from app.services.normalized_text import fold_text
+
+PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+
+class TextChunk(NamedTuple):
+    """Fragmento del texto: [start, end) se procesa, [own_start, own_end) es el tramo que le pertenece"""
+    start: int
+    end: int
+    own_start: int
+    own_end: int
+
+
+def plan_chunks(text: str, chunk_chars: int, overlap: int,
+                sections: Sequence[Section] = (),
+                page_offsets: Iterable[int] = ()) -> List[TextChunk]:
+    """
+    Divide el texto en fragmentos de como mucho `chunk_chars` caracteres propios
+
+    Args:
+        text: Texto completo
+        chunk_chars: Tamaño máximo del tramo propio de cada fragmento
+        overlap: Caracteres de solapamiento a cada lado del tramo propio
+        sections: Secciones del documento (sus inicios son fronteras preferidas)
+        page_offsets: Inicio de cada página (fronteras preferidas)
+
+    Returns:
+        Fragmentos ordenados; los tramos propios cubren el texto sin huecos ni solapes
+    """
+    if chunk_chars < 1:
+        raise ValueError("El tamaño de fragmento debe ser al menos 1")
+    length = len(text)
+    if length <= chunk_chars:
+        return [TextChunk(0, length, 0, length)]
+
+    # Fronteras preferidas: páginas y secciones; los párrafos solo si no hay otra dentro del fragmento
+    strong = sorted(
+        {offset for offset in page_offsets if 0 < offset < length}
+        | {match.end() for match in re.finditer(PAGE_BREAK, text)}
+        | {section.start for section in sections if 0 < section.start < length}
+    )
+    weak = [match.end() for match in PARAGRAPH_BREAK.finditer(text)]
+
+    chunks = []
+    own_start = 0
+    while own_start < length:
+        limit = own_start + chunk_chars
+        if limit >= length:
+            own_end = length
+        else:
+            # Una frontera de página/sección solo se prefiere si no deja un fragmento de menos de la mitad
+            own_end = (
+                _last_boundary(strong, own_start + chunk_chars // 2, limit)
+                or _last_boundary(weak, own_start, limit)
+                or limit
+            )
+        chunks.append(TextChunk(max(0, own_start - overlap), min(length, own_end + overlap), own_start, own_end))
+        own_start = own_end
+    return chunks
+
+
+def _last_boundary(boundaries: List[int], start: int, limit: int) -> int:
+    """Última frontera en (start, limit] (0 si no hay ninguna)"""
+    index = bisect_right(boundaries, limit) - 1
+    if index >= 0 and boundaries[index] > start:
+        return boundaries[index]
+    return 0
+
+
+def merge_chunk_entities(chunks: Sequence[TextChunk],
+                         chunk_results: Iterable[Tuple[Dict[str, List[Dict]], Dict[str, List[int]]]]
+                         ) -> Dict[str, List[Dict]]:
+    """
+    Reensambla las entidades de cada fragmento (en el orden de los fragmentos)
+
+    Cada resultado es (entidades, final de cada grupo): un grupo es una estrategia o patrón de
+    la extracción, con sus coincidencias en orden de posición, y todos los fragmentos tienen los
+    mismos grupos. Las posiciones se trasladan al texto completo y se conservan solo las
+    entidades que empiezan en el tramo propio del fragmento; el resultado recorre los grupos en
+    orden y, dentro de cada uno, los fragmentos en orden, que es el orden de la extracción de una
+    sola pasada. De los diagnósticos se conserva la primera aparición de cada texto normalizado
+    en ese orden (un diagnóstico de los hechos probados no se pierde frente a una aparición
+    anterior encontrada por la lista blanca).
+    """
+    merged: Dict[str, List[Dict]] = {"DIAGNOSIS": [], "METRIC": [], "CODE": [], "RATING": []}
+    # Tipo de entidad -> grupo -> entidades propias de cada fragmento, en orden
+    grouped: Dict[str, List[List[Dict]]] = {}
+    for chunk, (entities, group_ends) in zip(chunks, chunk_results):
+        for entity_type, items in entities.items():
+            groups = grouped.setdefault(entity_type, [])
+            group_start = 0
+            for group, group_end in enumerate(group_ends.get(entity_type, [len(items)])):
+                if group == len(groups):
+                    groups.append([])
+                for item in items[group_start:group_end]:
+                    start = item["start"] + chunk.start
+                    if chunk.own_start <= start < chunk.own_end:
+                        groups[group].append({**item, "start": start, "end": item["end"] + chunk.start})
+                group_start = group_end
+
+    for entity_type, groups in grouped.items():
+        target = merged.setdefault(entity_type, [])
+        for items in groups:
+            target.extend(items)
+
+    seen_diagnoses = set()
+    diagnoses, merged["DIAGNOSIS"] = merged["DIAGNOSIS"], []
+    for item in diagnoses:
+        normalized = fold_text(item["text"])
+        if normalized not in seen_diagnoses:
+            seen_diagnoses.add(normalized)
+            merged["DIAGNOSIS"].append(item)
+    return merged
@@ -0,0 +1,118 @@
+"""
+Reglas de clasificación de diagnósticos por capítulo (clase y confianza) compiladas.
+Cada capítulo tiene una clase/confianza por defecto y una lista ordenada de reglas
+(palabras clave → clase/confianza) definidas en las tablas del baremo; gana la primera
+que se cumple. Todas las palabras clave se buscan con un único buscador y el conjunto de
+palabras clave presentes en cada texto se memoriza, de modo que los textos relacionados
+de un grupo no se vuelven a recorrer al clasificar los demás diagnósticos del caso. Las
+palabras clave se comparan sin tildes (el texto normalizado del motor legal tampoco las lleva).
+"""
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, Iterable, Mapping, NamedTuple, Optional, Tuple
+
+from app.services.keyword_scanner import KeywordScanner
+from app.services.normalized_text import fold_text
+
+# Banderas del diagnóstico que una regla puede exigir
+RULE_FLAGS = ("is_grouped", "is_functional_only")
+# Ámbito de las palabras clave: el texto del diagnóstico o también los diagnósticos agrupados con él
+RULE_SCOPES = ("diagnosis", "group")
+
+
+class ClassificationRule(NamedTuple):
+    """Regla: si aparece alguna de `any_of` (o no hay lista), ninguna de `unless` y se cumple `requires`"""
+    any_of: FrozenSet[str]
+    unless: FrozenSet[str]
+    requires: Optional[str]
+    scope: str
+    class_num: Optional[str]  # None: se conserva la clase por defecto
+    confidence: float
+    grouped_confidence: Optional[float]  # Confianza si el diagnóstico es un grupo
+
+
+class ChapterRules(NamedTuple):
+    """Reglas de un capítulo"""
+    default_class: str
+    default_confidence: float
+    uses_metrics: bool  # Clasificar antes por métricas (ROM, fuerza); las reglas solo si no determinan la clase
+    rules: Tuple[ClassificationRule, ...]
+
+
+class ClassificationRules:
+    """
+    Reglas de clasificación compiladas a partir de las tablas del baremo
+
+    Args:
+        data: Sección "classification_rules" de las tablas
+        cache_size: Textos cuyo conjunto de palabras clave se memoriza
+    """
+
+    def __init__(self, data: Mapping, cache_size: int = 4096):
+        default = data["default"]
+        self.default = ChapterRules(default["class"], default["confidence"], False, ())
+        self._chapters: Dict[str, ChapterRules] = {}
+        keywords = []
+        for entry in data.get("chapters", ()):
+            entry_default = entry.get("default", default)
+            rules = tuple(
+                ClassificationRule(
+                    any_of=frozenset(fold_text(keyword) for keyword in rule.get("any", ())),
+                    unless=frozenset(fold_text(keyword) for keyword in rule.get("unless", ())),
+                    requires=rule.get("requires"),
+                    scope=rule.get("scope", "diagnosis"),
+                    class_num=rule.get("class"),
+                    confidence=rule["confidence"],
+                    grouped_confidence=rule.get("grouped_confidence"),
+                )
+                for rule in entry.get("rules", ())
+            )
+            for rule in rules:
+                keywords.extend(rule.any_of | rule.unless)
+            chapter_rules = ChapterRules(entry_default["class"], entry_default["confidence"],
+                                         bool(entry.get("metrics", False)), rules)
+            for chapter in entry["chapters"]:
+                self._chapters[chapter] = chapter_rules
+        self._scanner = KeywordScanner(sorted(set(keywords)), folded=True)
+        self.keywords_in = lru_cache(maxsize=cache_size)(self._keywords_in)
+
+    def for_chapter(self, chapter: str) -> ChapterRules:
+        return self._chapters.get(chapter, self.default)
+
+    def _keywords_in(self, text: str) -> FrozenSet[str]:
+        """Palabras clave (sin tildes) de las reglas que aparecen en el texto normalizado (como subcadena)"""
+        return frozenset(self._scanner.scan(text).positions)
+
+    def evaluate(self, chapter_rules: ChapterRules, normalized_text: str,
+                 related_texts: Callable[[], Iterable[str]],
+                 flags: Mapping[str, bool]) -> Optional[Tuple[Optional[str], float]]:
+        """
+        Primera regla del capítulo que se cumple
+
+        Args:
+            chapter_rules: Reglas del capítulo del diagnóstico
+            normalized_text: Texto normalizado del diagnóstico
+            related_texts: Textos normalizados de los diagnósticos agrupados (se piden solo si hace falta)
+            flags: Banderas del diagnóstico (RULE_FLAGS)
+
+        Returns:
+            (clase o None si la regla no la cambia, confianza), o None si no se cumple ninguna
+        """
+        found = self.keywords_in(normalized_text)
+        group_found = None
+        for rule in chapter_rules.rules:
+            if rule.requires and not flags.get(rule.requires):
+                continue
+            present = found
+            if rule.scope == "group":
+                if group_found is None:
+                    group_found = found.union(*(self.keywords_in(text) for text in related_texts()))
+                present = group_found
+            if rule.any_of and not rule.any_of & present:
+                continue
+            if rule.unless & present:
+                continue
+            confidence = rule.confidence
+            if rule.grouped_confidence is not None and flags.get("is_grouped"):
+                confidence = rule.grouped_confidence
+            return rule.class_num, confidence
+        return None
@@ -0,0 +1,215 @@
+"""
+Fórmula de combinación de deficiencias del RD 888/2022 (Art. 4.2) vectorizada con NumPy.
+Aplicar A + B(1 - A/100) sucesivamente equivale a 100·(1 - Π(1 - p/100)); la valoración
+combinada de miles de casos se calcula con operaciones sobre todos los casos a la vez
+(una por posición, no una por caso) y la clase final con `searchsorted` sobre los rangos
+de clase del Anexo I. Los resultados coinciden con LegalEngine._calculate_final_valuation.
+"""
+from bisect import bisect_right
+from itertools import chain
+from typing import List, Mapping, NamedTuple, Sequence
+
+import numpy as np
+
+# Máximo de la valoración combinada según el RD
+MAX_COMBINED_PERCENTAGE = 99.0
+# Clase asignada si el porcentaje no cae en ningún rango
+NO_CLASS = "0"
+
+
+class ClassRanges:
+    """
+    Rangos de clase [mínimo, máximo] ordenados para buscar la clase de un porcentaje
+
+    Args:
+        classes_via: Clase -> {"range": (min, max), ...} (rangos sin solapamiento)
+    """
+
+    def __init__(self, classes_via: Mapping[str, Mapping]):
+        ordered = sorted(classes_via.items(), key=lambda item: item[1]["range"][0])
+        self.labels = np.array([class_num for class_num, _ in ordered] + [NO_CLASS])
+        self.minimums = np.array([data["range"][0] for _, data in ordered], dtype=float)
+        self.maximums = np.array([data["range"][1] for _, data in ordered], dtype=float)
+        self._minimums = self.minimums.tolist()
+        self._maximums = self.maximums.tolist()
+
+    def class_of(self, percentage: float) -> str:
+        """Clase de un porcentaje (NO_CLASS si cae entre dos rangos o fuera de todos)"""
+        index = bisect_right(self._minimums, percentage) - 1
+        if index >= 0 and percentage <= self._maximums[index]:
+            return str(self.labels[index])
+        return NO_CLASS
+
+    def classify(self, percentages: np.ndarray) -> np.ndarray:
+        """Clase de cada porcentaje (array de cadenas)"""
+        percentages = np.asarray(percentages, dtype=float)
+        index = np.searchsorted(self.minimums, percentages, side="right") - 1
+        inside = (index >= 0) & (percentages <= self.maximums[np.maximum(index, 0)])
+        return self.labels[np.where(inside, index, len(self.labels) - 1)]
+
+
+class BatchValuation(NamedTuple):
+    """Valoración combinada de cada caso (arrays alineados con los casos de entrada)"""
+    bdgp_percentage: np.ndarray
+    gda_percentage: np.ndarray
+    final_class: np.ndarray
+    components_count: np.ndarray
+
+
+def combine_ragged(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Porcentaje combinado (sin redondear ni limitar) de cada caso
+
+    Los porcentajes de cada caso se ordenan de mayor a menor y se combinan posición a
+    posición para todos los casos a la vez con la misma recurrencia A + B(1 - A/100) que
+    el cálculo escalar: el producto Π(1 - p/100) da el mismo valor salvo en el último bit,
+    que basta para cambiar el redondeo a 2 decimales en los empates.
+
+    Args:
+        values: Porcentajes de todos los casos, uno detrás de otro
+        lengths: Número de porcentajes de cada caso (los casos vacíos valen 0)
+    """
+    values = np.asarray(values, dtype=float)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    if values.size != int(lengths.sum()):
+        raise ValueError("La suma de las longitudes no coincide con el número de porcentajes")
+    case_count = len(lengths)
+    if values.size == 0:
+        return np.zeros(case_count)
+
+    # Matriz casos x posiciones, de mayor a menor; las posiciones sobrantes no cambian el resultado
+    case_index = np.repeat(np.arange(case_count), lengths)
+    order = np.lexsort((-values, case_index))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    positions = np.arange(values.size) - np.repeat(starts, lengths)
+    matrix = np.zeros((case_count, int(lengths.max())))
+    matrix[case_index, positions] = values[order]
+
+    combined = matrix[:, 0].copy()
+    for position in range(1, matrix.shape[1]):
+        active = lengths > position
+        current = combined[active]
+        combined[active] = current + (matrix[active, position] * (100 - current) / 100)
+    return combined
+
+
+def combine_percentages(percentages: Sequence[float]) -> float:
+    """Porcentaje combinado (sin redondear ni limitar): A + B(1 - A/100) de mayor a menor"""
+    ordered = sorted(percentages, reverse=True)
+    combined = ordered[0] if ordered else 0
+    for next_p in ordered[1:]:
+        combined = combined + (next_p * (100 - combined) / 100)
+    return combined
+
+
+def near_rounding_tie(values: np.ndarray, decimals: int = 2) -> np.ndarray:
+    """Máscara de los valores cuyo redondeo depende del último bit (a medio camino entre dos)"""
+    scaled = np.asarray(values, dtype=float) * 10 ** decimals
+    return np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+
+
+def round_percentages(values: np.ndarray, decimals: int = 2) -> np.ndarray:
+    """Redondeo igual al `round()` de Python (np.round difiere en los empates no representables)"""
+    rounded = np.round(values, decimals)
+    for index in np.flatnonzero(near_rounding_tie(values, decimals)).tolist():
+        rounded[index] = round(float(values[index]), decimals)
+    return rounded
+
+
+def batch_valuation(cases: Sequence[Sequence[float]], class_ranges: ClassRanges,
+                    cap: float = MAX_COMBINED_PERCENTAGE) -> BatchValuation:
+    """
+    Valoración combinada (BDGP/GDA y clase final) de muchos casos a la vez
+
+    Args:
+        cases: Porcentajes de los capítulos valorados de cada caso (listas de distinta longitud)
+        class_ranges: Rangos de clase del baremo
+        cap: Máximo de la valoración combinada
+
+    Returns:
+        BatchValuation; un caso sin porcentajes vale 0% (clase según los rangos)
+    """
+    lengths = np.fromiter((len(case) for case in cases), dtype=np.int64, count=len(cases))
+    values = np.fromiter(chain.from_iterable(cases), dtype=float, count=int(lengths.sum()))
+    bdgp = np.minimum(round_percentages(combine_ragged(values, lengths)), cap)
+    # GDA preliminar (sin BLA/BRP/BFCA): igual al BDGP
+    return BatchValuation(
+        bdgp_percentage=bdgp,
+        gda_percentage=bdgp.copy(),
+        final_class=class_ranges.classify(bdgp),
+        components_count=lengths
+    )
+
+
+class WhatIfScenario(NamedTuple):
+    """Valoración combinada tras quitar o añadir una deficiencia"""
+    action: str  # "remove" (quitar la deficiencia `index`) o "add" (añadir el candidato `index`)
+    index: int
+    percentage: float
+    gda_percentage: float
+    final_class: str
+    gda_change: float
+    class_changed: bool
+
+
+class WhatIfValuation(NamedTuple):
+    """Valoración actual y la de cada escenario de quitar o añadir una deficiencia"""
+    gda_percentage: float
+    final_class: str
+    removals: List[WhatIfScenario]
+    additions: List[WhatIfScenario]
+
+
+def what_if_valuation(percentages: Sequence[float], candidates: Sequence[float], class_ranges: ClassRanges,
+                      cap: float = MAX_COMBINED_PERCENTAGE) -> WhatIfValuation:
+    """
+    GDA resultante de quitar cada deficiencia o añadir cada candidata, en una pasada
+
+    La combinación es 100·(1 - Π(1 - p/100)): con los productos acumulados por la izquierda
+    y por la derecha, quitar la deficiencia i es prefijo[i]·sufijo[i+1] y añadir q es
+    Π·(1 - q/100), sin recombinar la lista en cada escenario. Los pocos escenarios cuyo
+    redondeo a 2 decimales cae en un empate se recalculan con la fórmula escalar para que
+    coincidan exactamente con la valoración del análisis.
+
+    Args:
+        percentages: Porcentajes de las deficiencias valoradas actualmente
+        candidates: Porcentajes de las deficiencias que se plantea añadir
+        class_ranges: Rangos de clase del baremo
+        cap: Máximo de la valoración combinada
+
+    Raises:
+        ValueError: Si algún porcentaje no está entre 0 y 100
+    """
+    values = np.asarray(percentages, dtype=float)
+    extra = np.asarray(candidates, dtype=float)
+    for checked in (values, extra):
+        # Fuera de [0, 100] el factor 1 - p/100 cambia de signo o supera 1 y el GDA no tiene sentido
+        if not np.all((checked >= 0.0) & (checked <= 100.0)):
+            raise ValueError("Los porcentajes deben estar entre 0 y 100")
+    remaining = 1.0 - values / 100.0
+    # prefix[i] = producto de los factores anteriores a i; suffix[i] = de i en adelante
+    prefix = np.concatenate(([1.0], np.cumprod(remaining)))
+    suffix = np.concatenate((np.cumprod(remaining[::-1])[::-1], [1.0]))
+
+    raw_removals = 100.0 * (1.0 - prefix[:-1] * suffix[1:])
+    raw_additions = 100.0 * (1.0 - prefix[-1] * (1.0 - extra / 100.0))
+    for index in np.flatnonzero(near_rounding_tie(raw_removals)).tolist():
+        raw_removals[index] = combine_percentages([p for i, p in enumerate(percentages) if i != index])
+    for index in np.flatnonzero(near_rounding_tie(raw_additions)).tolist():
+        raw_additions[index] = combine_percentages([*percentages, candidates[index]])
+
+    gda = min(round(combine_percentages(percentages), 2), cap)
+    final_class = class_ranges.class_of(gda)
+
+    def scenarios(action: str, source: Sequence[float], raw: np.ndarray) -> List[WhatIfScenario]:
+        combined = np.minimum(round_percentages(raw), cap)
+        classes = class_ranges.classify(combined)
+        return [
+            WhatIfScenario(action, index, float(source[index]), value, str(new_class),
+                           round(value - gda, 2), str(new_class) != final_class)
+            for index, (value, new_class) in enumerate(zip(combined.tolist(), classes.tolist()))
+        ]
+
+    return WhatIfValuation(gda, final_class,
+                           scenarios("remove", percentages, raw_removals),
+                           scenarios("add", candidates, raw_additions))
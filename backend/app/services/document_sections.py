@@ -0,0 +1,150 @@
+"""
+Segmentación de documentos por secciones (hechos probados, fundamentos de derecho, fallo,
+conclusiones, juicio clínico), localizadas una sola vez por texto.
+SectionIndex expone ese índice (nombre, inicio, fin y página de cada sección) a los
+llamadores, memorizado por hash del texto.
+"""
+import hashlib
+import re
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class Section(NamedTuple):
+    """Sección del documento: desde su encabezado hasta el inicio de la siguiente"""
+    name: str
+    start: int
+    end: int
+    page: int = 1  # Página (base 1) donde empieza la sección
+
+
+# Encabezados de sección. "fallo" solo cuenta a principio de línea: en el texto corrido
+# ("el fallo recurrido") no abre una sección nueva.
+SECTION_MARKERS = {
+    "hechos_probados": r"hechos\s+probados|hecho\s+probado",
+    "fundamentos_de_derecho": r"fundamentos\s+de\s+derecho",
+    "fallo": r"^[ \t]*(?:fallo|fallamos)\b",
+    "conclusiones": r"conclusiones|consideraciones\s+médico-legales",
+    "juicio_clinico": r"juicio\s+clínico|cuadro\s+clínico",
+}
+
+SECTION_PATTERN = re.compile(
+    "|".join(f"(?P<{name}>{pattern})" for name, pattern in SECTION_MARKERS.items()),
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+PAGE_BREAK = "\f"
+
+
+def page_starts(page_texts: Sequence[str], separator: str = "\n\n") -> List[int]:
+    """Posición de inicio de cada página en el texto `separator.join(page_texts)`"""
+    starts = []
+    position = 0
+    for page_text in page_texts:
+        starts.append(position)
+        position += len(page_text) + len(separator)
+    return starts
+
+
+def find_sections(text: str, page_offsets: Optional[Sequence[int]] = None) -> List[Section]:
+    """
+    Localiza todas las secciones del texto en una sola pasada (ordenadas por posición)
+
+    Args:
+        text: Texto del documento
+        page_offsets: Inicio de cada página en el texto (por defecto, saltos de página '\\f')
+    """
+    if page_offsets is None:
+        page_offsets = [0] + [match.end() for match in re.finditer(PAGE_BREAK, text)]
+    markers = [(match.lastgroup, match.start()) for match in SECTION_PATTERN.finditer(text)]
+    return [
+        Section(
+            name,
+            start,
+            markers[index + 1][1] if index + 1 < len(markers) else len(text),
+            max(1, bisect_right(page_offsets, start)),
+        )
+        for index, (name, start) in enumerate(markers)
+    ]
+
+
+class SectionIndex:
+    """
+    Índice de secciones de un texto. Se comporta como un diccionario de segmentos
+    (`items()`, `get()`, `in`: contenido de cada sección, concatenando las que se repiten)
+    y permite consultar a qué sección pertenece una posición.
+    """
+
+    def __init__(self, text: str, sections: Sequence[Section]):
+        self.text = text
+        self.sections: Tuple[Section, ...] = tuple(sections)
+        self._starts = [section.start for section in self.sections]
+
+    def indexes(self, text: str) -> bool:
+        """Si el índice corresponde a este texto (las posiciones solo son válidas sobre él)"""
+        return text is self.text or text == self.text
+
+    def section_at(self, position: int) -> Optional[Section]:
+        """Sección que contiene la posición (None si está antes del primer encabezado)"""
+        index = bisect_right(self._starts, position) - 1
+        if index < 0 or position >= self.sections[index].end:
+            return None
+        return self.sections[index]
+
+    def in_section(self, name: str, position: int) -> bool:
+        section = self.section_at(position)
+        return section is not None and section.name == name
+
+    def names(self) -> List[str]:
+        """Nombres de las secciones presentes (sin repetir, en orden de aparición)"""
+        return list(dict.fromkeys(section.name for section in self.sections))
+
+    def get(self, name: str, default: str = "") -> str:
+        """Contenido de la sección (las apariciones repetidas se unen con una línea en blanco)"""
+        parts = [self.text[section.start:section.end] for section in self.sections if section.name == name]
+        return "\n\n".join(parts) if parts else default
+
+    def items(self) -> List[Tuple[str, str]]:
+        return [(name, self.get(name)) for name in self.names()]
+
+    def __contains__(self, name: str) -> bool:
+        return any(section.name == name for section in self.sections)
+
+    def __iter__(self) -> Iterator[Section]:
+        return iter(self.sections)
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def to_list(self) -> List[Dict]:
+        """Índice compacto serializable: nombre, inicio, fin y página de cada sección"""
+        return [section._asdict() for section in self.sections]
+
+
+# Índices ya calculados, por hash del texto (solo posiciones: el texto no se retiene)
+SECTION_CACHE_SIZE = 128
+_section_cache: "OrderedDict[tuple, Tuple[Section, ...]]" = OrderedDict()
+_section_cache_lock = threading.Lock()
+
+
+def index_sections(text: str, page_offsets: Optional[Sequence[int]] = None) -> SectionIndex:
+    """Índice de secciones del texto, calculado una vez por texto (LRU por hash SHA-256)"""
+    key = (
+        hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest(),
+        tuple(page_offsets) if page_offsets is not None else None,
+    )
+    with _section_cache_lock:
+        sections = _section_cache.get(key)
+        if sections is not None:
+            _section_cache.move_to_end(key)
+    if sections is None:
+        sections = tuple(find_sections(text, page_offsets))
+        with _section_cache_lock:
+            _section_cache[key] = sections
+            while len(_section_cache) > SECTION_CACHE_SIZE:
+                _section_cache.popitem(last=False)
+    return SectionIndex(text, sections)
+
@@ -0,0 +1,118 @@
+"""
+Caché persistente de extracción de texto direccionada por contenido.
+La clave es el SHA-256 de los bytes subidos más la versión del extractor, de modo que
+volver a subir el mismo documento devuelve el texto y los logs sin repetir PyMuPDF/OCR.
+Se almacena en SQLite con expulsión LRU por tamaño total.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def document_key(file_content: bytes, extractor_version: str, kind: str = "") -> str:
+    """Clave de caché: SHA-256 del documento + versión del extractor (+ tipo de archivo)"""
+    digest = hashlib.sha256(file_content).hexdigest()
+    return f"{digest}:{kind}:{extractor_version}"
+
+
+class ExtractionCache:
+    """Caché SQLite de textos extraídos con expulsión LRU por tamaño"""
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS extraction_cache (
+                key TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                logs TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_extraction_cache_access ON extraction_cache (last_access)"
+        )
+        self._conn.commit()
+        # Métricas
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str) -> Optional[Tuple[str, List[str]]]:
+        """Devuelve (texto, logs) si la clave está en caché, actualizando su último acceso"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, logs FROM extraction_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE extraction_cache SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            self._hits += 1
+            return row[0], json.loads(row[1])
+
+    def put(self, key: str, text: str, logs: List[str]):
+        """Guarda el resultado de una extracción y expulsa las entradas menos usadas si se supera el tamaño"""
+        logs_json = json.dumps(logs, ensure_ascii=False)
+        size = len(text.encode("utf-8")) + len(logs_json.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extraction_cache (key, text, logs, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, text, logs_json, size, time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Expulsa las entradas con acceso más antiguo hasta quedar por debajo del tamaño máximo"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM extraction_cache ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+            total -= size
+            self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM extraction_cache")
+            self._conn.commit()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métricas de la caché: aciertos, fallos, entradas y tamaño"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extraction_cache"
+            ).fetchone()
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "entries": entries,
+                "size_bytes": size,
+                "max_bytes": self.max_bytes,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,145 @@
+"""
+Almacén SQLite de trabajos de análisis asíncronos.
+Guarda el estado, el resultado, los mensajes de progreso (logs del pipeline) y el
+documento subido, de modo que los trabajos pendientes se reanudan tras un reinicio.
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+# Estados de un trabajo
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = (JOB_COMPLETED, JOB_FAILED)
+
+
+class JobStore:
+    """Persistencia de trabajos de análisis y de sus eventos de progreso"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                filename TEXT,
+                content_type TEXT,
+                document_type TEXT,
+                file_content BLOB,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_events (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (job_id, seq)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def create(self, file_content: bytes, filename: Optional[str], content_type: Optional[str],
+               document_type: Optional[str]) -> str:
+        """Registra un nuevo trabajo en cola y devuelve su ID"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, filename, content_type, document_type, file_content, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, filename, content_type, document_type, file_content, now, now),
+            )
+            self._conn.commit()
+        return job_id
+
+    def add_event(self, job_id: str, message: str) -> int:
+        """Añade un mensaje de progreso al trabajo y devuelve su número de secuencia"""
+        with self._lock:
+            seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM job_events WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            self._conn.execute(
+                "INSERT INTO job_events (job_id, seq, message, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, seq, message, time.time()),
+            )
+            self._conn.commit()
+        return seq
+
+    def events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        """Eventos de progreso posteriores a la secuencia indicada"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, message, created_at FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def mark_running(self, job_id: str):
+        self._update(job_id, status=JOB_RUNNING)
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        """Guarda el resultado y descarta el documento subido (ya no hace falta)"""
+        self._update(job_id, status=JOB_COMPLETED, result=json.dumps(result, ensure_ascii=False), file_content=None)
+
+    def fail(self, job_id: str, error: str):
+        self._update(job_id, status=JOB_FAILED, error=error, file_content=None)
+
+    def get(self, job_id: str, include_input: bool = False) -> Optional[Dict[str, Any]]:
+        """Estado del trabajo (con el resultado si ha terminado); None si no existe"""
+        columns = "id, status, filename, content_type, document_type, result, error, created_at, updated_at"
+        if include_input:
+            columns += ", file_content"
+        with self._lock:
+            row = self._conn.execute(f"SELECT {columns} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def pending_ids(self) -> List[str]:
+        """Trabajos en cola o interrumpidos (p. ej. por un reinicio), en orden de llegada"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JOB_QUEUED, JOB_RUNNING),
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def purge_finished(self, older_than_seconds: float) -> int:
+        """Elimina los trabajos terminados más antiguos que el umbral indicado"""
+        cutoff = time.time() - older_than_seconds
+        with self._lock:
+            ids = [row["id"] for row in self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (*FINISHED_STATUSES, cutoff),
+            ).fetchall()]
+            self._conn.executemany("DELETE FROM job_events WHERE job_id = ?", [(i,) for i in ids])
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in ids])
+            self._conn.commit()
+        return len(ids)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,230 @@
+"""
+Búsqueda de múltiples palabras clave en una sola pasada sobre el texto.
+Las palabras clave se compilan una vez en una expresión regular con forma de trie
+(prefijos comunes factorizados); cada búsqueda devuelve todas las apariciones, incluidas
+las solapadas, con su posición. Sustituye a los bucles `keyword in text_lower` repetidos.
+PatternSetMatcher aplica la misma idea a listas de expresiones regulares (lista blanca).
+"""
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from app.services.normalized_text import fold_text
+
+
+def _is_word_char(char: str) -> bool:
+    """Mismo criterio que `\\w` de `re` para cadenas Unicode"""
+    return char.isalnum() or char == "_"
+
+
+def _trie_pattern(keywords: Sequence[str]) -> str:
+    """Construye una alternancia con forma de trie (la coincidencia más larga en cada posición)"""
+    trie: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # La palabra clave termina aquí, pero puede continuar en otra más larga
+            return "(?:" + pattern + ")?"
+        return pattern
+
+    return build(trie)
+
+
+class KeywordHits:
+    """Apariciones de cada palabra clave (posiciones de inicio ordenadas)"""
+
+    def __init__(self, positions: Dict[str, List[int]], key: Optional[Callable[[str], str]] = None):
+        self.positions = positions
+        # Forma en la que se buscó cada palabra clave (p. ej. normalizada sin tildes)
+        self._key = key or (lambda keyword: keyword)
+
+    def __contains__(self, keyword: str) -> bool:
+        return self._key(keyword) in self.positions
+
+    def first(self, keyword: str) -> int:
+        """Posición de la primera aparición (-1 si no aparece), como `str.find`"""
+        starts = self.positions.get(self._key(keyword))
+        return starts[0] if starts else -1
+
+    def count(self, keyword: str) -> int:
+        """Apariciones sin solapamiento, como `str.count`"""
+        keyword = self._key(keyword)
+        total = 0
+        next_free = 0
+        for start in self.positions.get(keyword, ()):
+            if start >= next_free:
+                total += 1
+                next_free = start + len(keyword)
+        return total
+
+    def within(self, keyword: str, start: int, end: int) -> bool:
+        """Si la palabra clave aparece completa dentro de text[start:end]"""
+        keyword = self._key(keyword)
+        return any(
+            position >= start and position + len(keyword) <= end
+            for position in self.positions.get(keyword, ())
+        )
+
+    def found(self, keywords: Iterable[str]) -> List[str]:
+        """Palabras clave de la lista que aparecen en el texto (en el orden de la lista)"""
+        return [keyword for keyword in keywords if self._key(keyword) in self.positions]
+
+    def any(self, keywords: Iterable[str]) -> bool:
+        return any(self._key(keyword) in self.positions for keyword in keywords)
+
+
+class KeywordScanner:
+    """
+    Buscador compilado de un conjunto fijo de palabras clave
+
+    Args:
+        keywords: Palabras clave (se comparan tal cual; el llamador pasa el texto en minúsculas)
+        whole_words: Exigir límite de palabra a ambos lados (equivale a r'\\b' + re.escape(kw) + r'\\b')
+        folded: Normalizar las palabras clave con `fold_text` (el llamador pasa el texto de un
+            NormalizedDocument); las consultas sobre el resultado aceptan la palabra clave original
+    """
+
+    def __init__(self, keywords: Iterable[str], whole_words: bool = False, folded: bool = False):
+        self.folded = folded
+        self._folded_keys: Dict[str, str] = {}
+        if folded:
+            keywords = [self._fold_key(keyword) for keyword in keywords]
+        self.keywords = tuple(dict.fromkeys(keyword for keyword in keywords if keyword))
+        self.whole_words = whole_words
+        self._pattern = re.compile(_trie_pattern(self.keywords)) if self.keywords else None
+        # Palabras clave que son prefijo de cada palabra clave (incluida ella misma), de más corta a más larga:
+        # todas las que coinciden en una posición son prefijos de la coincidencia más larga
+        keyword_set = set(self.keywords)
+        self._prefixes = {
+            keyword: [keyword[:size] for size in range(1, len(keyword) + 1) if keyword[:size] in keyword_set]
+            for keyword in self.keywords
+        }
+
+    def _fold_key(self, keyword: str) -> str:
+        folded = self._folded_keys.get(keyword)
+        if folded is None:
+            folded = self._folded_keys[keyword] = fold_text(keyword)
+        return folded
+
+    def _boundary(self, text: str, index: int) -> bool:
+        before = index > 0 and _is_word_char(text[index - 1])
+        after = index < len(text) and _is_word_char(text[index])
+        return before != after
+
+    def scan(self, text: str) -> KeywordHits:
+        """Recorre el texto una vez y devuelve todas las apariciones de todas las palabras clave"""
+        positions: Dict[str, List[int]] = {}
+        key = self._fold_key if self.folded else None
+        if self._pattern is None:
+            return KeywordHits(positions, key)
+        search = self._pattern.search
+        match = search(text)
+        while match:
+            start = match.start()
+            if self.whole_words and not self._boundary(text, start):
+                match = search(text, start + 1)
+                continue
+            for keyword in self._prefixes[match.group()]:
+                if self.whole_words and not self._boundary(text, start + len(keyword)):
+                    continue
+                positions.setdefault(keyword, []).append(start)
+            match = search(text, start + 1)
+        return KeywordHits(positions, key)
+
+
+@lru_cache(maxsize=32)
+def keyword_scanner(keywords: tuple, whole_words: bool = False) -> KeywordScanner:
+    """Buscador compartido para una tupla de palabras clave (se compila una sola vez)"""
+    return KeywordScanner(keywords, whole_words=whole_words)
+
+
+# Caracteres que terminan el prefijo literal de una expresión regular
+_REGEX_SPECIAL = set("\\()[]{}?*+|.^$")
+_REGEX_QUANTIFIERS = set("?*+{")
+
+
+def _literal_prefix(pattern: str) -> str:
+    """Prefijo literal con el que empieza toda coincidencia del patrón ('' si no lo hay)"""
+    if pattern.startswith(r"\b"):
+        pattern = pattern[2:]
+    prefix = []
+    for char in pattern:
+        if char in _REGEX_SPECIAL:
+            if char in _REGEX_QUANTIFIERS and prefix:
+                prefix.pop()  # El carácter anterior es opcional o repetible
+            break
+        prefix.append(char)
+    return "".join(prefix)
+
+
+class PatternSetMatcher:
+    """
+    Búsqueda de una lista de expresiones regulares en una sola pasada.
+    Los prefijos literales de todos los patrones se combinan en una alternancia con forma
+    de trie; solo en las posiciones donde aparece alguno se comprueban (con `match`
+    anclado) los patrones que empiezan por él. El resultado es idéntico a ejecutar
+    `re.finditer` con cada patrón por separado, incluidas las coincidencias solapadas
+    entre patrones distintos.
+    """
+
+    def __init__(self, patterns: Sequence[str], flags: int = 0):
+        self.patterns = [re.compile(pattern, flags) for pattern in patterns]
+        self._ignore_case = bool(flags & re.IGNORECASE)
+        prefixes = [_literal_prefix(pattern) for pattern in patterns]
+        # Patrones sin prefijo literal: se buscan por separado
+        self._unanchored = [index for index, prefix in enumerate(prefixes) if not prefix]
+
+        by_prefix: Dict[str, List[int]] = {}
+        for index, prefix in enumerate(prefixes):
+            if prefix:
+                by_prefix.setdefault(self._key(prefix), []).append(index)
+        # Patrones candidatos para cada prefijo: los de ese prefijo y los de sus prefijos más cortos
+        self._candidates = {
+            key: sorted(
+                index for other, indexes in by_prefix.items() if key.startswith(other) for index in indexes
+            )
+            for key in by_prefix
+        }
+        self._all_anchored = sorted(index for indexes in by_prefix.values() for index in indexes)
+        self._prefix_pattern = (
+            re.compile(_trie_pattern(list(by_prefix)), flags & (re.IGNORECASE | re.UNICODE))
+            if by_prefix else None
+        )
+
+    def _key(self, text: str) -> str:
+        return text.lower() if self._ignore_case else text
+
+    def finditer_all(self, text: str) -> List[List[re.Match]]:
+        """Coincidencias de cada patrón (en el orden de la lista), como `list(p.finditer(text))`"""
+        results: List[List[re.Match]] = [[] for _ in self.patterns]
+        for index in self._unanchored:
+            results[index] = list(self.patterns[index].finditer(text))
+        if self._prefix_pattern is None:
+            return results
+
+        # Posición a partir de la cual cada patrón puede volver a coincidir (sin solapar consigo mismo)
+        next_start = [0] * len(self.patterns)
+        search = self._prefix_pattern.search
+        hit = search(text)
+        while hit:
+            position = hit.start()
+            # Si la clave no se reconoce (mayúsculas/minúsculas especiales), probar todos los patrones
+            candidates = self._candidates.get(self._key(hit.group()), self._all_anchored)
+            for index in candidates:
+                if position < next_start[index]:
+                    continue
+                match = self.patterns[index].match(text, position)
+                if match:
+                    results[index].append(match)
+                    next_start[index] = match.end() if match.end() > position else position + 1
+            hit = search(text, position + 1)
+        return results
@@ -0,0 +1,113 @@
+"""
+Índice de casi-duplicados para la deduplicación de diagnósticos del motor legal.
+Un diagnóstico se considera duplicado de otro ya aceptado si (a) su texto normalizado o
+su forma canónica (sinónimos sustituidos) coinciden, (b) uno de los textos normalizados
+contiene al otro y ambos tienen varias palabras, o (c) la similitud de Jaccard entre sus
+palabras (normalizadas o canónicas) alcanza el umbral. En lugar de comparar con todos los
+aceptados, cada criterio consulta un índice: conjuntos para (a), trigramas de caracteres
+y prefijos para (b) y un índice invertido de palabras para (c) (con Jaccard > 0 comparten
+al menos una palabra). La decisión es la misma que la comparación exhaustiva.
+"""
+from typing import Dict, FrozenSet, List, Set
+
+
+def jaccard(words1: FrozenSet[str], words2: FrozenSet[str]) -> float:
+    """Coeficiente de Jaccard entre dos conjuntos de palabras (0 si alguno está vacío)"""
+    if not words1 or not words2:
+        return 0.0
+    return len(words1 & words2) / len(words1 | words2)
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[index:index + 3] for index in range(len(text) - 2)}
+
+
+class _WordIndex:
+    """Conjuntos de palabras de las entradas aceptadas con índice invertido por palabra"""
+
+    def __init__(self):
+        self.word_sets: List[FrozenSet[str]] = []
+        self.postings: Dict[str, List[int]] = {}
+
+    def add(self, words: FrozenSet[str]):
+        entry = len(self.word_sets)
+        self.word_sets.append(words)
+        for word in words:
+            self.postings.setdefault(word, []).append(entry)
+
+    def any_similar(self, words: FrozenSet[str], threshold: float) -> bool:
+        """Si alguna entrada con palabras en común alcanza el umbral de Jaccard"""
+        checked: Set[int] = set()
+        for word in words:
+            for entry in self.postings.get(word, ()):
+                if entry in checked:
+                    continue
+                checked.add(entry)
+                if jaccard(words, self.word_sets[entry]) >= threshold:
+                    return True
+        return False
+
+
+class NearDuplicateIndex:
+    """
+    Diagnósticos aceptados, indexados para decidir si uno nuevo es (casi) duplicado
+
+    Args:
+        threshold: Similitud de Jaccard a partir de la cual dos diagnósticos son el mismo
+    """
+
+    def __init__(self, threshold: float = 0.75):
+        self.threshold = threshold
+        self._normalized: Set[str] = set()
+        self._canonical: Set[str] = set()
+        self._normalized_words = _WordIndex()
+        self._canonical_words = _WordIndex()
+        # Textos de varias palabras: por trigrama (¿los contiene el nuevo?) y por prefijo (¿contienen al nuevo?)
+        self._multiword: List[str] = []
+        self._by_trigram: Dict[str, Set[int]] = {}
+        self._by_prefix: Dict[str, List[str]] = {}
+
+    def is_duplicate(self, normalized: str, canonical: str) -> bool:
+        """
+        Args:
+            normalized: Texto normalizado (minúsculas, sin puntuación ni palabras vacías)
+            canonical: Texto normalizado con los sinónimos sustituidos por su término canónico
+        """
+        if normalized in self._normalized or canonical in self._canonical:
+            return True
+        if len(normalized.split()) > 1 and self._contains_or_contained(normalized):
+            return True
+        return (
+            self._normalized_words.any_similar(frozenset(normalized.split()), self.threshold)
+            or self._canonical_words.any_similar(frozenset(canonical.split()), self.threshold)
+        )
+
+    def _contains_or_contained(self, normalized: str) -> bool:
+        # Aceptados (de varias palabras) contenidos en el nuevo: buscarlos por su prefijo
+        for index in range(len(normalized) - 2):
+            for accepted in self._by_prefix.get(normalized[index:index + 3], ()):
+                if normalized.startswith(accepted, index):
+                    return True
+        # Aceptados que contienen al nuevo: deben tener todos sus trigramas
+        candidates = None
+        for trigram in sorted(_trigrams(normalized), key=lambda gram: len(self._by_trigram.get(gram, ()))):
+            entries = self._by_trigram.get(trigram)
+            if not entries:
+                return False
+            candidates = set(entries) if candidates is None else candidates & entries
+            if not candidates:
+                return False
+        return any(normalized in self._multiword[entry] for entry in candidates or ())
+
+    def add(self, normalized: str, canonical: str):
+        """Registra un diagnóstico aceptado"""
+        self._normalized.add(normalized)
+        self._canonical.add(canonical)
+        self._normalized_words.add(frozenset(normalized.split()))
+        self._canonical_words.add(frozenset(canonical.split()))
+        if len(normalized.split()) > 1:
+            entry = len(self._multiword)
+            self._multiword.append(normalized)
+            for trigram in _trigrams(normalized):
+                self._by_trigram.setdefault(trigram, set()).add(entry)
+            self._by_prefix.setdefault(normalized[:3], []).append(normalized)
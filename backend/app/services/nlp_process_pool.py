@@ -0,0 +1,167 @@
+"""
+Extracción de entidades en paralelo sobre un pool de procesos.
+Cada proceso trabajador mantiene su propio NLPService (con los patrones ya compilados)
+y recibe lotes de textos o fragmentos de texto; los resultados se devuelven en el orden
+de entrada, a medida que están listos, con un número acotado de lotes en curso.
+"""
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Servicio NLP del proceso trabajador (uno por proceso, creado en el inicializador)
+_worker_service = None
+
+
+def _init_worker():
+    """Inicializa el proceso trabajador: importa y compila los patrones una sola vez"""
+    global _worker_service
+    from app.services.nlp_service import NLPService
+    _worker_service = NLPService()
+
+
+def _worker_ready() -> bool:
+    """Tarea vacía usada para forzar el arranque de los trabajadores"""
+    return _worker_service is not None
+
+
+def _extract_entities_batch(texts: List[str]) -> List[Dict[str, List[Dict]]]:
+    """Extrae las entidades de un lote de textos dentro del proceso trabajador"""
+    return [_worker_service.extract_entities_sync(text) for text in texts]
+
+
+def _extract_chunk_entities_batch(texts: List[str]) -> List[Tuple[Dict[str, List[Dict]], Dict[str, List[int]]]]:
+    """Extrae las entidades (con el final de cada grupo) de un lote de fragmentos de texto"""
+    return [_worker_service._extract_chunk_entities(text) for text in texts]
+
+
+class BatchThroughput:
+    """Rendimiento de una extracción por lotes: documentos y caracteres por segundo"""
+
+    def __init__(self):
+        self.documents = 0
+        self.characters = 0
+        self.elapsed = 0.0
+        self._started: Optional[float] = None
+
+    def start(self):
+        self._started = time.perf_counter()
+
+    def add(self, characters: int):
+        self.documents += 1
+        self.characters += characters
+
+    def stop(self):
+        if self._started is not None:
+            self.elapsed += time.perf_counter() - self._started
+            self._started = None
+
+    @property
+    def seconds(self) -> float:
+        running = time.perf_counter() - self._started if self._started is not None else 0.0
+        return self.elapsed + running
+
+    @property
+    def documents_per_second(self) -> float:
+        return self.documents / self.seconds if self.seconds else 0.0
+
+    @property
+    def characters_per_second(self) -> float:
+        return self.characters / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "documents": self.documents,
+            "characters": self.characters,
+            "seconds": round(self.seconds, 3),
+            "documents_per_second": round(self.documents_per_second, 2),
+            "characters_per_second": round(self.characters_per_second, 1),
+        }
+
+
+class NLPProcessPool:
+    """Pool de procesos para repartir la extracción de entidades entre varios núcleos"""
+
+    def __init__(self, workers: int = 2):
+        if workers < 1:
+            raise ValueError("El número de trabajadores NLP debe ser al menos 1")
+        self.workers = workers
+        self._executor = self._new_executor()
+        self._executor_lock = threading.Lock()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    def _replace_broken(self, broken: ProcessPoolExecutor):
+        """
+        Sustituye el pool roto por uno nuevo. Varias peticiones concurrentes pueden ver el mismo
+        pool roto: solo la primera lo sustituye (las demás encuentran ya el nuevo)
+        """
+        with self._executor_lock:
+            if self._executor is not broken:
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+
+    def warm_up(self):
+        """Arranca los procesos trabajadores antes de la primera petición"""
+        futures = [self._executor.submit(_worker_ready) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def extract_entities(self, texts: Iterable[str], batch_size: int = 1) -> Iterator[Dict[str, List[Dict]]]:
+        """
+        Extrae las entidades de cada texto en paralelo
+
+        Args:
+            texts: Textos (o fragmentos) a procesar; se consumen a medida que hay hueco
+            batch_size: Textos por tarea enviada a un trabajador
+
+        Returns:
+            Iterador con las entidades de cada texto, en el mismo orden que `texts`
+        """
+        return self._map(_extract_entities_batch, texts, batch_size)
+
+    def extract_chunk_entities(self, texts: Iterable[str], batch_size: int = 1) -> Iterator[Tuple[Dict, Dict]]:
+        """Como `extract_entities` para fragmentos de un texto: (entidades, final de cada grupo) de cada uno"""
+        return self._map(_extract_chunk_entities_batch, texts, batch_size)
+
+    def _map(self, batch_function: Callable[[List[str]], List[Any]], texts: Iterable[str],
+             batch_size: int) -> Iterator[Any]:
+        """Aplica una función de lotes del trabajador a los textos, en orden y con lotes en curso acotados"""
+        remaining = iter(texts)
+        pending: Deque[Future] = deque()
+        executor = self._executor
+
+        def submit_next() -> bool:
+            batch = list(islice(remaining, batch_size))
+            if batch:
+                pending.append(executor.submit(batch_function, batch))
+            return bool(batch)
+
+        try:
+            # Como mucho dos lotes en curso por trabajador: no se lee toda la entrada de golpe
+            while len(pending) < self.workers * 2 and submit_next():
+                pass
+            while pending:
+                results = pending.popleft().result()
+                submit_next()
+                yield from results
+        except BrokenProcessPool:
+            # Un trabajador murió (p. ej. sin memoria): sustituir el pool para las siguientes peticiones
+            self._replace_broken(executor)
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
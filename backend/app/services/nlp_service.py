@@ -3,13 +3,433 @@ Servicio de NLP para extracción de entidades y detección de tipo de documento
 Versión mejorada y más estricta para evitar falsos positivos.
 """
 import re
-from typing import Dict, List, Optional
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.services.chunked_extraction import merge_chunk_entities, plan_chunks
+from app.services.document_sections import SectionIndex, find_sections, index_sections
+from app.services.keyword_scanner import KeywordScanner, PatternSetMatcher
+from app.services.nlp_process_pool import BatchThroughput, NLPProcessPool
+from app.services.normalized_text import NormalizedDocument, fold_pattern, fold_text
+from app.services.rom_index import side_of
+from app.services.span_patterns import LazySpanPattern
+
+
+def _compile_all(patterns: List[str], flags: int) -> List[re.Pattern]:
+    return [re.compile(pattern, flags) for pattern in patterns]
 
 
 class NLPService:
     """Servicio para procesamiento de lenguaje natural"""
     
-    def __init__(self):
+    # Palabras clave para documentos judiciales
+    JUDICIAL_KEYWORDS = [
+        "sentencia", "juzgado", "tribunal", "magistrado", "juez",
+        "hechos probados", "fundamentos de derecho", "fallo",
+        "recurso", "apelación", "procedimiento", "sala de lo social",
+        "contencioso-administrativo", "suplicación"
+    ]
+    
+    # Palabras clave para documentos administrativos
+    ADMINISTRATIVE_KEYWORDS = [
+        "resolución", "administración", "director general", "secretario general",
+        "determina que", "resuelve", "dispone", "anexo", "baremo",
+        "grado de discapacidad", "reconocimiento del grado", "consejería de",
+        "departamento de", "centro de valoración"
+    ]
+    
+    # Palabras clave para documentos clínicos
+    CLINICAL_KEYWORDS = [
+        "informe médico", "informe pericial", "diagnóstico", "exploración",
+        "paciente", "historia clínica", "examen físico", "pruebas complementarias",
+        "antecedentes personales", "enfermedad actual", "juicio clínico",
+        "evolución", "tratamiento"
+    ]
+    
+    KEYWORD_SCANNER = KeywordScanner(JUDICIAL_KEYWORDS + ADMINISTRATIVE_KEYWORDS + CLINICAL_KEYWORDS, folded=True)
+    
+    # ==============================================================================
+    # LISTA BLANCA DE DIAGNÓSTICOS VÁLIDOS (Ampliada y más específica)
+    # ==============================================================================
+    # Esta es la fuente principal de verdad. Se prefieren diagnósticos completos.
+    DIAGNOSIS_WHITELIST = [
+        # Sistema Musculoesquelético - Hombro
+        r"rotura\s+(?:del|de la|de)\s+manguito\s+rotador",
+        r"lesión\s+(?:del|de la|de)\s+manguito\s+rotador",
+        r"tendinopatía\s+(?:del|de la|de)\s+manguito\s+rotador",
+        r"tendinitis\s+(?:del|de la|de)\s+manguito\s+rotador",
+        r"síndrome\s+(?:del|de la|de)\s+hombro\s+doloroso",
+        r"capsulitis\s+adhesiva(?:\s+de\s+hombro)?",
+        r"hombro\s+congelado",
+        r"omalgia(?:\s+crónica)?",
+        r"luxación\s+(?:del|de la|de)\s+hombro",
+        r"luxación\s+acromioclavicular",
+        r"artrosis\s+(?:del|de la|de)\s+hombro",
+        r"artrosis\s+acromioclavicular",
+        r"bursitis\s+subacromial",
+        r"impingement\s+(?:subacromial|de hombro)",
+    
+        # Sistema Musculoesquelético - Codo, Muñeca, Mano
+        r"epicondilitis",
+        r"epitrocleitis",
+        r"síndrome\s+del\s+túnel\s+carpiano",
+        r"artrosis\s+(?:de|del)\s+codo",
+        r"artrosis\s+(?:de|de la)\s+muñeca",
+        r"rizartrosis",
+        r"dedo\s+en\s+resorte",
+        r"enfermedad\s+de\s+duputyren",
+    
+        # Sistema Musculoesquelético - Columna Vertebral
+        r"cervicalgia(?:\s+crónica)?",
+        r"dorsalgia(?:\s+crónica)?",
+        r"lumbalgia(?:\s+crónica)?",
+        r"lumbago",
+        r"cervicobraquialgia",
+        r"lumbociatalgia",
+        r"ciática",
+        r"hernia\s+discal\s+(?:cervical|dorsal|lumbar)",
+        r"protrusión\s+discal\s+(?:cervical|dorsal|lumbar)",
+        r"espondilosis\s+(?:cervical|dorsal|lumbar)",
+        r"espondiloartrosis\s+(?:cervical|dorsal|lumbar)",
+        r"estenosis\s+de\s+canal\s+(?:cervical|lumbar)",
+        r"escoliosis",
+        r"cifosis",
+        r"lordosis",
+    
+        # Sistema Musculoesquelético - Cadera, Rodilla
+        r"coxartrosis",
+        r"artrosis\s+de\s+cadera",
+        r"gonartrosis",
+        r"artrosis\s+de\s+rodilla",
+        r"rotura\s+de\s+menisco",
+        r"rotura\s+de\s+ligamento\s+cruzado\s+(?:anterior|posterior)",
+        r"condropatía\s+rotuliana",
+        r"trocanteritis",
+    
+        # Sistema Musculoesquelético - Tobillo, Pie
+        r"síndrome\s+del\s+tarso",
+        r"síndrome\s+del\s+seno\s+del\s+tarso",
+        r"esguince\s+de\s+tobillo(?:\s+crónico)?",
+        r"inestabilidad\s+de\s+tobillo",
+        r"artrosis\s+de\s+tobillo",
+        r"tendinopatía\s+de\s+aquiles",
+        r"tendinitis\s+aquílea",
+        r"fascitis\s+plantar",
+        r"espolón\s+calcáneo",
+        r"hallux\s+valgus",
+        r"pie\s+plano",
+        r"pie\s+cavo",
+        r"metatarsalgia",
+    
+        # Sistema Musculoesquelético - General/Otros
+        r"fibromialgia",
+        r"síndrome\s+de\s+fatiga\s+crónica",
+        r"osteoporosis",
+        r"artritis\s+reumatoide",
+        r"espondilitis\s+anquilosante",
+        r"lupus\s+eritematoso\s+sistémico",
+        r"polimialgia\s+reumática",
+        r"contractura\s+muscular(?:\s+crónica)?",
+        r"amiotrofia\s+muscular",
+        r"discinesia\s+escapular",
+    
+        # Sistema Cardiovascular
+        r"hipertensión\s+arterial",
+        r"hta",
+        r"insuficiencia\s+cardíaca",
+        r"cardiopatía\s+isquémica",
+        r"infarto\s+agudo\s+de\s+miocardio",
+        r"angina\s+de\s+pecho",
+        r"arritmia\s+cardíaca",
+        r"fibrilación\s+auricular",
+        r"valvulopatía",
+        r"insuficiencia\s+venosa\s+crónica",
+        r"varices",
+        r"trombosis\s+venosa\s+profunda",
+        r"arteriopatía\s+periférica",
+    
+        # Sistema Respiratorio
+        r"epoc",
+        r"enfermedad\s+pulmonar\s+obstructiva\s+crónica",
+        r"asma\s+bronquial",
+        r"síndrome\s+de\s+apnea\s+hipopnea\s+obstructiva\s+del\s+sueño",
+        r"síndrome\s+de\s+apnea\s+hipopnea\s+del\s+sueño",
+        r"sahs",
+        r"apnea\s+del\s+sueño",
+    
+        # Sistema Nervioso
+        r"accidente\s+cerebrovascular",
+        r"ictus",
+        r"epilepsia",
+        r"migraña(?:\s+crónica)?",
+        r"cefalea\s+tensional",
+        r"esclerosis\s+múltiple",
+        r"parkinson",
+        r"alzheimer",
+        r"neuropatía\s+periférica",
+        r"radiculopatía",
+    
+        # Trastornos Mentales
+        r"trastorno\s+depresivo(?:\s+mayor)?",
+        r"depresión\s+mayor",
+        r"distimia",
+        r"trastorno\s+de\s+ansiedad(?:\s+generalizada)?",
+        r"ansiedad\s+generalizada",
+        r"síndrome\s+ansioso\s+depresivo",
+        r"trastorno\s+mixto\s+ansioso\s+depresivo",
+        r"trastorno\s+de\s+estrés\s+postraumático",
+        r"\btept\b",
+        r"trastorno\s+obsesivo\s+compulsivo",
+        r"\btoc\b",
+        r"trastorno\s+bipolar",
+        r"esquizofrenia",
+        r"trastorno\s+de\s+la\s+personalidad",
+        r"trastorno\s+adaptativo(?:\s+con\s+ansiedad)?",
+        r"trastorno\s+adaptativo\s+con\s+ansiedad",
+    
+        # Sistema Digestivo
+        r"enfermedad\s+por\s+reflujo\s+gastroesofágico",
+        r"erge",
+        r"gastritis\s+crónica",
+        r"úlcera\s+péptica",
+        r"enfermedad\s+inflamatoria\s+intestinal",
+        r"enfermedad\s+de\s+crohn",
+        r"colitis\s+ulcerosa",
+        r"síndrome\s+del\s+intestino\s+irritable",
+        r"colon\s+irritable",
+        r"hepatopatía\s+crónica",
+        r"cirrosis\s+hepática",
+    
+        # Sistema Endocrino y Metabólico
+        r"diabetes\s+mellitus(?:\s+tipo\s+[12])?",
+        r"hipotiroidismo",
+        r"hipertiroidismo",
+        r"obesidad(?:\s+mórbida)?",
+        r"dislipemia",
+        r"hipercolesterolemia",
+    
+        # Otros
+        r"anemia\s+ferropénica",
+        r"anemia\s+crónica",
+        r"insuficiencia\s+renal\s+crónica",
+        r"dermatitis\s+atópica",
+        r"psoriasis",
+        r"hipoacusia",
+        r"vértigo",
+        r"mareo\s+subjetivo\s+crónico",
+        r"mareo\s+postural\s+perceptivo\s+persistente",
+        r"vestibulopatía\s+bilateral(?:\s+no\s+compensada)?",
+        r"cofosis",
+        r"implante\s+coclear",
+        r"acúfenos",
+        r"tinnitus",
+        r"glaucoma",
+        r"cataratas",
+        r"degeneración\s+macular",
+    
+    ]
+    
+    # Todos los patrones de la lista blanca se buscan en una sola pasada sobre el texto
+    WHITELIST_MATCHER = PatternSetMatcher(
+        list(dict.fromkeys(fold_pattern(pattern) for pattern in DIAGNOSIS_WHITELIST)), re.IGNORECASE | re.MULTILINE
+    )
+    
+    # Cola "diagnóstico: X" de los patrones ancla … diagnóstico
+    DIAGNOSIS_TAIL = r"(?:diagnóstico|diagnostico|con\s+diagnóstico|con\s+diagnostico)[\s:]+(?:de\s+)?([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,100})(?:[\.;,\n]|$)"
+    DIAGNOSIS_TAIL_PREFIX = r"diagn[óo]stico|con\s"
+    
+    # Patrones más restrictivos para capturar diagnósticos después de palabras clave
+    # Los tramos perezosos "ancla … diagnóstico" se buscan sin retroceso cuadrático (LazySpanPattern)
+    DIAGNOSIS_PATTERNS = [
+        # Solo después de palabras clave médicas específicas y delimitado
+        re.compile(r"(?:diagnóstico|diagnostico|juicio clínico|orientación diagnóstica)[\s:]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,]{5,100})(?:[\.;:\n]|$)", re.IGNORECASE | re.MULTILINE),
+        re.compile(r"(?:patología|patologia|enfermedad)[\s:]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,]{5,100})(?:[\.;:\n]|$)", re.IGNORECASE | re.MULTILINE),
+        # Secciones de conclusiones o antecedentes
+        LazySpanPattern(r"(?:conclusiones|consideraciones médico-legales)[\s:]",
+                           r"presenta\s+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,]{5,100})(?:[\.;:\n]|$)", r"presenta\s"),
+        # Hechos probados en sentencias (formato con guiones o numeración)
+        LazySpanPattern(r"(?:hechos\s+probados|cuadro\s+clínico|presenta\s+el\s+siguiente)[\s:]",
+                           r"[-•]\s*([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,150})(?:[\.;:\n]|$)", r"[-•]"),
+        LazySpanPattern(r"(?:SEXTO|SÉPTIMO|OCTAVO|NOVENO|DÉCIMO)[\.-]+\s*",
+                           r"[-•]\s*([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,150})(?:[\.;:\n]|$)", r"[-•]"),
+        # Listas con guiones o viñetas
+        re.compile(r"^[-•]\s*([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,150})(?:[\.;:\n]|$)", re.IGNORECASE | re.MULTILINE),
+        # Diagnósticos en hechos probados (formato narrativo)
+        LazySpanPattern(r"(?:hechos\s+probados|hecho\s+probado)[\s:]",
+                           DIAGNOSIS_TAIL, DIAGNOSIS_TAIL_PREFIX, max_gap=500),
+        # Diagnósticos mencionados en contexto de incapacidad/enfermedad
+        LazySpanPattern(r"(?:incapacidad|enfermedad|proceso)[\s:]+",
+                           DIAGNOSIS_TAIL, DIAGNOSIS_TAIL_PREFIX, max_gap=200),
+    ]
+    
+    # Listas con guiones o viñetas (hechos probados)
+    LIST_PATTERN = re.compile(r"(?:^|\n)\s*[-•]\s*([A-ZÁÉÍÓÚÑ][^\.\n]{10,150})(?:\.|$|\n)", re.MULTILINE)
+    
+    # Diagnósticos en hechos probados (formato narrativo)
+    # Ejemplo: "con diagnóstico de Dolor en el tobillo"
+    HECHOS_NARRATIVO_PATTERNS = [
+        re.compile(r"(?:con\s+diagnóstico|diagnóstico|diagnostico)[\s:]+(?:de\s+)?([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,100})(?:[\.;,\n]|$)", re.IGNORECASE | re.MULTILINE),
+        LazySpanPattern(r"(?:proceso|enfermedad|incapacidad)[\s:]+",
+                           r"(?:con\s+diagnóstico|diagnóstico|diagnostico)[\s:]+(?:de\s+)?([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,100})(?:[\.;,\n]|$)",
+                           DIAGNOSIS_TAIL_PREFIX, max_gap=100),
+    ]
+    
+    # Frases que indican el fin del diagnóstico
+    # Ejemplo: "Dolor en el tobillo, en relación al cual" -> "Dolor en el tobillo"
+    CUTOFF_PHRASES = _compile_all([
+        r",\s*en\s+relaci[óo]n\s+al\s+cual",
+        r",\s*en\s+relaci[óo]n\s+con",
+        r",\s*por\s+el\s+cual",
+        r",\s*por\s+lo\s+cual",
+        r",\s*siendo",
+        r",\s*que\s+",
+        r",\s*el\s+cual",
+        r",\s*la\s+cual",
+    ], re.IGNORECASE)
+    
+    # Movimientos articulares del Anexo III (con su calificativo, si lo tienen)
+    MOVEMENTS = (r"(?:abducción|aducción|flexión(?:\s+(?:dorsal|plantar))?|extensión|rotación(?:\s+(?:interna|externa))?"
+                 r"|pronación|supinación|inclinación(?:\s+lateral)?|desviación\s+(?:radial|cubital)"
+                 r"|balance\s+articular|movilidad)")
+    
+    # Métricas (grados, porcentajes)
+    METRIC_PATTERNS = _compile_all([
+        r"(\d+(?:\.\d+)?)\s*°\s*(?:de\s+)?" + MOVEMENTS,
+        MOVEMENTS + r"[\s:]+(\d+(?:\.\d+)?)\s*°",
+        r"(\d+(?:\.\d+)?)\s*%\s*(?:de\s+)?(?:pérdida|déficit|limitación)",
+        r"(?:balance\s+muscular)[\s:]+(\d)(?:/5)?", # Balance muscular (ej: 2/5)
+    ], re.IGNORECASE)
+    
+    # Caracteres antes de una métrica en los que se busca su lateralidad y parte del cuerpo (dentro de la misma frase)
+    METRIC_SIDE_CONTEXT = 80
+    # Parte del cuerpo de una métrica (ej: "codo: extensión 10°"); "dorsal" de "flexión dorsal" es un movimiento
+    METRIC_BODY_PART = re.compile(
+        r"\b(hombro|codo|mu[ñn]eca|mano|cadera|rodilla|tobillo|pie|tarso|columna|cervical|lumbar"
+        r"|(?<!flexión )(?<!flexion )dorsal)(?:e?s)?\b"
+    )
+    
+    # Primera clave presente en el texto de la métrica (los movimientos calificados antes que el genérico)
+    METRIC_TYPES = {
+        "abducción": "abduccion",
+        "aducción": "aduccion",
+        "flexión dorsal": "flexion_dorsal",
+        "flexión plantar": "flexion_plantar",
+        "flexión": "flexion",
+        "extensión": "extension",
+        "rotación interna": "rotacion_interna",
+        "rotación externa": "rotacion_externa",
+        "rotación": "rotacion",
+        "pronación": "pronacion",
+        "supinación": "supinacion",
+        "inclinación": "inclinacion_lateral",
+        "desviación radial": "desviacion_radial",
+        "desviación cubital": "desviacion_cubital",
+        "balance articular": "rom_global",
+        "movilidad": "rom_global",
+        "balance muscular": "fuerza"
+    }
+    
+    # Códigos (CIE-10)
+    CODE_PATTERNS = _compile_all([
+        r"(?:CIE[- ]?10|CIE10|Código)[\s:]+([A-Z]\d{2}(?:\.\d{1,2})?)",
+        r"([A-Z]\d{2}(?:\.\d{1,2})?)\s*(?:CIE|CIE-10)",
+    ], re.IGNORECASE)
+    
+    # Valoraciones (porcentajes de discapacidad ya otorgados)
+    RATING_PATTERNS = _compile_all([
+        r"(?:grado|porcentaje|valoración)[\s:]+(?:de\s+)?(?:discapacidad|minusvalía)?[\s:]+(\d+(?:\.\d+)?)\s*%",
+        r"(\d+(?:\.\d+)?)\s*%\s*(?:de\s+)?(?:discapacidad|minusvalía|deficiencia\s+global)",
+        r"(?:reconocimiento|reconocido|tiene\s+reconocido)[\s:]+(?:por\s+)?(?:la\s+)?(?:Junta|Administración|Gobierno)?[\s:]+(?:un\s+)?(?:grado|porcentaje)[\s:]+(?:de\s+)?(?:discapacidad|minusvalía)[\s:]+(?:del\s+)?(\d+(?:\.\d+)?)\s*%",
+        r"(?:grado\s+de\s+discapacidad\s+del\s+)(\d+(?:\.\d+)?)\s*%",
+        r"baremo\s+(\d+(?:\.\d+)?)",
+        # Movilidad reducida
+        r"(?:movilidad\s+reducida|movilidad\s+valorada)[\s:]+(?:en\s+)?(\d+(?:\.\d+)?)\s*(?:puntos?|%)",
+        # Situación de dependencia
+        r"(?:situación\s+de\s+dependencia|grado\s+de\s+dependencia)[\s:]+(?:en\s+)?(?:grado\s+)?(\d+)",
+    ], re.IGNORECASE)
+    
+    # Palabras/frases que invalidan un diagnóstico (más exhaustivo)
+    INVALID_PHRASES = [
+        "urgencias", "hospital", "clínica", "centro de salud", "consulta", 
+        "doctor", "doctora", "dr.", "dra.", "colegiado", "especialista",
+        "pendiente de", "nuevas consultas", "pruebas", "tratamiento",
+        "limitaciones que", "las limitaciones", "que presentaba", "refiere",
+        "declaración del perito", "informe", "valoración", "paciente",
+        "trabajadora", "trabajador", "interesado", "solicitante",
+        "fecha", "edad", "años", "profesión", "mecanismo", "evolución",
+        "antecedentes", "historia", "exploración", "situación actual",
+        "pronóstico", "secuelas", "en su caso", "posible", "probable",
+        "descartar", "compatible con", "sugerente de",
+        "baremo", "anexo", "capítulo", "artículo", "rd 888", "real decreto",
+        "grado", "discapacidad", "deficiencia", "clase", "porcentaje",
+        "cálculo", "fórmula", "combinación", "puntos",
+        "de tipo", "tipo de", "tipo", "general", "ósea", "crónica",
+        "sin", "no", "ausencia de", "normal", "conservada"
+    ]
+    
+    # Patrones que invalidan un diagnóstico (al inicio)
+    INVALID_PATTERNS = [
+        r"^(?:el\s+|la\s+|los\s+|las\s+|un\s+|una\s+)?(?:paciente|trabajador|interesado|solicitante)",
+        r"^(?:en\s+|a\s+|de\s+|con\s+|por\s+)?(?:fecha|edad|profesión|mecanismo|evolución)",
+        r"^(?:se\s+)?(?:solicita|realiza|aprecia|observa|constata|refiere)",
+        r"^(?:pendiente\s+de|compatible\s+con|sugerente\s+de|descartar)",
+        r"^(?:sin|no\s+se\s+aprecia|ausencia\s+de|normal|conservada)",
+        r"^(?:baremo|anexo|capítulo|artículo|rd\s*888|real\s+decreto)",
+        r"^(?:grado|discapacidad|deficiencia|clase\s+\d|porcentaje)",
+        r"^(?:cálculo|fórmula|combinación|puntos)",
+        r"^(?:de\s+tipo|tipo\s+de|tipo|general|ósea|crónica)$",
+        r"^[a-z]{1,3}$", # Palabras muy cortas
+        r"^\d", # Empieza por número
+    ]
+    
+    # Términos médicos fuertes: muy específicos de enfermedades, no de síntomas o anatomía general
+    STRONG_MEDICAL_TERMS = [
+        "síndrome", "sindrome", "tendinopatía", "tendinopatia", "tendinitis",
+        "artrosis", "artritis", "anemia", "hipertensión", "hipertension",
+        "gastroduodenitis", "gastritis", "lumbociatalgia", "cervicobraquialgia",
+        "cervicalgia", "dorsalgia", "lumbalgia", "ciática",
+        "hernia", "protrusión", "espondilosis", "estenosis", "escoliosis",
+        "rotura", "fractura", "luxación", "esguince", "bursitis", "capsulitis",
+        "epicondilitis", "epitrocleitis", "neuropatía", "radiculopatía",
+        "fibromialgia", "osteoporosis", "espondilitis",
+        "insuficiencia", "cardiopatía", "infarto", "angina", "arritmia",
+        "fibrilación", "valvulopatía", "varices", "trombosis", "arteriopatía",
+        "epoc", "asma", "apnea",
+        "ictus", "epilepsia", "migraña", "esclerosis", "parkinson", "alzheimer",
+        "trastorno", "depresión", "depresion", "ansiedad", "distimia",
+        "esquizofrenia", "bipolar",
+        "diabetes", "hipotiroidismo", "hipertiroidismo", "obesidad", "dislipemia",
+        "dermatitis", "psoriasis", "hipoacusia", "vértigo", "mareo", "vestibulopatía",
+        "cofosis", "implante", "coclear", "glaucoma", "cataratas",
+        "limitación", "movilidad", "adaptativo"
+    ]
+    
+    # Dolor/síntoma + parte del cuerpo (ejemplo: "Dolor en el tobillo", "Dolor lumbar")
+    SYMPTOM_BODY_PATTERN = re.compile(r"(?:dolor|dolores|limitación|limitaciones|deficiencia|deficiencias|lesión|lesiones)\s+(?:en|de|del|de la|del|en el|en la)\s+(?:el|la|los|las)?\s*(?:hombro|codo|muñeca|mano|dedo|cadera|rodilla|tobillo|pie|tarso|cervical|dorsal|lumbar|columna)", re.IGNORECASE)
+    
+    # Palabras anatómicas o vagas que por sí solas no son un diagnóstico
+    VAGUE_SINGLE_WORDS = {"lumbar", "cervical", "dorsal", "ósea", "osea", "óseo", "oseo",
+                          "psiquiátrico", "psiquiatrico", "psiquiátrica", "psiquiatrica",
+                          "crónico", "cronico", "crónica", "cronica", "tipo", "general",
+                          "hombro", "codo", "muñeca", "mano", "cadera", "rodilla", "tobillo", "pie"}
+    
+    # Cada lista se comprueba con una única expresión compilada (mismo resultado que probar
+    # los elementos uno a uno: una alternancia coincide si coincide alguna de sus ramas)
+    INVALID_START = re.compile("|".join(f"(?:{pattern})" for pattern in INVALID_PATTERNS), re.IGNORECASE)
+    INVALID_PHRASE = re.compile(r"\b(?:" + "|".join(re.escape(phrase) for phrase in INVALID_PHRASES) + r")\b")
+    STRONG_MEDICAL_TERM = re.compile(r"\b(?:" + "|".join(re.escape(term) for term in STRONG_MEDICAL_TERMS) + r")\b")
+    
+    # Textos por tarea enviada al pool en la extracción por lotes (reparte el coste de cada envío)
+    BATCH_TASK_SIZE = 8
+    
+    def __init__(self, process_pool: Optional[NLPProcessPool] = None,
+                 chunk_chars: int = 0, chunk_overlap: int = 2000):
+        # Extracción por fragmentos de textos de más de `chunk_chars` caracteres (0: desactivada)
+        self.chunk_chars = chunk_chars
+        self.chunk_overlap = chunk_overlap
+        # Pool de procesos para extraer los fragmentos en paralelo (opcional)
+        self.process_pool = process_pool
         # Mapeo de abreviaciones médicas a nombres completos
         self.abbreviation_expansion = {
             "toc": "trastorno obsesivo-compulsivo",
@@ -26,46 +446,33 @@ class NLPService:
             "acv": "accidente cerebrovascular",
         }
     
-    async def detect_document_type(self, text: str) -> str:
+    @staticmethod
+    def _normalized(text: str, document: Optional[NormalizedDocument]) -> NormalizedDocument:
+        """Documento normalizado recibido si corresponde a este texto; si no, se construye"""
+        if document is not None and (document.original is text or document.original == text):
+            return document
+        return NormalizedDocument(text)
+    
+    async def detect_document_type(self, text: str, document: Optional[NormalizedDocument] = None) -> str:
         """
         Detecta el tipo de documento basándose en palabras clave
         
         Args:
             text: Texto del documento
+            document: Texto ya normalizado, compartido con `extract_entities` (se ignora si es de otro texto)
         
         Returns:
             Tipo de documento: 'clinical', 'judicial', o 'administrative'
         """
-        text_lower = text.lower()
-        
-        # Palabras clave para documentos judiciales
-        judicial_keywords = [
-            "sentencia", "juzgado", "tribunal", "magistrado", "juez",
-            "hechos probados", "fundamentos de derecho", "fallo",
-            "recurso", "apelación", "procedimiento", "sala de lo social",
-            "contencioso-administrativo", "suplicación"
-        ]
-        
-        # Palabras clave para documentos administrativos
-        administrative_keywords = [
-            "resolución", "administración", "director general", "secretario general",
-            "determina que", "resuelve", "dispone", "anexo", "baremo",
-            "grado de discapacidad", "reconocimiento del grado", "consejería de",
-            "departamento de", "centro de valoración"
-        ]
-        
-        # Palabras clave para documentos clínicos
-        clinical_keywords = [
-            "informe médico", "informe pericial", "diagnóstico", "exploración",
-            "paciente", "historia clínica", "examen físico", "pruebas complementarias",
-            "antecedentes personales", "enfermedad actual", "juicio clínico",
-            "evolución", "tratamiento"
-        ]
-        
-        # Contar ocurrencias
-        judicial_count = sum(1 for keyword in judicial_keywords if keyword in text_lower)
-        administrative_count = sum(1 for keyword in administrative_keywords if keyword in text_lower)
-        clinical_count = sum(1 for keyword in clinical_keywords if keyword in text_lower)
+        return self.detect_document_type_sync(text, document)
+    
+    def detect_document_type_sync(self, text: str, document: Optional[NormalizedDocument] = None) -> str:
+        """Parte síncrona de `detect_document_type` (la ejecuta el pipeline en un hilo de trabajo)"""
+        # Contar ocurrencias (todas las listas en una sola pasada)
+        hits = self.KEYWORD_SCANNER.scan(self._normalized(text, document).text)
+        judicial_count = len(hits.found(self.JUDICIAL_KEYWORDS))
+        administrative_count = len(hits.found(self.ADMINISTRATIVE_KEYWORDS))
+        clinical_count = len(hits.found(self.CLINICAL_KEYWORDS))
         
         # Determinar tipo basado en el mayor conteo
         if judicial_count > administrative_count and judicial_count > clinical_count:
@@ -75,16 +482,190 @@ class NLPService:
         else:
             return "clinical"
     
-    async def extract_entities(self, text: str) -> Dict[str, List[Dict]]:
+    async def segment_document(self, text: str, doc_type: Optional[str] = None,
+                               page_offsets: Optional[Sequence[int]] = None) -> SectionIndex:
+        """
+        Segmenta el documento en secciones (hechos probados, fundamentos de derecho, fallo,
+        conclusiones, juicio clínico). El índice se calcula en una sola pasada y se memoriza
+        por hash del texto; puede pasarse a `extract_entities` para no recalcularlo.
+        
+        Args:
+            text: Texto del documento
+            doc_type: Tipo de documento (los encabezados reconocidos son los mismos para todos)
+            page_offsets: Inicio de cada página en el texto (ver `page_starts`)
+        
+        Returns:
+            Índice de secciones (nombre, inicio, fin y página de cada una)
+        """
+        return index_sections(text, page_offsets)
+    
+    @classmethod
+    @lru_cache(maxsize=8192)
+    def is_valid_diagnosis(cls, text: str) -> bool:
+        """
+        Verifica si un texto es un diagnóstico médico válido (versión estricta).
+        El resultado solo depende del texto candidato, por lo que se memoriza.
+        """
+        text_lower = text.lower().strip()
+        
+        # 1. Longitud mínima y máxima
+        if len(text) < 5 or len(text) > 150:
+            return False
+        
+        # 2. Validar contra patrones inválidos al inicio
+        if cls.INVALID_START.match(text_lower):
+            return False
+        
+        # 3. Validar contra frases inválidas en cualquier parte
+        # (la frase debe ser una palabra completa o estar delimitada)
+        if cls.INVALID_PHRASE.search(text_lower):
+            return False
+        
+        # 4. Debe contener al menos un término médico fuerte, o dolor/síntoma + parte del cuerpo
+        has_strong_term = cls.STRONG_MEDICAL_TERM.search(text_lower) is not None
+        has_symptom_body = bool(cls.SYMPTOM_BODY_PATTERN.search(text_lower))
+        
+        if not has_strong_term and not has_symptom_body:
+            return False
+        
+        # 5. No debe ser solo una palabra anatómica o vaga (pero permitir si tiene contexto)
+        if len(text.split()) == 1 and text_lower in cls.VAGUE_SINGLE_WORDS:
+            return False
+        
+        return True
+    
+    async def extract_entities(self, text: str, doc_type: Optional[str] = None,
+                               segments: Optional[SectionIndex] = None,
+                               document: Optional[NormalizedDocument] = None) -> Dict[str, List[Dict]]:
         """
         Extrae entidades del texto (diagnósticos, métricas, códigos, valoraciones)
         
         Args:
             text: Texto del documento
+            doc_type: Tipo de documento (opcional)
+            segments: Índice de secciones de `segment_document` (se ignora si es de otro texto)
+            document: Texto ya normalizado (se ignora si es de otro texto; en la extracción por
+                fragmentos cada fragmento normaliza solo su tramo)
         
         Returns:
             Diccionario con entidades por tipo
         """
+        return self.extract_entities_sync(text, segments, document)
+    
+    def extract_entities_sync(self, text: str, segments: Optional[SectionIndex] = None,
+                              document: Optional[NormalizedDocument] = None) -> Dict[str, List[Dict]]:
+        """Parte síncrona de `extract_entities` (la usan el pipeline y la extracción por lotes)"""
+        if segments is None or not segments.indexes(text):
+            segments = index_sections(text)
+        if self.chunk_chars and len(text) > self.chunk_chars:
+            return self._extract_entities_chunked(text, segments)
+        if self.process_pool is not None:
+            # Las expresiones regulares retienen el GIL: con pool, el documento se procesa fuera
+            # del proceso del servidor (el trabajador recalcula secciones y texto normalizado)
+            return next(self.process_pool.extract_entities([text]))
+        return self._extract_entities_single(text, segments, self._normalized(text, document))
+    
+    def extract_entities_batch(self, texts: Iterable[str], workers: Optional[int] = None,
+                               throughput: Optional[BatchThroughput] = None) -> Iterator[Dict[str, List[Dict]]]:
+        """
+        Extrae las entidades de muchos textos, devolviendo los resultados a medida que están listos
+        
+        Los patrones compilados se comparten: en modo secuencial se reutiliza este servicio y en
+        paralelo cada proceso trabajador crea el suyo una sola vez.
+        
+        Args:
+            texts: Textos a procesar (puede ser un generador; se consume de forma incremental)
+            workers: Procesos trabajadores (None: el pool del servicio si lo hay; 0: secuencial)
+            throughput: Acumulador opcional de documentos/caracteres por segundo
+        
+        Returns:
+            Iterador con las entidades de cada texto, en el mismo orden que `texts`
+        """
+        throughput = throughput if throughput is not None else BatchThroughput()
+        lengths = deque()
+        
+        def counted(items: Iterable[str]) -> Iterator[str]:
+            for text in items:
+                lengths.append(len(text))
+                yield text
+        
+        pool, own_pool = self.process_pool, False
+        if workers is not None:
+            pool = NLPProcessPool(workers=workers) if workers > 0 else None
+            own_pool = pool is not None
+        if pool is not None:
+            results = pool.extract_entities(counted(texts), batch_size=self.BATCH_TASK_SIZE)
+        else:
+            results = (self.extract_entities_sync(text) for text in counted(texts))
+        
+        throughput.start()
+        try:
+            for entities in results:
+                throughput.add(lengths.popleft())
+                yield entities
+        finally:
+            throughput.stop()
+            if own_pool:
+                pool.shutdown()
+    
+    def _extract_entities_chunked(self, text: str, segments: SectionIndex) -> Dict[str, List[Dict]]:
+        """
+        Extracción por fragmentos (fronteras de página/sección, con solapamiento), en el pool
+        de procesos si lo hay. Las posiciones se trasladan al texto completo y las entidades
+        del solapamiento se deduplican (ver chunked_extraction).
+        """
+        chunks = plan_chunks(text, self.chunk_chars, self.chunk_overlap, segments.sections)
+        chunk_texts = (text[chunk.start:chunk.end] for chunk in chunks)
+        if self.process_pool is not None:
+            chunk_results = self.process_pool.extract_chunk_entities(chunk_texts)
+        else:
+            chunk_results = [self._extract_chunk_entities(chunk_text) for chunk_text in chunk_texts]
+        entities = merge_chunk_entities(chunks, chunk_results)
+        
+        # Un fragmento no ve el encabezado de la sección en la que empieza: usar el índice global
+        for metric in entities["METRIC"]:
+            metric["is_proven_fact"] = segments.in_section("hechos_probados", metric["start"])
+        return entities
+    
+    def _extract_chunk_entities(self, text: str) -> Tuple[Dict[str, List[Dict]], Dict[str, List[int]]]:
+        """Entidades de un fragmento y el final de cada grupo de la extracción (ver merge_chunk_entities)"""
+        group_ends: Dict[str, List[int]] = {}
+        entities = self._extract_entities_single(text, SectionIndex(text, find_sections(text)),
+                                                 group_ends=group_ends)
+        return entities, group_ends
+    
+    def _metric_sentence(self, text: str, start: int, end: int) -> str:
+        """Frase de una métrica hasta el final de la medición, en minúsculas"""
+        context_start = max(0, start - self.METRIC_SIDE_CONTEXT)
+        context = text[context_start:end].lower()
+        # Solo la frase de la métrica: desde el último salto de línea, punto o punto y coma
+        boundary = max(context.rfind("\n", 0, start - context_start), context.rfind(". ", 0, start - context_start),
+                       context.rfind(";", 0, start - context_start))
+        return context[boundary + 1:]
+    
+    def _metric_side(self, text: str, start: int, end: int) -> Optional[str]:
+        """Lateralidad de una métrica según su frase hasta la medición (ej: "hombro derecho: flexión 90°")"""
+        return side_of(self._metric_sentence(text, start, end))
+    
+    def _metric_body_part(self, text: str, start: int, end: int) -> Optional[str]:
+        """Parte del cuerpo de una métrica: la última nombrada en su frase hasta la medición"""
+        parts = self.METRIC_BODY_PART.findall(self._metric_sentence(text, start, end))
+        if not parts:
+            return None
+        return "muñeca" if parts[-1] == "muneca" else parts[-1]
+    
+    def _extract_entities_single(self, text: str, segments: SectionIndex,
+                                 document: Optional[NormalizedDocument] = None,
+                                 group_ends: Optional[Dict[str, List[int]]] = None) -> Dict[str, List[Dict]]:
+        """
+        Extracción de una sola pasada sobre todo el texto
+        
+        Args:
+            document: Texto ya normalizado
+            group_ends: Si se indica, recibe por tipo de entidad el final de cada grupo de la
+                extracción (una estrategia o patrón, con sus coincidencias en orden de posición),
+                para reensamblar fragmentos en el mismo orden (ver merge_chunk_entities)
+        """
         entities = {
             "DIAGNOSIS": [],
             "METRIC": [],
@@ -92,317 +673,17 @@ class NLPService:
             "RATING": []
         }
         
-        # ==============================================================================
-        # LISTA BLANCA DE DIAGNÓSTICOS VÁLIDOS (Ampliada y más específica)
-        # ==============================================================================
-        # Esta es la fuente principal de verdad. Se prefieren diagnósticos completos.
-        valid_diagnoses_whitelist = [
-            # Sistema Musculoesquelético - Hombro
-            r"rotura\s+(?:del|de la|de)\s+manguito\s+rotador",
-            r"lesión\s+(?:del|de la|de)\s+manguito\s+rotador",
-            r"tendinopatía\s+(?:del|de la|de)\s+manguito\s+rotador",
-            r"tendinitis\s+(?:del|de la|de)\s+manguito\s+rotador",
-            r"síndrome\s+(?:del|de la|de)\s+hombro\s+doloroso",
-            r"capsulitis\s+adhesiva(?:\s+de\s+hombro)?",
-            r"hombro\s+congelado",
-            r"omalgia(?:\s+crónica)?",
-            r"luxación\s+(?:del|de la|de)\s+hombro",
-            r"luxación\s+acromioclavicular",
-            r"artrosis\s+(?:del|de la|de)\s+hombro",
-            r"artrosis\s+acromioclavicular",
-            r"bursitis\s+subacromial",
-            r"impingement\s+(?:subacromial|de hombro)",
-
-            # Sistema Musculoesquelético - Codo, Muñeca, Mano
-            r"epicondilitis",
-            r"epitrocleitis",
-            r"síndrome\s+del\s+túnel\s+carpiano",
-            r"sindrome\s+del\s+tunel\s+carpiano",
-            r"artrosis\s+(?:de|del)\s+codo",
-            r"artrosis\s+(?:de|de la)\s+muñeca",
-            r"rizartrosis",
-            r"dedo\s+en\s+resorte",
-            r"enfermedad\s+de\s+duputyren",
-
-            # Sistema Musculoesquelético - Columna Vertebral
-            r"cervicalgia(?:\s+crónica)?",
-            r"dorsalgia(?:\s+crónica)?",
-            r"lumbalgia(?:\s+crónica)?",
-            r"lumbago",
-            r"cervicobraquialgia",
-            r"lumbociatalgia",
-            r"ciática",
-            r"hernia\s+discal\s+(?:cervical|dorsal|lumbar)",
-            r"protrusión\s+discal\s+(?:cervical|dorsal|lumbar)",
-            r"espondilosis\s+(?:cervical|dorsal|lumbar)",
-            r"espondiloartrosis\s+(?:cervical|dorsal|lumbar)",
-            r"estenosis\s+de\s+canal\s+(?:cervical|lumbar)",
-            r"escoliosis",
-            r"cifosis",
-            r"lordosis",
-
-            # Sistema Musculoesquelético - Cadera, Rodilla
-            r"coxartrosis",
-            r"artrosis\s+de\s+cadera",
-            r"gonartrosis",
-            r"artrosis\s+de\s+rodilla",
-            r"rotura\s+de\s+menisco",
-            r"rotura\s+de\s+ligamento\s+cruzado\s+(?:anterior|posterior)",
-            r"condropatía\s+rotuliana",
-            r"trocanteritis",
-
-            # Sistema Musculoesquelético - Tobillo, Pie
-            r"síndrome\s+del\s+tarso",
-            r"sindrome\s+del\s+tarso",
-            r"síndrome\s+del\s+seno\s+del\s+tarso",
-            r"esguince\s+de\s+tobillo(?:\s+crónico)?",
-            r"inestabilidad\s+de\s+tobillo",
-            r"artrosis\s+de\s+tobillo",
-            r"tendinopatía\s+de\s+aquiles",
-            r"tendinitis\s+aquílea",
-            r"fascitis\s+plantar",
-            r"espolón\s+calcáneo",
-            r"hallux\s+valgus",
-            r"pie\s+plano",
-            r"pie\s+cavo",
-            r"metatarsalgia",
-
-            # Sistema Musculoesquelético - General/Otros
-            r"fibromialgia",
-            r"síndrome\s+de\s+fatiga\s+crónica",
-            r"osteoporosis",
-            r"artritis\s+reumatoide",
-            r"espondilitis\s+anquilosante",
-            r"lupus\s+eritematoso\s+sistémico",
-            r"polimialgia\s+reumática",
-            r"contractura\s+muscular(?:\s+crónica)?",
-            r"amiotrofia\s+muscular",
-            r"discinesia\s+escapular",
-
-            # Sistema Cardiovascular
-            r"hipertensión\s+arterial",
-            r"hta",
-            r"insuficiencia\s+cardíaca",
-            r"cardiopatía\s+isquémica",
-            r"infarto\s+agudo\s+de\s+miocardio",
-            r"angina\s+de\s+pecho",
-            r"arritmia\s+cardíaca",
-            r"fibrilación\s+auricular",
-            r"valvulopatía",
-            r"insuficiencia\s+venosa\s+crónica",
-            r"varices",
-            r"trombosis\s+venosa\s+profunda",
-            r"arteriopatía\s+periférica",
-
-            # Sistema Respiratorio
-            r"epoc",
-            r"enfermedad\s+pulmonar\s+obstructiva\s+crónica",
-            r"asma\s+bronquial",
-            r"síndrome\s+de\s+apnea\s+hipopnea\s+obstructiva\s+del\s+sueño",
-            r"síndrome\s+de\s+apnea\s+hipopnea\s+del\s+sueño",
-            r"sahs",
-            r"apnea\s+del\s+sueño",
-
-            # Sistema Nervioso
-            r"accidente\s+cerebrovascular",
-            r"ictus",
-            r"epilepsia",
-            r"migraña(?:\s+crónica)?",
-            r"cefalea\s+tensional",
-            r"esclerosis\s+múltiple",
-            r"parkinson",
-            r"alzheimer",
-            r"neuropatía\s+periférica",
-            r"radiculopatía",
-
-            # Trastornos Mentales
-            r"trastorno\s+depresivo(?:\s+mayor)?",
-            r"depresión\s+mayor",
-            r"distimia",
-            r"trastorno\s+de\s+ansiedad(?:\s+generalizada)?",
-            r"ansiedad\s+generalizada",
-            r"síndrome\s+ansioso\s+depresivo",
-            r"sindrome\s+ansioso\s+depresivo",
-            r"trastorno\s+mixto\s+ansioso\s+depresivo",
-            r"trastorno\s+de\s+estrés\s+postraumático",
-            r"\btept\b",
-            r"trastorno\s+obsesivo\s+compulsivo",
-            r"\btoc\b",
-            r"trastorno\s+bipolar",
-            r"esquizofrenia",
-            r"trastorno\s+de\s+la\s+personalidad",
-            r"trastorno\s+adaptativo(?:\s+con\s+ansiedad)?",
-            r"trastorno\s+adaptativo\s+con\s+ansiedad",
-
-            # Sistema Digestivo
-            r"enfermedad\s+por\s+reflujo\s+gastroesofágico",
-            r"erge",
-            r"gastritis\s+crónica",
-            r"úlcera\s+péptica",
-            r"enfermedad\s+inflamatoria\s+intestinal",
-            r"enfermedad\s+de\s+crohn",
-            r"colitis\s+ulcerosa",
-            r"síndrome\s+del\s+intestino\s+irritable",
-            r"colon\s+irritable",
-            r"hepatopatía\s+crónica",
-            r"cirrosis\s+hepática",
-
-            # Sistema Endocrino y Metabólico
-            r"diabetes\s+mellitus(?:\s+tipo\s+[12])?",
-            r"hipotiroidismo",
-            r"hipertiroidismo",
-            r"obesidad(?:\s+mórbida)?",
-            r"dislipemia",
-            r"hipercolesterolemia",
-
-            # Otros
-            r"anemia\s+ferropénica",
-            r"anemia\s+crónica",
-            r"insuficiencia\s+renal\s+crónica",
-            r"dermatitis\s+atópica",
-            r"psoriasis",
-            r"hipoacusia",
-            r"vértigo",
-            r"mareo\s+subjetivo\s+crónico",
-            r"mareo\s+postural\s+perceptivo\s+persistente",
-            r"vestibulopatía\s+bilateral(?:\s+no\s+compensada)?",
-            r"cofosis",
-            r"implante\s+coclear",
-            r"acúfenos",
-            r"tinnitus",
-            r"glaucoma",
-            r"cataratas",
-            r"degeneración\s+macular",
-
-        ]
-        
-        # Patrones más restrictivos para capturar diagnósticos después de palabras clave
-        diagnosis_patterns = [
-            # Solo después de palabras clave médicas específicas y delimitado
-            r"(?:diagnóstico|diagnostico|juicio clínico|orientación diagnóstica)[\s:]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,]{5,100})(?:[\.;:\n]|$)",
-            r"(?:patología|patologia|enfermedad)[\s:]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,]{5,100})(?:[\.;:\n]|$)",
-            # Secciones de conclusiones o antecedentes
-            r"(?:conclusiones|consideraciones médico-legales)[\s:](?:.|\n)*?presenta\s+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,]{5,100})(?:[\.;:\n]|$)",
-            # Hechos probados en sentencias (formato con guiones o numeración)
-            r"(?:hechos\s+probados|cuadro\s+clínico|presenta\s+el\s+siguiente)[\s:](?:.|\n)*?[-•]\s*([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,150})(?:[\.;:\n]|$)",
-            r"(?:SEXTO|SÉPTIMO|OCTAVO|NOVENO|DÉCIMO)[\.-]+\s*(?:.|\n)*?[-•]\s*([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,150})(?:[\.;:\n]|$)",
-            # Listas con guiones o viñetas
-            r"^[-•]\s*([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,150})(?:[\.;:\n]|$)",
-            # Diagnósticos en hechos probados (formato narrativo)
-            r"(?:hechos\s+probados|hecho\s+probado)[\s:](?:.|\n){0,500}?(?:diagnóstico|diagnostico|con\s+diagnóstico|con\s+diagnostico)[\s:]+(?:de\s+)?([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,100})(?:[\.;,\n]|$)",
-            # Diagnósticos mencionados en contexto de incapacidad/enfermedad
-            r"(?:incapacidad|enfermedad|proceso)[\s:]+(?:.|\n){0,200}?(?:diagnóstico|diagnostico|con\s+diagnóstico|con\s+diagnostico)[\s:]+(?:de\s+)?([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,100})(?:[\.;,\n]|$)",
-        ]
+        def close_group(entity_type: str):
+            if group_ends is not None:
+                group_ends.setdefault(entity_type, []).append(len(entities[entity_type]))
         
         seen_diagnoses = set()
         
-        # Palabras/frases que invalidan un diagnóstico (más exhaustivo)
-        invalid_phrases = [
-            "urgencias", "hospital", "clínica", "centro de salud", "consulta", 
-            "doctor", "doctora", "dr.", "dra.", "colegiado", "especialista",
-            "pendiente de", "nuevas consultas", "pruebas", "tratamiento",
-            "limitaciones que", "las limitaciones", "que presentaba", "refiere",
-            "declaración del perito", "informe", "valoración", "paciente",
-            "trabajadora", "trabajador", "interesado", "solicitante",
-            "fecha", "edad", "años", "profesión", "mecanismo", "evolución",
-            "antecedentes", "historia", "exploración", "situación actual",
-            "pronóstico", "secuelas", "en su caso", "posible", "probable",
-            "descartar", "compatible con", "sugerente de",
-            "baremo", "anexo", "capítulo", "artículo", "rd 888", "real decreto",
-            "grado", "discapacidad", "deficiencia", "clase", "porcentaje",
-            "cálculo", "fórmula", "combinación", "puntos",
-            "de tipo", "tipo de", "tipo", "general", "ósea", "crónica",
-            "sin", "no", "ausencia de", "normal", "conservada"
-        ]
-        
-        # Patrones que invalidan un diagnóstico (al inicio)
-        invalid_patterns = [
-            r"^(?:el\s+|la\s+|los\s+|las\s+|un\s+|una\s+)?(?:paciente|trabajador|interesado|solicitante)",
-            r"^(?:en\s+|a\s+|de\s+|con\s+|por\s+)?(?:fecha|edad|profesión|mecanismo|evolución)",
-            r"^(?:se\s+)?(?:solicita|realiza|aprecia|observa|constata|refiere)",
-            r"^(?:pendiente\s+de|compatible\s+con|sugerente\s+de|descartar)",
-            r"^(?:sin|no\s+se\s+aprecia|ausencia\s+de|normal|conservada)",
-            r"^(?:baremo|anexo|capítulo|artículo|rd\s*888|real\s+decreto)",
-            r"^(?:grado|discapacidad|deficiencia|clase\s+\d|porcentaje)",
-            r"^(?:cálculo|fórmula|combinación|puntos)",
-            r"^(?:de\s+tipo|tipo\s+de|tipo|general|ósea|crónica)$",
-            r"^[a-z]{1,3}$", # Palabras muy cortas
-            r"^\d", # Empieza por número
-        ]
-        
-        def is_valid_diagnosis(text: str) -> bool:
-            """Verifica si un texto es un diagnóstico médico válido (versión estricta)"""
-            text_lower = text.lower().strip()
-            
-            # 1. Longitud mínima y máxima
-            if len(text) < 5 or len(text) > 150:
-                return False
-            
-            # 2. Validar contra patrones inválidos al inicio
-            for pattern in invalid_patterns:
-                if re.match(pattern, text_lower, re.IGNORECASE):
-                    return False
-            
-            # 3. Validar contra frases inválidas en cualquier parte
-            for phrase in invalid_phrases:
-                # Asegurar que la frase es una palabra completa o está delimitada
-                if re.search(r'\b' + re.escape(phrase) + r'\b', text_lower):
-                    return False
-            
-            # 4. Debe contener al menos un término médico fuerte de una lista predefinida
-            # Esta lista debe ser muy específica de enfermedades, no de síntomas o anatomía general.
-            strong_medical_terms = [
-                "síndrome", "sindrome", "tendinopatía", "tendinopatia", "tendinitis",
-                "artrosis", "artritis", "anemia", "hipertensión", "hipertension",
-                "gastroduodenitis", "gastritis", "lumbociatalgia", "cervicobraquialgia",
-                "cervicalgia", "dorsalgia", "lumbalgia", "ciática",
-                "hernia", "protrusión", "espondilosis", "estenosis", "escoliosis",
-                "rotura", "fractura", "luxación", "esguince", "bursitis", "capsulitis",
-                "epicondilitis", "epitrocleitis", "neuropatía", "radiculopatía",
-                "fibromialgia", "osteoporosis", "espondilitis",
-                "insuficiencia", "cardiopatía", "infarto", "angina", "arritmia",
-                "fibrilación", "valvulopatía", "varices", "trombosis", "arteriopatía",
-                "epoc", "asma", "apnea",
-                "ictus", "epilepsia", "migraña", "esclerosis", "parkinson", "alzheimer",
-                "trastorno", "depresión", "depresion", "ansiedad", "distimia",
-                "esquizofrenia", "bipolar",
-                "diabetes", "hipotiroidismo", "hipertiroidismo", "obesidad", "dislipemia",
-                "dermatitis", "psoriasis", "hipoacusia", "vértigo", "mareo", "vestibulopatía",
-                "cofosis", "implante", "coclear", "glaucoma", "cataratas",
-                "limitación", "movilidad", "adaptativo"
-            ]
-            
-            # También permitir diagnósticos que mencionan dolor/síntoma + parte del cuerpo
-            # Ejemplo: "Dolor en el tobillo", "Dolor lumbar", etc.
-            symptom_body_pattern = r"(?:dolor|dolores|limitación|limitaciones|deficiencia|deficiencias|lesión|lesiones)\s+(?:en|de|del|de la|del|en el|en la)\s+(?:el|la|los|las)?\s*(?:hombro|codo|muñeca|mano|dedo|cadera|rodilla|tobillo|pie|tarso|cervical|dorsal|lumbar|columna)"
-            
-            has_strong_term = any(re.search(r'\b' + re.escape(term) + r'\b', text_lower) for term in strong_medical_terms)
-            has_symptom_body = bool(re.search(symptom_body_pattern, text_lower, re.IGNORECASE))
-            
-            if not has_strong_term and not has_symptom_body:
-                return False
-            
-            # 5. No debe ser solo una palabra anatómica o vaga (pero permitir si tiene contexto)
-            vague_single_words = ["lumbar", "cervical", "dorsal", "ósea", "osea", "óseo", "oseo",
-                                "psiquiátrico", "psiquiatrico", "psiquiátrica", "psiquiatrica",
-                                "crónico", "cronico", "crónica", "cronica", "tipo", "general",
-                                "hombro", "codo", "muñeca", "mano", "cadera", "rodilla", "tobillo", "pie"]
-            # Permitir si tiene más contexto (más de una palabra) o si está en formato de lista (hechos probados)
-            if len(text.split()) == 1 and text_lower in vague_single_words:
-                return False
-            
-            # 6. Permitir diagnósticos que empiezan con mayúscula en formato de lista (hechos probados)
-            # Estos suelen ser más confiables
-            if text[0].isupper() and len(text.split()) >= 2:
-                # Si tiene al menos un término médico fuerte, es válido
-                return True
-
-            return True
+        is_valid_diagnosis = self.is_valid_diagnosis
         
         # --- ESTRATEGIA 0: Buscar diagnósticos en formato de lista (hechos probados) ---
         # Detectar listas con guiones o viñetas que contienen diagnósticos
-        list_pattern = r"(?:^|\n)\s*[-•]\s*([A-ZÁÉÍÓÚÑ][^\.\n]{10,150})(?:\.|$|\n)"
-        list_matches = re.finditer(list_pattern, text, re.MULTILINE)
+        list_matches = self.LIST_PATTERN.finditer(text)
         for match in list_matches:
             diagnosis_text = match.group(1).strip()
             
@@ -411,7 +692,7 @@ class NLPService:
             
             # Validar que sea un diagnóstico válido
             if is_valid_diagnosis(diagnosis_text):
-                normalized = re.sub(r'\s+', ' ', diagnosis_text.lower())
+                normalized = fold_text(diagnosis_text)
                 if normalized not in seen_diagnoses:
                     seen_diagnoses.add(normalized)
                     entities["DIAGNOSIS"].append({
@@ -420,34 +701,19 @@ class NLPService:
                         "end": match.end(1),
                         "source": "hechos_probados"
                     })
+        close_group("DIAGNOSIS")
         
         # --- ESTRATEGIA 0.5: Buscar diagnósticos en hechos probados (formato narrativo) ---
         # Ejemplo: "con diagnóstico de Dolor en el tobillo"
-        hechos_narrativo_patterns = [
-            r"(?:con\s+diagnóstico|diagnóstico|diagnostico)[\s:]+(?:de\s+)?([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,100})(?:[\.;,\n]|$)",
-            r"(?:proceso|enfermedad|incapacidad)[\s:]+(?:.|\n){0,100}?(?:con\s+diagnóstico|diagnóstico|diagnostico)[\s:]+(?:de\s+)?([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,100})(?:[\.;,\n]|$)",
-        ]
-        
-        for pattern in hechos_narrativo_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in self.HECHOS_NARRATIVO_PATTERNS:
+            matches = pattern.finditer(text)
             for match in matches:
                 diagnosis_text = match.group(1).strip() if match.lastindex else match.group(0).strip()
                 
                 # Limpiar el texto - cortar en frases que indican fin del diagnóstico
                 # Ejemplo: "Dolor en el tobillo, en relación al cual" -> "Dolor en el tobillo"
-                cutoff_phrases = [
-                    r",\s*en\s+relaci[óo]n\s+al\s+cual",
-                    r",\s*en\s+relaci[óo]n\s+con",
-                    r",\s*por\s+el\s+cual",
-                    r",\s*por\s+lo\s+cual",
-                    r",\s*siendo",
-                    r",\s*que\s+",
-                    r",\s*el\s+cual",
-                    r",\s*la\s+cual",
-                ]
-                
-                for cutoff in cutoff_phrases:
-                    diagnosis_text = re.split(cutoff, diagnosis_text, flags=re.IGNORECASE)[0].strip()
+                for cutoff in self.CUTOFF_PHRASES:
+                    diagnosis_text = cutoff.split(diagnosis_text)[0].strip()
                 
                 # Limpiar el texto
                 diagnosis_text = diagnosis_text.rstrip('.,;:')
@@ -456,7 +722,7 @@ class NLPService:
                 
                 # Validar que sea un diagnóstico válido
                 if is_valid_diagnosis(diagnosis_text):
-                    normalized = re.sub(r'\s+', ' ', diagnosis_text.lower())
+                    normalized = fold_text(diagnosis_text)
                     if normalized not in seen_diagnoses:
                         seen_diagnoses.add(normalized)
                         entities["DIAGNOSIS"].append({
@@ -465,12 +731,17 @@ class NLPService:
                             "end": match.start(1) + len(diagnosis_text) if match.lastindex else match.start() + len(diagnosis_text),
                             "source": "hechos_probados_narrativo"
                         })
+            close_group("DIAGNOSIS")
         
         # --- ESTRATEGIA 1: Buscar diagnósticos de la LISTA BLANCA (Prioridad Alta) ---
-        for pattern in valid_diagnoses_whitelist:
-            matches = re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE)
+        # (una sola pasada sobre el texto normalizado, en el orden de la lista blanca;
+        # las posiciones se traducen al texto original)
+        if document is None:
+            document = NormalizedDocument(text)
+        for matches in self.WHITELIST_MATCHER.finditer_all(document.text):
             for match in matches:
-                diagnosis_text = match.group(0).strip()
+                start, end = document.to_original(match.start(), match.end())
+                diagnosis_text = text[start:end].strip()
                 
                 # Expandir abreviaciones a nombres completos
                 diagnosis_text_lower = diagnosis_text.lower()
@@ -478,21 +749,22 @@ class NLPService:
                     diagnosis_text = self.abbreviation_expansion[diagnosis_text_lower]
                 
                 # Normalizar y verificar duplicados
-                normalized = re.sub(r'\s+', ' ', diagnosis_text.lower())
+                normalized = fold_text(diagnosis_text)
                 if normalized in seen_diagnoses:
                     continue
                 
                 seen_diagnoses.add(normalized)
                 entities["DIAGNOSIS"].append({
                     "text": diagnosis_text,
-                    "start": match.start(),
-                    "end": match.end(),
+                    "start": start,
+                    "end": end,
                     "source": "whitelist" # Indicar origen
                 })
+            close_group("DIAGNOSIS")
         
         # --- ESTRATEGIA 2: Buscar diagnósticos con patrones genéricos (Prioridad Media) ---
-        for pattern in diagnosis_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in self.DIAGNOSIS_PATTERNS:
+            matches = pattern.finditer(text)
             for match in matches:
                 diagnosis_text = match.group(1).strip() if match.lastindex else match.group(0).strip()
                 
@@ -507,7 +779,7 @@ class NLPService:
                     continue
                 
                 # Normalizar y verificar duplicados
-                normalized = re.sub(r'\s+', ' ', diagnosis_text.lower())
+                normalized = fold_text(diagnosis_text)
                 if normalized in seen_diagnoses:
                     continue
                 
@@ -526,7 +798,7 @@ class NLPService:
                         
                         # Validar cada parte individualmente
                         if is_valid_diagnosis(part):
-                            part_normalized = re.sub(r'\s+', ' ', part.lower())
+                            part_normalized = fold_text(part)
                             if part_normalized not in seen_diagnoses:
                                 seen_diagnoses.add(part_normalized)
                                 
@@ -549,27 +821,11 @@ class NLPService:
                         "end": match.end(1) if match.lastindex else match.end(),
                         "source": "pattern"
                     })
+            close_group("DIAGNOSIS")
         
         # Extraer métricas (grados, porcentajes)
-        metric_patterns = [
-            r"(\d+(?:\.\d+)?)\s*°\s*(?:de\s+)?(?:abducción|flexión|extensión|rotación|balance\s+articular|movilidad)",
-            r"(?:abducción|flexión|extensión|rotación|balance\s+articular|movilidad)[\s:]+(\d+(?:\.\d+)?)\s*°",
-            r"(\d+(?:\.\d+)?)\s*%\s*(?:de\s+)?(?:pérdida|déficit|limitación)",
-            r"(?:balance\s+muscular)[\s:]+(\d)(?:/5)?", # Balance muscular (ej: 2/5)
-        ]
-        
-        metric_types = {
-            "abducción": "abduccion",
-            "flexión": "flexion",
-            "extensión": "extension",
-            "rotación": "rotacion",
-            "balance articular": "rom_global",
-            "movilidad": "rom_global",
-            "balance muscular": "fuerza"
-        }
-        
-        for pattern in metric_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern in self.METRIC_PATTERNS:
+            matches = pattern.finditer(text)
             for match in matches:
                 try:
                     value = float(match.group(1))
@@ -580,7 +836,7 @@ class NLPService:
                 metric_type = None
                 
                 # Determinar tipo de métrica
-                for key, val in metric_types.items():
+                for key, val in self.METRIC_TYPES.items():
                     if key in metric_text.lower():
                         metric_type = val
                         break
@@ -594,18 +850,17 @@ class NLPService:
                         "text": metric_text,
                         "value": value,
                         "type": metric_type,
+                        "side": self._metric_side(text, match.start(), match.end()),
+                        "body_part": self._metric_body_part(text, match.start(), match.end()),
                         "start": match.start(),
-                        "end": match.end()
+                        "end": match.end(),
+                        "is_proven_fact": segments.in_section("hechos_probados", match.start())
                     })
+            close_group("METRIC")
         
         # Extraer códigos (CIE-10)
-        code_patterns = [
-            r"(?:CIE[- ]?10|CIE10|Código)[\s:]+([A-Z]\d{2}(?:\.\d{1,2})?)",
-            r"([A-Z]\d{2}(?:\.\d{1,2})?)\s*(?:CIE|CIE-10)",
-        ]
-        
-        for pattern in code_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern in self.CODE_PATTERNS:
+            matches = pattern.finditer(text)
             for match in matches:
                 code_text = match.group(1)
                 entities["CODE"].append({
@@ -613,22 +868,11 @@ class NLPService:
                     "start": match.start(),
                     "end": match.end()
                 })
+            close_group("CODE")
         
         # Extraer valoraciones (porcentajes de discapacidad ya otorgados)
-        rating_patterns = [
-            r"(?:grado|porcentaje|valoración)[\s:]+(?:de\s+)?(?:discapacidad|minusvalía)?[\s:]+(\d+(?:\.\d+)?)\s*%",
-            r"(\d+(?:\.\d+)?)\s*%\s*(?:de\s+)?(?:discapacidad|minusvalía|deficiencia\s+global)",
-            r"(?:reconocimiento|reconocido|tiene\s+reconocido)[\s:]+(?:por\s+)?(?:la\s+)?(?:Junta|Administración|Gobierno)?[\s:]+(?:un\s+)?(?:grado|porcentaje)[\s:]+(?:de\s+)?(?:discapacidad|minusvalía)[\s:]+(?:del\s+)?(\d+(?:\.\d+)?)\s*%",
-            r"(?:grado\s+de\s+discapacidad\s+del\s+)(\d+(?:\.\d+)?)\s*%",
-            r"baremo\s+(\d+(?:\.\d+)?)",
-            # Movilidad reducida
-            r"(?:movilidad\s+reducida|movilidad\s+valorada)[\s:]+(?:en\s+)?(\d+(?:\.\d+)?)\s*(?:puntos?|%)",
-            # Situación de dependencia
-            r"(?:situación\s+de\s+dependencia|grado\s+de\s+dependencia)[\s:]+(?:en\s+)?(?:grado\s+)?(\d+)",
-        ]
-        
-        for pattern in rating_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern in self.RATING_PATTERNS:
+            matches = pattern.finditer(text)
             for match in matches:
                 try:
                     value = float(match.group(1))
@@ -642,5 +886,6 @@ class NLPService:
                     "start": match.start(),
                     "end": match.end()
                 })
+            close_group("RATING")
         
         return entities
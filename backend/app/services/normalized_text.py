@@ -0,0 +1,124 @@
+"""
+Representación normalizada del texto de un documento, compartida por todas las etapas.
+El texto se pasa a minúsculas, se le quitan las tildes (y la diéresis/virgulilla) y se
+colapsan los espacios una sola vez por documento; un mapa de posiciones permite volver
+al texto original. Así las etapas no repiten `.lower()`/`re.sub` sobre el texto completo
+y una sola palabra clave o patrón sin tildes sustituye a pares como "síndrome"/"sindrome".
+No hay caché global: quien procesa un documento construye su NormalizedDocument y lo pasa
+a las etapas que lo comparten (así no se retienen textos completos entre peticiones).
+"""
+import re
+import unicodedata
+from functools import cached_property, lru_cache
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+_WHITESPACE = re.compile(r"\s+")
+_TOKEN = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=4096)
+def _fold_char(char: str) -> str:
+    """Minúsculas sin marcas diacríticas ('Á' → 'a', 'ñ' → 'n'); puede devolver '' o varios caracteres"""
+    decomposed = unicodedata.normalize("NFD", char.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def fold_text(text: str) -> str:
+    """Normaliza un texto corto (palabra clave, diagnóstico) igual que NormalizedDocument"""
+    folded = "".join(_fold_char(char) for char in text) if not text.isascii() else text.lower()
+    return _WHITESPACE.sub(" ", folded)
+
+
+def fold_pattern(pattern: str) -> str:
+    """Quita las tildes de una expresión regular para buscarla en el texto normalizado"""
+    return "".join(
+        char if char.isascii() or len(_fold_char(char)) != 1 else _fold_char(char)
+        for char in pattern
+    )
+
+
+class NormalizedDocument:
+    """
+    Texto normalizado de un documento con su mapa de posiciones al original
+
+    Attributes:
+        original: Texto original
+        text: Minúsculas, sin tildes y con los espacios colapsados
+        offsets: Posición en el original de cada carácter de `text`
+    """
+
+    def __init__(self, original: str):
+        self.original = original
+        if not original:
+            self.text = ""
+            self.offsets = np.zeros(0, dtype=np.int32)
+            return
+
+        # Una entrada por carácter distinto: el texto se transforma con tablas de consulta de NumPy
+        code_points = np.frombuffer(original.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        present = np.flatnonzero(np.bincount(code_points)).tolist()
+        table = {}
+        for cp in present:
+            folded_char = _fold_char(chr(cp))
+            if folded_char != chr(cp):
+                table[cp] = folded_char
+        if all(len(value) == 1 for value in table.values()):
+            lookup = np.arange(present[-1] + 1, dtype=np.uint32)
+            for cp, value in table.items():
+                lookup[cp] = ord(value)
+            folded_points = lookup[code_points]
+            offsets = np.arange(len(original), dtype=np.int32)
+        else:
+            # Algún carácter se expande o desaparece (p. ej. marcas diacríticas sueltas)
+            lengths = np.ones(present[-1] + 1, dtype=np.int32)
+            for cp, value in table.items():
+                lengths[cp] = len(value)
+            folded_points = np.frombuffer(
+                original.translate(table).encode("utf-32-le", "surrogatepass"), dtype=np.uint32
+            )
+            offsets = np.repeat(np.arange(len(original), dtype=np.int32), lengths[code_points])
+
+        # Colapsar espacios: se conserva el primer carácter de cada racha (como re.sub(r'\s+', ' '))
+        is_space = np.zeros(int(folded_points.max(initial=0)) + 1, dtype=bool)
+        for cp in np.flatnonzero(np.bincount(folded_points)).tolist():
+            is_space[cp] = chr(cp).isspace()
+        is_space = is_space[folded_points]
+        keep = ~is_space
+        keep[1:] |= ~is_space[:-1]
+        keep[:1] = True
+        folded_points = np.where(is_space, np.uint32(32), folded_points)[keep]
+        self.text = folded_points.tobytes().decode("utf-32-le", "surrogatepass")
+        self.offsets = offsets[keep]
+
+    def to_original(self, start: int, end: int) -> Tuple[int, int]:
+        """Convierte un tramo [start, end) del texto normalizado en el tramo del original"""
+        if start >= len(self.offsets):
+            return len(self.original), len(self.original)
+        original_start = int(self.offsets[start])
+        if end <= start:
+            return original_start, original_start
+        # Hasta el siguiente carácter conservado: incluye las marcas diacríticas eliminadas
+        last = int(self.offsets[end - 1])
+        following = int(self.offsets[end]) if end < len(self.offsets) else len(self.original)
+        original_end = following if following > last else last + 1
+        return original_start, original_end
+
+    def from_original(self, start: int, end: int) -> Tuple[int, int]:
+        """Tramo del texto normalizado cuyos caracteres proceden de [start, end) del original"""
+        return int(np.searchsorted(self.offsets, start)), int(np.searchsorted(self.offsets, end))
+
+    def finditer(self, pattern: re.Pattern) -> Iterator[Tuple[int, int, re.Match]]:
+        """Coincidencias de un patrón (ya normalizado) con su tramo en el texto original"""
+        for match in pattern.finditer(self.text):
+            yield (*self.to_original(match.start(), match.end()), match)
+
+    def contains(self, keyword: str) -> bool:
+        """Si la palabra clave aparece (sin distinguir mayúsculas, tildes ni espacios)"""
+        return fold_text(keyword) in self.text
+
+    @cached_property
+    def tokens(self) -> List[str]:
+        """Palabras del texto normalizado, en orden"""
+        return _TOKEN.findall(self.text)
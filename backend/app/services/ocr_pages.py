@@ -0,0 +1,157 @@
+"""
+Operaciones OCR a nivel de página compartidas por el modo secuencial y el paralelo.
+Ambos modos usan exactamente estas funciones para que el texto resultante sea idéntico.
+"""
+import io
+from typing import NamedTuple
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+
+# Fix para compatibilidad con Pillow 10+ (ANTIALIAS fue removido)
+try:
+    from PIL.Image import Resampling
+    # Crear alias para compatibilidad con código antiguo (EasyOCR puede usar ANTIALIAS)
+    Image.ANTIALIAS = Resampling.LANCZOS
+except (ImportError, AttributeError):
+    # Si Resampling no existe, usar LANCZOS directamente
+    try:
+        Image.ANTIALIAS = Image.LANCZOS
+    except AttributeError:
+        pass
+
+# Zoom de renderizado por defecto: Matrix(3, 3) = 3x zoom para mejor calidad
+DEFAULT_OCR_ZOOM = 3
+
+
+class OCRPageOptions(NamedTuple):
+    """Opciones de renderizado y reconocimiento de cada página"""
+    grayscale: bool = False          # Renderizar en escala de grises (un tercio de memoria)
+    adaptive: bool = False           # OCR en dos pasadas guiado por la confianza
+    low_zoom: float = 1.5            # Zoom de la primera pasada (modo adaptativo)
+    high_zoom: float = DEFAULT_OCR_ZOOM  # Zoom de la página completa o de las regiones dudosas
+    min_confidence: float = 0.5      # Confianza mínima de EasyOCR para aceptar un fragmento
+    clip_padding: float = 4.0        # Margen (puntos PDF) alrededor de cada región re-renderizada
+
+
+class PixmapArray(np.ndarray):
+    """
+    Vista NumPy sobre las muestras de un Pixmap de PyMuPDF, sin copia.
+    Mantiene una referencia al Pixmap para que su memoria siga siendo válida
+    mientras exista el array (o cualquier vista derivada de él).
+    """
+    _pixmap = None
+
+    def __array_finalize__(self, obj):
+        if obj is not None:
+            self._pixmap = getattr(obj, "_pixmap", None)
+
+
+def pixmap_to_array(pix) -> np.ndarray:
+    """
+    Envuelve pix.samples como array (alto, ancho[, canales]) uint8 contiguo sin codificar a PNG.
+    Solo se copia si las filas tienen relleno: OpenCV (dentro de EasyOCR) espera arrays contiguos.
+    """
+    array = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+    if pix.stride == pix.width * pix.n:
+        array = array.reshape(pix.height, pix.width, pix.n)
+    else:
+        # Filas con relleno: usar strides explícitos sobre el mismo buffer
+        array = np.lib.stride_tricks.as_strided(
+            array, shape=(pix.height, pix.width, pix.n), strides=(pix.stride, pix.n, 1)
+        )
+    if pix.n == 1:
+        array = array[:, :, 0]
+    if not array.flags.c_contiguous:
+        # La copia tiene su propia memoria: no necesita mantener vivo el Pixmap
+        return np.ascontiguousarray(array)
+    view = array.view(PixmapArray)
+    view._pixmap = pix
+    return view
+
+
+def render_page_array(page, zoom: float = DEFAULT_OCR_ZOOM, grayscale: bool = False) -> np.ndarray:
+    """
+    Convierte una página a imagen con mayor resolución para mejor OCR
+
+    Args:
+        page: Página de PyMuPDF
+        zoom: Factor de ampliación del renderizado
+        grayscale: Renderizar en escala de grises (1 canal, un tercio de memoria que RGB)
+
+    Returns:
+        Array RGB (alto, ancho, 3) o en escala de grises (alto, ancho)
+    """
+    colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=colorspace, alpha=False)
+    return pixmap_to_array(pix)
+
+
+def render_page_array_png(page, zoom: float = DEFAULT_OCR_ZOOM) -> np.ndarray:
+    """Renderizado anterior (PNG → PIL → NumPy); se mantiene como referencia para el benchmark"""
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    img_data = pix.tobytes("png")
+    img = Image.open(io.BytesIO(img_data))
+    return np.array(img)
+
+
+def recognize_page(reader, img_array: np.ndarray) -> str:
+    """Ejecuta OCR sobre la imagen de una página y une los fragmentos reconocidos"""
+    results = reader.readtext(img_array)
+    return " ".join([result[1] for result in results])
+
+
+def _mean_confidence(results) -> float:
+    return sum(result[2] for result in results) / len(results) if results else 0.0
+
+
+def recognize_page_adaptive(reader, page, options: OCRPageOptions) -> str:
+    """
+    OCR en dos pasadas: reconoce la página a bajo zoom y vuelve a renderizar a alto zoom
+    (con un rectángulo de recorte) solo las regiones cuya confianza es baja.
+    """
+    img_array = render_page_array(page, zoom=options.low_zoom, grayscale=options.grayscale)
+    results = reader.readtext(img_array)
+    del img_array
+    
+    if not results:
+        # Nada detectado a bajo zoom (p. ej. sellos tenues): pasada completa a alto zoom
+        return recognize_page(reader, render_page_array(page, zoom=options.high_zoom, grayscale=options.grayscale))
+    
+    colorspace = fitz.csGRAY if options.grayscale else fitz.csRGB
+    matrix = fitz.Matrix(options.high_zoom, options.high_zoom)
+    parts = []
+    for box, text, confidence in results:
+        if confidence >= options.min_confidence:
+            parts.append(text)
+            continue
+        
+        # Coordenadas de la caja (píxeles a bajo zoom) → puntos de la página, con margen
+        xs = [point[0] for point in box]
+        ys = [point[1] for point in box]
+        clip = fitz.Rect(
+            min(xs) / options.low_zoom - options.clip_padding,
+            min(ys) / options.low_zoom - options.clip_padding,
+            max(xs) / options.low_zoom + options.clip_padding,
+            max(ys) / options.low_zoom + options.clip_padding,
+        ) & page.rect
+        if clip.is_empty:
+            parts.append(text)
+            continue
+        
+        pix = page.get_pixmap(matrix=matrix, clip=clip, colorspace=colorspace, alpha=False)
+        region_results = reader.readtext(pixmap_to_array(pix))
+        # Quedarse con la lectura a alto zoom solo si es más fiable que la original
+        if region_results and _mean_confidence(region_results) > confidence:
+            parts.append(" ".join(result[1] for result in region_results))
+        else:
+            parts.append(text)
+    return " ".join(parts)
+
+
+def ocr_page(reader, page, options: OCRPageOptions = OCRPageOptions()) -> str:
+    """Reconoce una página según las opciones (pasada única o adaptativa)"""
+    if options.adaptive:
+        return recognize_page_adaptive(reader, page, options)
+    return recognize_page(reader, render_page_array(page, zoom=options.high_zoom, grayscale=options.grayscale))
@@ -0,0 +1,130 @@
+"""
+OCR paralelo por páginas sobre un pool de procesos.
+Cada proceso trabajador mantiene su propio lector EasyOCR precargado y recibe lotes
+de páginas; los resultados se reensamblan en el orden original del documento.
+"""
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Sequence
+
+import fitz  # PyMuPDF
+
+from app.services.ocr_pages import OCRPageOptions, ocr_page
+
+# Lector EasyOCR del proceso trabajador (uno por proceso, creado en el inicializador)
+_worker_reader = None
+
+
+def _init_worker(languages: List[str], gpu: bool, torch_threads: int):
+    """Inicializa el proceso trabajador: limita hilos de torch y carga el lector"""
+    global _worker_reader
+    if torch_threads > 0:
+        try:
+            import torch
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+    import easyocr
+    _worker_reader = easyocr.Reader(languages, gpu=gpu)
+
+
+def _worker_ready() -> bool:
+    """Tarea vacía usada para forzar el arranque (y la carga del modelo) de los trabajadores"""
+    return _worker_reader is not None
+
+
+def _ocr_page_batch(pdf_content: bytes, page_numbers: List[int], options: OCRPageOptions) -> List[tuple]:
+    """Renderiza y reconoce un lote de páginas dentro del proceso trabajador"""
+    doc = fitz.open(stream=pdf_content, filetype="pdf")
+    try:
+        return [
+            (page_num, ocr_page(_worker_reader, doc[page_num], options))
+            for page_num in page_numbers
+        ]
+    finally:
+        doc.close()
+
+
+class OCRProcessPool:
+    """Pool de procesos para repartir las páginas de un PDF escaneado entre varios núcleos"""
+
+    def __init__(self, workers: int = 2, torch_threads: int = 1,
+                 languages: Sequence[str] = ("es", "en"), gpu: bool = False):
+        if workers < 1:
+            raise ValueError("El número de trabajadores OCR debe ser al menos 1")
+        self.workers = workers
+        self.torch_threads = torch_threads
+        self.languages = list(languages)
+        self.gpu = gpu
+        self._executor = self._new_executor()
+        self._executor_lock = threading.Lock()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # "spawn" evita heredar el estado de torch/hilos del proceso padre
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.languages, self.gpu, self.torch_threads),
+        )
+
+    def _replace_broken(self, broken: ProcessPoolExecutor):
+        """
+        Sustituye el pool roto por uno nuevo. Varias peticiones concurrentes pueden ver el mismo
+        pool roto: solo la primera lo sustituye (las demás encuentran ya el nuevo)
+        """
+        with self._executor_lock:
+            if self._executor is not broken:
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+
+    def warm_up(self):
+        """Arranca los procesos trabajadores para que carguen su lector antes de la primera petición"""
+        futures = [self._executor.submit(_worker_ready) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def _batches(self, page_numbers: List[int]) -> List[List[int]]:
+        """Divide las páginas en lotes contiguos (unos dos por trabajador para equilibrar la carga)"""
+        batch_size = max(1, math.ceil(len(page_numbers) / (self.workers * 2)))
+        return [page_numbers[i:i + batch_size] for i in range(0, len(page_numbers), batch_size)]
+
+    def ocr_pages(self, pdf_content: bytes, page_numbers: List[int],
+                  on_page: Optional[Callable[[int, str], None]] = None,
+                  options: OCRPageOptions = OCRPageOptions()) -> List[str]:
+        """
+        Reconoce las páginas indicadas en paralelo
+
+        Args:
+            pdf_content: Contenido del PDF en bytes
+            page_numbers: Páginas (base 0) a reconocer
+            on_page: Callback opcional (número de página, texto) al completarse cada página
+            options: Opciones de renderizado/reconocimiento de cada página
+
+        Returns:
+            Texto de cada página, en el mismo orden que page_numbers
+        """
+        executor = self._executor
+        futures = [
+            executor.submit(_ocr_page_batch, pdf_content, batch, options)
+            for batch in self._batches(list(page_numbers))
+        ]
+        page_texts: Dict[int, str] = {}
+        try:
+            for future in as_completed(futures):
+                for page_num, page_text in future.result():
+                    page_texts[page_num] = page_text
+                    if on_page:
+                        on_page(page_num, page_text)
+        except BrokenProcessPool:
+            # Un trabajador murió (p. ej. sin memoria): sustituir el pool para las siguientes peticiones
+            self._replace_broken(executor)
+            raise
+        return [page_texts[page_num] for page_num in page_numbers]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,141 @@
+"""
+Pool de lectores EasyOCR compartido por todo el proceso.
+Evita cargar el modelo (varios segundos y cientos de MB) en cada petición:
+los lectores se crean una vez, se prestan a cada petición y se devuelven al terminar.
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+# EasyOCR es opcional - muy pesado para Vercel
+try:
+    import easyocr
+    EASYOCR_AVAILABLE = True
+except ImportError:
+    EASYOCR_AVAILABLE = False
+    easyocr = None
+
+
+class ReaderPoolTimeout(Exception):
+    """No se obtuvo un lector libre dentro del tiempo de espera"""
+
+
+class OCRReaderPool:
+    """Pool acotado de lectores EasyOCR reutilizables entre peticiones"""
+
+    def __init__(self, size: int = 1, languages: Sequence[str] = ("es", "en"), gpu: bool = False):
+        if size < 1:
+            raise ValueError("El tamaño del pool de lectores OCR debe ser al menos 1")
+        self.size = size
+        self.languages = list(languages)
+        self.gpu = gpu
+        self._free = queue.LifoQueue()  # LIFO: reutilizar el lector más "caliente"
+        self._lock = threading.Lock()
+        self._created = 0
+        # Métricas
+        self._borrows = 0
+        self._waits = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _create_reader(self):
+        """Carga un nuevo lector EasyOCR (operación lenta)"""
+        if not EASYOCR_AVAILABLE:
+            raise Exception(
+                "EasyOCR no está disponible. Para PDFs escaneados, se requiere EasyOCR. "
+                "En Vercel, considere usar un servicio externo de OCR o convertir el PDF a texto antes de subirlo."
+            )
+        return easyocr.Reader(self.languages, gpu=self.gpu)
+
+    def _try_reserve_slot(self) -> bool:
+        """Reserva un hueco para crear un lector nuevo si aún no se ha alcanzado el tamaño"""
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return True
+            return False
+
+    def _release_slot(self):
+        with self._lock:
+            self._created -= 1
+
+    def warm_up(self, count: Optional[int] = None):
+        """
+        Precarga lectores para que la primera petición no pague la carga del modelo
+
+        Args:
+            count: Número de lectores a precargar (por defecto, el tamaño del pool)
+        """
+        target = self.size if count is None else min(count, self.size)
+        while self.created < target and self._try_reserve_slot():
+            try:
+                reader = self._create_reader()
+            except Exception:
+                self._release_slot()
+                raise
+            self._free.put(reader)
+
+    @contextmanager
+    def reader(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Presta un lector del pool y lo devuelve al salir del bloque
+
+        Args:
+            timeout: Segundos máximos de espera por un lector libre (None = sin límite)
+        """
+        start = time.perf_counter()
+        waited = False
+        try:
+            reader = self._free.get_nowait()
+        except queue.Empty:
+            if self._try_reserve_slot():
+                try:
+                    reader = self._create_reader()
+                except Exception:
+                    self._release_slot()
+                    raise
+            else:
+                waited = True
+                try:
+                    reader = self._free.get(timeout=timeout)
+                except queue.Empty:
+                    raise ReaderPoolTimeout(
+                        f"No hay lectores OCR libres tras esperar {timeout} segundos"
+                    )
+        wait_time = time.perf_counter() - start
+
+        with self._lock:
+            self._borrows += 1
+            if waited:
+                self._waits += 1
+                self._total_wait += wait_time
+                self._max_wait = max(self._max_wait, wait_time)
+
+        try:
+            yield reader
+        finally:
+            self._free.put(reader)
+
+    @property
+    def created(self) -> int:
+        with self._lock:
+            return self._created
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métricas del pool: lectores libres y tiempos de espera de los llamantes"""
+        with self._lock:
+            created = self._created
+            borrows = self._borrows
+            return {
+                "size": self.size,
+                "created": created,
+                "free": self._free.qsize(),
+                "in_use": created - self._free.qsize(),
+                "borrows": borrows,
+                "waits": self._waits,
+                "total_wait_seconds": round(self._total_wait, 4),
+                "avg_wait_seconds": round(self._total_wait / borrows, 4) if borrows else 0.0,
+                "max_wait_seconds": round(self._max_wait, 4),
+            }
@@ -4,21 +4,8 @@ Soporta PDFs nativos digitales, escaneados, y documentos Word (.docx)
 """
 import io
 import fitz  # PyMuPDF
-from typing import Optional
-import numpy as np
-from PIL import Image
-
-# Fix para compatibilidad con Pillow 10+ (ANTIALIAS fue removido)
-try:
-    from PIL.Image import Resampling
-    # Crear alias para compatibilidad con código antiguo (EasyOCR puede usar ANTIALIAS)
-    Image.ANTIALIAS = Resampling.LANCZOS
-except (ImportError, AttributeError):
-    # Si Resampling no existe, usar LANCZOS directamente
-    try:
-        Image.ANTIALIAS = Image.LANCZOS
-    except AttributeError:
-        pass
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple
 
 # EasyOCR es opcional - muy pesado para Vercel
 try:
@@ -30,13 +17,78 @@ except ImportError:
 
 from docx import Document  # python-docx para .docx
 
+from app.services.ocr_reader_pool import OCRReaderPool
+from app.services.ocr_process_pool import OCRProcessPool
+from app.services.ocr_pages import OCRPageOptions, ocr_page
+from app.services.extraction_cache import ExtractionCache, document_key
+from app.services.keyword_scanner import KeywordScanner
+from app.services.normalized_text import NormalizedDocument, fold_text
+
+# Versión del extractor: incrementar cuando cambie la lógica de extracción
+# para invalidar los resultados guardados en la caché
+EXTRACTOR_VERSION = "5"
+
 
 class OCRService:
     """Servicio para extracción de texto de documentos PDF"""
     
-    def __init__(self):
+    # Palabras clave de encabezado/metadatos (copias auténticas, registros, sellos)
+    HEADER_KEYWORDS = ["copia autentica", "localizador", "registro salida", "fecha registro", "sello", "acceda a la página", "para visualizar el documento"]
+    
+    # Palabras clave que indican contenido real del documento (no solo metadatos)
+    # Excluir "discapacidad" si solo aparece en contexto de registro/trámite
+    CONTENT_KEYWORDS = ["resolución", "determina que", "diagnóstico", "m75", "lesión", "hombro", "anexo", "baremo", "grado de discapacidad", "reconocimiento del grado"]
+    
+    # Palabras clave médicas más amplias para detectar contenido médico real
+    MEDICAL_KEYWORDS = [
+        "diagnóstico", "lesión", "patología", "enfermedad", "síndrome", "trastorno",
+        "rotura", "fractura", "artrosis", "artritis", "tendinitis", "bursitis",
+        "limitación", "movilidad", "dolor", "deficiencia", "discapacidad",
+        "exploración", "examen", "prueba", "pruebas complementarias",
+        "pericial", "dictamen", "informe médico", "valoración", "baremo",
+        "capítulo", "anexo", "clase", "grado", "porcentaje", "via"
+    ]
+    
+    # Enlaces a documentos externos (el contenido real está en otra URL)
+    EXTERNAL_LINK_KEYWORDS = ["verdocumentos", "visualizar el documento", "jcyl.es"]
+    
+    # Palabras de registro/trámite que, si rodean a una palabra clave de contenido, la invalidan
+    METADATA_CONTEXT_KEYWORDS = ["registro", "localizador", "fecha registro", "sello"]
+    
+    # Todas las listas anteriores se buscan en una sola pasada sobre el texto normalizado
+    # (sin tildes ni mayúsculas: "acceda a la página" también encuentra "acceda a la pagina")
+    KEYWORD_SCANNER = KeywordScanner(
+        HEADER_KEYWORDS + CONTENT_KEYWORDS + MEDICAL_KEYWORDS + EXTERNAL_LINK_KEYWORDS + METADATA_CONTEXT_KEYWORDS,
+        folded=True
+    )
+    
+    # Umbrales del clasificador por página (texto nativo vs. escaneado)
+    MIN_NATIVE_PAGE_CHARS = 100      # Menos caracteres que esto: la página no tiene capa de texto útil
+    MAX_STAMP_PAGE_CHARS = 1000      # Páginas con poco texto que pueden ser solo sello/encabezado
+    MIN_IMAGE_COVERAGE = 0.5         # Fracción de la página cubierta por imágenes
+    
+    # Caracteres del texto original a cada lado de una palabra clave de contenido en los que se buscan metadatos
+    METADATA_CONTEXT_CHARS = 100
+    
+    def __init__(self, reader_pool: Optional[OCRReaderPool] = None,
+                 process_pool: Optional[OCRProcessPool] = None,
+                 cache: Optional[ExtractionCache] = None,
+                 on_log: Optional[Callable[[str], None]] = None,
+                 page_options: Optional[OCRPageOptions] = None):
         # Inicializar EasyOCR solo cuando sea necesario (para PDFs escaneados)
         self.easyocr_reader = None
+        # Pool de lectores compartido por la aplicación (si se proporciona, no se carga un lector propio)
+        self.reader_pool = reader_pool
+        # Pool de procesos para OCR paralelo por páginas (opcional)
+        self.process_pool = process_pool
+        # Caché de extracción por hash del documento (opcional)
+        self.cache = cache
+        # Callback opcional que recibe cada log en el momento en que se produce (progreso de trabajos)
+        self.on_log = on_log
+        # Opciones de renderizado/reconocimiento por página (zoom, escala de grises, modo adaptativo)
+        self.page_options = page_options or OCRPageOptions()
+        # Las opciones de OCR cambian el texto obtenido: forman parte de la versión en la caché
+        self._cache_version = EXTRACTOR_VERSION + ":" + ",".join(str(value) for value in self.page_options)
         self.debug_logs = []  # Logs de depuración
     
     def _add_log(self, message, level="INFO"):
@@ -44,6 +96,8 @@ class OCRService:
         log_entry = f"[{level}] {message}"
         print(log_entry)
         self.debug_logs.append(log_entry)
+        if self.on_log:
+            self.on_log(log_entry)
     
     def get_logs(self):
         """Obtiene los logs de depuración y los limpia"""
@@ -62,17 +116,55 @@ class OCRService:
         Returns:
             Texto extraído del documento
         """
+        return self.extract_text_sync(file_content, filename)
+    
+    def extract_text_sync(self, file_content: bytes, filename: Optional[str] = None) -> str:
+        """Parte síncrona de `extract_text` (la ejecuta el pipeline en un hilo de trabajo)"""
+        if self.cache is None:
+            return self._extract_text_uncached(file_content, filename)
+        
+        cache_key = document_key(file_content, self._cache_version, self._file_kind(filename))
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            text, cached_logs = cached
+            self._add_log(f"Documento ya procesado anteriormente: texto recuperado de la caché ({len(text)} caracteres)", "SUCCESS")
+            self.debug_logs.extend(cached_logs)
+            if self.on_log:
+                for log_entry in cached_logs:
+                    self.on_log(log_entry)
+            return text
+        
+        logs_before = len(self.debug_logs)
+        text = self._extract_text_uncached(file_content, filename)
+        extraction_logs = self.debug_logs[logs_before:]
+        # No guardar extracciones con errores (p. ej. OCR no disponible): podrían mejorar al reintentar
+        if not any(log.startswith("[ERROR]") for log in extraction_logs):
+            self.cache.put(cache_key, text, extraction_logs)
+        return text
+    
+    def _file_kind(self, filename: Optional[str]) -> str:
+        """Tipo de archivo según la extensión (determina el extractor usado)"""
+        if filename:
+            filename_lower = filename.lower()
+            if filename_lower.endswith('.docx'):
+                return "docx"
+            if filename_lower.endswith('.doc'):
+                return "doc"
+        return "pdf"
+    
+    def _extract_text_uncached(self, file_content: bytes, filename: Optional[str] = None) -> str:
+        """Extrae texto de un documento sin consultar la caché"""
         try:
             # Detectar tipo de archivo por extensión
             if filename:
                 filename_lower = filename.lower()
                 if filename_lower.endswith('.docx'):
-                    return await self._extract_from_docx(file_content)
+                    return self._extract_from_docx(file_content)
                 elif filename_lower.endswith('.doc'):
                     # .doc antiguo - python-docx NO puede leer .doc, solo .docx
                     # Intentar de todas formas por si acaso, pero probablemente fallará
                     try:
-                        return await self._extract_from_docx(file_content)
+                        return self._extract_from_docx(file_content)
                     except Exception as e:
                         error_msg = str(e).lower()
                         if "not a zip file" in error_msg or "bad zipfile" in error_msg:
@@ -89,56 +181,36 @@ class OCRService:
             # Por defecto, tratar como PDF
             try:
                 # Intentar extracción directa con PyMuPDF (PDFs nativos)
-                text = await self._extract_with_pymupdf(file_content)
+                page_texts = self._extract_pages_with_pymupdf(file_content)
+                text = "\n\n".join(page_texts)
                 content_length = len(text.strip())
-                text_lower = text.lower()
+                document = NormalizedDocument(text)
+                normalized_text = document.text
                 
                 self._add_log(f"Texto extraído con PyMuPDF: {content_length} caracteres")
                 self._add_log(f"Primeros 200 caracteres: {text[:200]}")
                 
+                # Buscar todas las palabras clave en una sola pasada
+                hits = self.KEYWORD_SCANNER.scan(normalized_text)
+                
                 # Verificar si el texto extraído es solo metadatos/encabezado
-                header_keywords = ["copia autentica", "localizador", "registro salida", "fecha registro", "sello", "acceda a la página", "acceda a la pagina", "para visualizar el documento"]
-                has_header = any(keyword in text_lower for keyword in header_keywords)
+                header_keywords = self.HEADER_KEYWORDS
+                has_header = hits.any(header_keywords)
                 
                 # Verificar si hay enlaces a documentos externos (indica que el contenido real está en otra URL)
-                has_external_link = "verdocumentos" in text_lower or "visualizar el documento" in text_lower or "jcyl.es" in text_lower
+                has_external_link = hits.any(self.EXTERNAL_LINK_KEYWORDS)
                 
-                # Palabras clave que indican contenido real del documento (no solo metadatos)
-                # Excluir "discapacidad" si solo aparece en contexto de registro/trámite
-                content_keywords = ["resolución", "determina que", "diagnóstico", "m75", "lesión", "hombro", "anexo", "baremo", "grado de discapacidad", "reconocimiento del grado"]
-                
-                # Palabras clave médicas más amplias para detectar contenido médico real
-                medical_keywords = [
-                    "diagnóstico", "lesión", "patología", "enfermedad", "síndrome", "trastorno",
-                    "rotura", "fractura", "artrosis", "artritis", "tendinitis", "bursitis",
-                    "limitación", "movilidad", "dolor", "deficiencia", "discapacidad",
-                    "exploración", "examen", "prueba", "pruebas complementarias",
-                    "pericial", "dictamen", "informe médico", "valoración", "baremo",
-                    "capítulo", "anexo", "clase", "grado", "porcentaje", "via"
-                ]
+                content_keywords = self.CONTENT_KEYWORDS
+                medical_keywords = self.MEDICAL_KEYWORDS
                 
                 has_content = False
-                medical_keywords_found = 0
                 
                 # Verificar palabras clave de contenido administrativo/judicial
-                for keyword in content_keywords:
-                    if keyword in text_lower:
-                        # Verificar que no esté en contexto de registro/trámite
-                        keyword_index = text_lower.find(keyword)
-                        if keyword_index >= 0:
-                            # Buscar contexto alrededor
-                            context_start = max(0, keyword_index - 100)
-                            context_end = min(len(text_lower), keyword_index + len(keyword) + 100)
-                            context = text_lower[context_start:context_end]
-                            # Si el contexto no es principalmente metadatos, considerar contenido real
-                            if not all(meta_word in context for meta_word in ["registro", "localizador", "fecha registro", "sello"]):
-                                has_content = True
-                                break
+                if self._has_content_outside_metadata(document, hits):
+                    has_content = True
                 
                 # Contar palabras clave médicas encontradas
-                for keyword in medical_keywords:
-                    if keyword in text_lower:
-                        medical_keywords_found += 1
+                medical_keywords_found = len(hits.found(medical_keywords))
                 
                 # Si encontramos al menos 3 palabras clave médicas, consideramos que hay contenido
                 if medical_keywords_found >= 3:
@@ -169,7 +241,7 @@ class OCRService:
                 header_text_length = 0
                 for keyword in header_keywords:
                     # Contar ocurrencias y longitud aproximada
-                    count = text_lower.count(keyword)
+                    count = hits.count(keyword)
                     header_text_length += count * len(keyword) * 2  # Aproximación
                 
                 header_percentage = (header_text_length / content_length * 100) if content_length > 0 else 0
@@ -196,7 +268,7 @@ class OCRService:
                     try:
                         self._add_log(f"Iniciando extracción con OCR...", "WARNING")
                         self._add_log(f"Esto puede tardar varios minutos la primera vez (carga del modelo)...", "WARNING")
-                        ocr_text = await self._extract_with_ocr(file_content)
+                        ocr_text, includes_native = self._extract_hybrid(file_content, page_texts)
                         ocr_length = len(ocr_text.strip())
                         self._add_log(f"OCR extrajo {ocr_length} caracteres vs {content_length} con PyMuPDF")
                         
@@ -205,8 +277,7 @@ class OCRService:
                             self._add_log(f"Primeros 300 caracteres del OCR: {ocr_text[:300]}")
                         
                         # Si OCR extrajo más texto o encontró contenido real, usarlo
-                        ocr_lower = ocr_text.lower()
-                        ocr_has_content = any(keyword in ocr_lower for keyword in content_keywords)
+                        ocr_has_content = self.KEYWORD_SCANNER.scan(NormalizedDocument(ocr_text).text).any(content_keywords)
                         
                         self._add_log(f"OCR tiene contenido real: {ocr_has_content}")
                         
@@ -216,7 +287,8 @@ class OCRService:
                         else:
                             self._add_log(f"OCR no mejoró la extracción, usando texto original", "WARNING")
                             # Aun así, si OCR extrajo algo, intentar combinarlo
-                            if ocr_length > 100:
+                            # (el modo híbrido ya combina texto nativo y OCR página a página)
+                            if ocr_length > 100 and not includes_native:
                                 self._add_log(f"Combinando texto PyMuPDF + OCR...")
                                 return text + "\n\n" + ocr_text
                     except Exception as ocr_error:
@@ -241,76 +313,216 @@ class OCRService:
             else:
                 raise Exception(f"Error en extracción de texto: {error_msg}")
     
-    async def _extract_with_pymupdf(self, pdf_content: bytes) -> str:
+    def _extract_with_pymupdf(self, pdf_content: bytes) -> str:
         """Extrae texto de PDFs nativos digitales usando PyMuPDF"""
-        doc = fitz.open(stream=pdf_content, filetype="pdf")
-        text_parts = []
-        
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            
-            # Método 1: Extracción estándar
-            text = page.get_text()
-            
-            # Método 2: Si no hay suficiente texto, intentar con diferentes opciones
-            if len(text.strip()) < 100:
-                # Intentar con opciones de extracción más agresivas
-                text_dict = page.get_text("dict")
-                # Extraer texto de bloques
-                blocks_text = []
-                for block in text_dict.get("blocks", []):
-                    if "lines" in block:
-                        for line in block["lines"]:
-                            for span in line.get("spans", []):
-                                if span.get("text"):
-                                    blocks_text.append(span["text"])
-                if blocks_text:
-                    text = " ".join(blocks_text)
-            
-            # Método 3: Intentar extraer texto de anotaciones
-            if len(text.strip()) < 100:
-                annotations_text = []
-                for annot in page.annots():
-                    if annot.type[0] == 2:  # Text annotation
-                        info = annot.info
-                        if info.get("content"):
-                            annotations_text.append(info["content"])
-                if annotations_text:
-                    text = text + "\n" + "\n".join(annotations_text)
-            
-            # Método 4: Extraer texto con diferentes opciones de layout
-            if len(text.strip()) < 100:
-                # Intentar extracción con diferentes flags
-                text_flags = page.get_text("text", flags=11)  # flags para mejor extracción
-                if len(text_flags.strip()) > len(text.strip()):
-                    text = text_flags
-            
-            # Método 5: Extraer texto de formularios/widgets
-            if len(text.strip()) < 100:
-                widgets_text = []
-                for widget in page.widgets():
-                    if widget.field_value:
-                        widgets_text.append(str(widget.field_value))
-                if widgets_text:
-                    text = text + "\n" + "\n".join(widgets_text)
-            
-            text_parts.append(text)
-        
-        doc.close()
-        full_text = "\n\n".join(text_parts)
+        page_texts = self._extract_pages_with_pymupdf(pdf_content)
+        full_text = "\n\n".join(page_texts)
         
         # Si aún no hay suficiente texto, puede ser que el PDF tenga el contenido en imágenes
         # En ese caso, retornar lo que tenemos pero marcar que necesita OCR
         return full_text
     
-    async def _extract_with_ocr(self, pdf_content: bytes) -> str:
+    def _has_content_outside_metadata(self, document: NormalizedDocument, hits) -> bool:
+        """
+        Si alguna palabra clave de contenido no está en un contexto de registro/trámite
+        
+        El contexto son METADATA_CONTEXT_CHARS caracteres del texto original a cada lado de la
+        primera aparición de la palabra clave; se convierte al texto normalizado con el mapa de
+        posiciones para que los espacios colapsados no acerquen metadatos que en el documento
+        están lejos.
+        
+        Args:
+            document: Texto normalizado del documento
+            hits: Resultado de KEYWORD_SCANNER sobre `document.text`
+        """
+        for keyword in hits.found(self.CONTENT_KEYWORDS):
+            keyword_index = hits.first(keyword)
+            keyword_start, keyword_end = document.to_original(keyword_index, keyword_index + len(fold_text(keyword)))
+            context_start, context_end = document.from_original(
+                max(0, keyword_start - self.METADATA_CONTEXT_CHARS), keyword_end + self.METADATA_CONTEXT_CHARS
+            )
+            # Si el contexto no es principalmente metadatos, considerar contenido real
+            if not all(hits.within(meta_word, context_start, context_end) for meta_word in self.METADATA_CONTEXT_KEYWORDS):
+                return True
+        return False
+    
+    def _extract_pages_with_pymupdf(self, pdf_content: bytes) -> List[str]:
+        """Extrae el texto nativo de cada página (una entrada por página, en orden)"""
+        doc = fitz.open(stream=pdf_content, filetype="pdf")
+        try:
+            return [self._extract_page_text(doc[page_num]) for page_num in range(len(doc))]
+        finally:
+            doc.close()
+    
+    def _extract_page_text(self, page) -> str:
+        """Extrae el texto nativo de una página probando varios métodos de PyMuPDF"""
+        # Método 1: Extracción estándar
+        text = page.get_text()
+        
+        # Método 2: Si no hay suficiente texto, intentar con diferentes opciones
+        if len(text.strip()) < 100:
+            # Intentar con opciones de extracción más agresivas
+            text_dict = page.get_text("dict")
+            # Extraer texto de bloques
+            blocks_text = []
+            for block in text_dict.get("blocks", []):
+                if "lines" in block:
+                    for line in block["lines"]:
+                        for span in line.get("spans", []):
+                            if span.get("text"):
+                                blocks_text.append(span["text"])
+            if blocks_text:
+                text = " ".join(blocks_text)
+        
+        # Método 3: Intentar extraer texto de anotaciones
+        if len(text.strip()) < 100:
+            annotations_text = []
+            for annot in page.annots():
+                if annot.type[0] == 2:  # Text annotation
+                    info = annot.info
+                    if info.get("content"):
+                        annotations_text.append(info["content"])
+            if annotations_text:
+                text = text + "\n" + "\n".join(annotations_text)
+        
+        # Método 4: Extraer texto con diferentes opciones de layout
+        if len(text.strip()) < 100:
+            # Intentar extracción con diferentes flags
+            text_flags = page.get_text("text", flags=11)  # flags para mejor extracción
+            if len(text_flags.strip()) > len(text.strip()):
+                text = text_flags
+        
+        # Método 5: Extraer texto de formularios/widgets
+        if len(text.strip()) < 100:
+            widgets_text = []
+            for widget in page.widgets():
+                if widget.field_value:
+                    widgets_text.append(str(widget.field_value))
+            if widgets_text:
+                text = text + "\n" + "\n".join(widgets_text)
+        
+        return text
+    
+    def _page_image_coverage(self, page) -> float:
+        """Fracción del área de la página cubierta por imágenes (0.0 - 1.0)"""
+        page_rect = page.rect
+        page_area = page_rect.width * page_rect.height
+        if page_area <= 0:
+            return 0.0
+        
+        image_area = 0.0
+        for image in page.get_images(full=True):
+            for rect in page.get_image_rects(image[0]):
+                visible = rect & page_rect
+                if not visible.is_empty:
+                    image_area += visible.width * visible.height
+        return min(image_area / page_area, 1.0)
+    
+    def _page_needs_ocr(self, page, page_text: str) -> bool:
+        """
+        Clasifica una página como escaneada (necesita OCR) o con capa de texto nativa.
+        Usa la longitud del texto nativo, la cobertura de imágenes y las palabras clave
+        de encabezado/contenido médico.
+        """
+        content_length = len(page_text.strip())
+        if content_length < self.MIN_NATIVE_PAGE_CHARS:
+            return True
+        if content_length >= self.MAX_STAMP_PAGE_CHARS:
+            return False
+        
+        hits = self.KEYWORD_SCANNER.scan(fold_text(page_text))
+        if len(hits.found(self.MEDICAL_KEYWORDS)) >= 3:
+            return False
+        
+        # Poco texto y sin contenido médico: sello/encabezado sobre una imagen escaneada
+        has_header = hits.any(self.HEADER_KEYWORDS)
+        return has_header or self._page_image_coverage(page) >= self.MIN_IMAGE_COVERAGE
+    
+    def _extract_hybrid(self, pdf_content: bytes, page_texts: List[str]) -> Tuple[str, bool]:
+        """
+        Aplica OCR solo a las páginas sin capa de texto útil y combina el resultado
+        con el texto nativo del resto de páginas, respetando el orden del documento.
+        
+        Returns:
+            (texto, incluye_texto_nativo): el segundo valor es False si se aplicó OCR a todo el documento
+        """
+        doc = fitz.open(stream=pdf_content, filetype="pdf")
+        try:
+            scanned_pages = [
+                page_num for page_num in range(len(doc))
+                if self._page_needs_ocr(doc[page_num], page_texts[page_num])
+            ]
+        finally:
+            doc.close()
+        
+        if not scanned_pages:
+            # Ninguna página parece escaneada, pero el documento en conjunto no tiene contenido: OCR completo
+            self._add_log(f"No se identificaron páginas escaneadas. Aplicando OCR a todo el documento...", "WARNING")
+            return self._extract_with_ocr(pdf_content), False
+        
+        self._add_log(
+            f"Páginas escaneadas: {len(scanned_pages)}/{len(page_texts)} "
+            f"({', '.join(str(n + 1) for n in scanned_pages)}). Solo estas se procesarán con OCR."
+        )
+        ocr_texts = self._ocr_page_texts(pdf_content, scanned_pages)
+        
+        merged = list(page_texts)
+        for page_num, ocr_page_text in zip(scanned_pages, ocr_texts):
+            if not ocr_page_text.strip():
+                continue
+            if len(page_texts[page_num].strip()) < self.MIN_NATIVE_PAGE_CHARS:
+                merged[page_num] = ocr_page_text
+            else:
+                # Página con sello/encabezado nativo sobre la imagen escaneada: conservar ambos
+                merged[page_num] = page_texts[page_num].rstrip() + "\n" + ocr_page_text
+        full_text = "\n\n".join(merged)
+        self._add_log(f"Total extraído (nativo + OCR): {len(full_text)} caracteres", "SUCCESS")
+        return full_text, True
+    
+    def _extract_with_ocr(self, pdf_content: bytes) -> str:
         """Extrae texto de PDFs escaneados usando EasyOCR"""
+        text_parts = self._ocr_page_texts(pdf_content)
+        full_text = "\n\n".join(text_parts)
+        self._add_log(f"Total extraído: {len(full_text)} caracteres", "SUCCESS")
+        return full_text
+    
+    def _ocr_page_texts(self, pdf_content: bytes, page_numbers: Optional[List[int]] = None) -> List[str]:
+        """
+        Aplica OCR a las páginas indicadas (todas por defecto)
+        
+        Returns:
+            Texto reconocido de cada página, en el mismo orden que page_numbers
+        """
         if not EASYOCR_AVAILABLE:
             raise Exception(
                 "EasyOCR no está disponible. Para PDFs escaneados, se requiere EasyOCR. "
                 "En Vercel, considere usar un servicio externo de OCR o convertir el PDF a texto antes de subirlo."
             )
         
+        if page_numbers is None:
+            doc = fitz.open(stream=pdf_content, filetype="pdf")
+            page_numbers = list(range(len(doc)))
+            doc.close()
+        
+        if self.process_pool is not None:
+            try:
+                return self._ocr_pages_parallel(pdf_content, page_numbers)
+            except Exception as parallel_error:
+                self._add_log(f"Error en OCR paralelo: {str(parallel_error)}. Continuando en modo secuencial...", "WARNING")
+        
+        with self._borrow_reader() as reader:
+            return self._ocr_pages(pdf_content, reader, page_numbers)
+    
+    @contextmanager
+    def _borrow_reader(self):
+        """Obtiene un lector EasyOCR: del pool compartido si existe, o uno propio de la instancia"""
+        if self.reader_pool is not None:
+            self._add_log(f"Solicitando lector EasyOCR al pool compartido...")
+            with self.reader_pool.reader() as reader:
+                self._add_log(f"Lector EasyOCR obtenido del pool", "SUCCESS")
+                yield reader
+            return
+        
         self._add_log(f"Inicializando EasyOCR...")
         try:
             if self.easyocr_reader is None:
@@ -326,37 +538,39 @@ class OCRService:
         except Exception as e:
             self._add_log(f"Error crítico en inicialización de OCR: {str(e)}", "ERROR")
             raise
-        
+        yield self.easyocr_reader
+    
+    def _ocr_pages(self, pdf_content: bytes, reader, page_numbers: List[int]) -> List[str]:
+        """Renderiza y reconoce las páginas indicadas con el lector indicado"""
         doc = fitz.open(stream=pdf_content, filetype="pdf")
         text_parts = []
         total_pages = len(doc)
         
-        self._add_log(f"Procesando {total_pages} página(s) con OCR...")
+        self._add_log(f"Procesando {len(page_numbers)} página(s) con OCR...")
         
-        for page_num in range(total_pages):
+        for page_num in page_numbers:
             page = doc[page_num]
             self._add_log(f"Procesando página {page_num + 1}/{total_pages}...")
             
-            # Convertir página a imagen con mayor resolución para mejor OCR
-            # Matrix(3, 3) = 3x zoom para mejor calidad
-            pix = page.get_pixmap(matrix=fitz.Matrix(3, 3))
-            img_data = pix.tobytes("png")
-            img = Image.open(io.BytesIO(img_data))
-            img_array = np.array(img)
-            
-            # Realizar OCR
+            # Convertir página a imagen con mayor resolución y realizar OCR
             self._add_log(f"Ejecutando OCR en página {page_num + 1}...")
-            results = self.easyocr_reader.readtext(img_array)
-            page_text = " ".join([result[1] for result in results])
+            page_text = ocr_page(reader, page, self.page_options)
             self._add_log(f"Página {page_num + 1}: {len(page_text)} caracteres extraídos")
             text_parts.append(page_text)
         
         doc.close()
-        full_text = "\n\n".join(text_parts)
-        self._add_log(f"Total extraído: {len(full_text)} caracteres", "SUCCESS")
-        return full_text
+        return text_parts
+    
+    def _ocr_pages_parallel(self, pdf_content: bytes, page_numbers: List[int]) -> List[str]:
+        """Reparte las páginas indicadas entre los procesos del pool y reensambla el texto en orden"""
+        self._add_log(f"Procesando {len(page_numbers)} página(s) con OCR en paralelo ({self.process_pool.workers} procesos)...")
+        
+        def on_page(page_num: int, page_text: str):
+            self._add_log(f"Página {page_num + 1}: {len(page_text)} caracteres extraídos")
+        
+        return self.process_pool.ocr_pages(pdf_content, page_numbers, on_page=on_page, options=self.page_options)
     
-    async def _extract_from_docx(self, docx_content: bytes) -> str:
+    def _extract_from_docx(self, docx_content: bytes) -> str:
         """
         Extrae texto de un archivo .docx
         
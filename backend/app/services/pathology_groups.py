@@ -0,0 +1,78 @@
+"""
+Índice de los grupos jerárquicos de patologías (causa anatómica > consecuencia funcional).
+Las palabras clave primarias y secundarias de todos los grupos se compilan en un único
+buscador, de modo que cada diagnóstico se recorre una sola vez; cada palabra clave lleva
+la máscara de bits de los grupos en los que es primaria o secundaria, y la compatibilidad
+de la parte del cuerpo con cada grupo se calcula una vez por parte del cuerpo distinta.
+El resultado se memoriza por (texto normalizado, parte del cuerpo) en una caché LRU acotada.
+Las palabras clave se comparan sin tildes, como el texto normalizado del motor legal.
+"""
+from functools import lru_cache
+from typing import Dict, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from app.services.keyword_scanner import KeywordScanner
+from app.services.normalized_text import fold_text
+
+
+class DiagnosisGroups(NamedTuple):
+    """Relación de un diagnóstico con los grupos (índices en el orden de las tablas)"""
+    principal: Optional[int]  # Primer grupo del que es diagnóstico principal
+    members: Tuple[int, ...]  # Grupos que lo subsumen (palabra clave primaria o secundaria)
+    secondary: bool  # Si es consecuencia funcional de algún grupo
+
+
+def _bits(mask: int) -> Tuple[int, ...]:
+    """Índices de los bits activos, de menor a mayor"""
+    indexes = []
+    while mask:
+        lowest = mask & -mask
+        indexes.append(lowest.bit_length() - 1)
+        mask ^= lowest
+    return tuple(indexes)
+
+
+class PathologyGroupIndex:
+    """
+    Buscador compilado de las palabras clave de los grupos jerárquicos
+
+    Args:
+        groups: Grupos con "body_part", "primary_keywords" y "secondary_keywords"
+        cache_size: Pares (texto normalizado, parte del cuerpo) memorizados
+    """
+
+    def __init__(self, groups: Sequence[Mapping], cache_size: int = 4096):
+        self.groups = groups
+        # Palabra clave (sin tildes) -> grupos en los que es primaria / secundaria (bit i = grupo i)
+        self._primary_mask: Dict[str, int] = {}
+        self._secondary_mask: Dict[str, int] = {}
+        for index, group in enumerate(groups):
+            for keyword in map(fold_text, group["primary_keywords"]):
+                self._primary_mask[keyword] = self._primary_mask.get(keyword, 0) | 1 << index
+            for keyword in map(fold_text, group["secondary_keywords"]):
+                self._secondary_mask[keyword] = self._secondary_mask.get(keyword, 0) | 1 << index
+        self._scanner = KeywordScanner([*self._primary_mask, *self._secondary_mask], folded=True)
+        self._compatible: Dict[Optional[str], int] = {}
+        self.match = lru_cache(maxsize=cache_size)(self._match)
+
+    def _compatible_groups(self, body_part: Optional[str]) -> int:
+        """Máscara de los grupos compatibles con la parte del cuerpo (sin parte o "general": todos)"""
+        compatible = self._compatible.get(body_part)
+        if compatible is None:
+            compatible = 0
+            for index, group in enumerate(self.groups):
+                if not (body_part and body_part != "general" and group["body_part"] not in body_part):
+                    compatible |= 1 << index
+            self._compatible[body_part] = compatible
+        return compatible
+
+    def _match(self, normalized_text: str, body_part: Optional[str]) -> DiagnosisGroups:
+        """Grupos de un diagnóstico según su texto normalizado y su parte del cuerpo"""
+        primary = secondary = 0
+        for keyword in self._scanner.scan(normalized_text).positions:
+            primary |= self._primary_mask.get(keyword, 0)
+            secondary |= self._secondary_mask.get(keyword, 0)
+        compatible = self._compatible_groups(body_part)
+        primary &= compatible
+        secondary &= compatible
+        principal = (primary & -primary).bit_length() - 1 if primary else None
+        return DiagnosisGroups(principal, _bits(primary | secondary), bool(secondary))
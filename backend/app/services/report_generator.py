@@ -7,6 +7,8 @@ from datetime import datetime
 from typing import Dict, List, Optional, Tuple, Any
 import re
 
+from app.services.normalized_text import NormalizedDocument, fold_text
+
 
 class ReportGenerator:
     """Genera informes legales completos con comparación de documentos"""
@@ -270,7 +272,7 @@ class ReportGenerator:
         if not extracted_text:
             return lines
         
-        text_lower = extracted_text.lower()
+        document = NormalizedDocument(extracted_text)
         lines.append("FUNDAMENTOS MÉDICOS DETECTADOS EN LA RESOLUCIÓN:")
         lines.append("-" * 80)
         
@@ -291,7 +293,7 @@ class ReportGenerator:
             lines.append("")
         
         # Buscar si se menciona la fórmula de combinación
-        if 'combinación' in text_lower or 'fórmula' in text_lower:
+        if document.contains('combinación') or document.contains('fórmula'):
             lines.append("✓ La resolución menciona la aplicación de la fórmula de combinación")
             lines.append("  de deficiencias según el Art. 4.2 del RD 888/2022.")
         else:
@@ -302,9 +304,9 @@ class ReportGenerator:
         lines.append("")
         
         # Verificar baremos complementarios
-        has_bla = 'bla' in text_lower or 'limitaciones en la actividad' in text_lower
-        has_brp = 'brp' in text_lower or 'restricciones en la participación' in text_lower
-        has_bfca = 'bfca' in text_lower or 'factores contextuales' in text_lower
+        has_bla = document.contains('bla') or document.contains('limitaciones en la actividad')
+        has_brp = document.contains('brp') or document.contains('restricciones en la participación')
+        has_bfca = document.contains('bfca') or document.contains('factores contextuales')
         
         if has_bla or has_brp or has_bfca:
             lines.append("Baremos complementarios mencionados:")
@@ -550,9 +552,8 @@ class ReportGenerator:
         """Normaliza el texto de un diagnóstico para comparación"""
         if not text:
             return ""
-        # Convertir a minúsculas y eliminar espacios extra
-        normalized = text.lower().strip()
-        normalized = re.sub(r'\s+', ' ', normalized)
+        # Minúsculas, sin tildes y sin espacios extra (mismo criterio que NormalizedDocument)
+        normalized = fold_text(text).strip()
         # Eliminar artículos y palabras comunes
         normalized = re.sub(r'\b(el|la|los|las|de|del|de la|del|un|una)\b', '', normalized)
         normalized = re.sub(r'\s+', ' ', normalized).strip()
@@ -0,0 +1,178 @@
+"""
+Índice de intervalos de los umbrales de movilidad (ROM) del Anexo III del RD 888/2022.
+Los rangos de cada (articulación, movimiento) se guardan ordenados por su mínimo en listas
+paralelas, de modo que la clase de un valor se obtiene con una bisección en lugar de comparar
+nivel a nivel; la clase se compara como número. Para clasificar muchas mediciones a la vez
+(revaloración por lotes) todos los intervalos se concatenan en un único array ordenado por
+(articulación, métrica, mínimo) y se busca con `searchsorted`.
+"""
+import re
+from bisect import bisect_right
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Nivel de severidad del Anexo III -> clase de deficiencia
+SEVERITY_CLASSES = {"leve": 1, "moderado": 2, "grave": 3, "muy_grave": 4}
+# Clase de un valor fuera de todos los rangos (o de una articulación/métrica sin umbrales)
+NO_ROM_CLASS = 0
+# Grados máximos de un rango de movilidad (los valores mayores no se clasifican)
+MAX_ROM_DEGREES = 360.0
+
+# Tipos de métrica de movilidad que extrae el NLP
+ROM_METRIC_TYPES = (
+    "abduccion", "aduccion", "flexion", "extension", "rotacion", "rotacion_interna", "rotacion_externa",
+    "pronacion", "supinacion", "flexion_dorsal", "flexion_plantar", "inclinacion_lateral",
+    "desviacion_radial", "desviacion_cubital", "rom_global",
+)
+
+SIDES = ("derecha", "izquierda")
+_SIDE_PATTERN = re.compile(r"\b(?:(derech[oa]s?)|(izquierd[oa]s?)|(bilateral(?:es)?|ambos|ambas))\b")
+
+
+def side_of(text_lower: str) -> Optional[str]:
+    """Lateralidad de un texto en minúsculas ("derecha", "izquierda" o None si no consta o es bilateral)"""
+    sides = set()
+    for match in _SIDE_PATTERN.finditer(text_lower):
+        if match.group(3):
+            return None
+        sides.add("derecha" if match.group(1) else "izquierda")
+    return sides.pop() if len(sides) == 1 else None
+
+
+class RomIntervalIndex:
+    """
+    Umbrales de movilidad por (articulación, movimiento) indexados para búsqueda por bisección
+
+    Args:
+        rom_thresholds: Articulación -> movimiento -> {"metrics": [...], "levels": nivel -> (min, max)}
+            (rangos sin solapamiento; cada métrica en un solo movimiento por articulación)
+        joint_aliases: Parte del cuerpo -> articulación de las tablas
+    """
+
+    # Separación entre los intervalos de dos pares (articulación, métrica) en el array conjunto
+    _SEGMENT_WIDTH = 2 * MAX_ROM_DEGREES
+
+    def __init__(self, rom_thresholds: Mapping[str, Mapping], joint_aliases: Optional[Mapping[str, str]] = None):
+        self.joint_aliases = dict(joint_aliases or {})
+        # (articulación, movimiento) -> (mínimos, máximos, clases) ordenados por mínimo
+        self._intervals: Dict[Tuple[str, str], Tuple[List[float], List[float], List[int]]] = {}
+        # Articulación -> movimiento -> métricas que lo miden
+        self._movements: Dict[str, Dict[str, Tuple[str, ...]]] = {}
+        # (articulación, métrica) -> movimiento
+        self._metric_movement: Dict[Tuple[str, str], str] = {}
+        for joint, movements in rom_thresholds.items():
+            self._movements[joint] = {}
+            for movement, spec in movements.items():
+                ordered = sorted(
+                    (float(low), float(high), SEVERITY_CLASSES[level])
+                    for level, (low, high) in spec["levels"].items()
+                )
+                self._intervals[(joint, movement)] = (
+                    [low for low, _, _ in ordered],
+                    [high for _, high, _ in ordered],
+                    [class_num for _, _, class_num in ordered],
+                )
+                self._movements[joint][movement] = tuple(spec["metrics"])
+                for metric in spec["metrics"]:
+                    self._metric_movement[(joint, metric)] = movement
+        self._build_flat()
+
+    def _build_flat(self):
+        """Intervalos de todos los pares (articulación, métrica) concatenados para `classify_many`"""
+        self._segments: Dict[Tuple[str, str], int] = {}
+        keys, highs, classes, segments = [], [], [], []
+        for segment, (pair, movement) in enumerate(sorted(self._metric_movement.items())):
+            self._segments[pair] = segment
+            lows, movement_highs, movement_classes = self._intervals[(pair[0], movement)]
+            # Clave = segmento·ancho + mínimo: ordena por segmento y, dentro de él, por mínimo
+            keys.extend(segment * self._SEGMENT_WIDTH + low for low in lows)
+            highs.extend(movement_highs)
+            classes.extend(movement_classes)
+            segments.extend([segment] * len(lows))
+        # También por las partes del cuerpo con alias, para no resolver el alias en cada medición
+        self._pair_segments = dict(self._segments)
+        for body_part, joint in self.joint_aliases.items():
+            for (pair_joint, metric), segment in self._segments.items():
+                if pair_joint == joint:
+                    self._pair_segments.setdefault((body_part, metric), segment)
+        self._flat_keys = np.array(keys, dtype=float)
+        self._flat_highs = np.array(highs, dtype=float)
+        self._flat_classes = np.array(classes, dtype=np.int64)
+        self._flat_segments = np.array(segments, dtype=np.int64)
+
+    @property
+    def joints(self) -> Tuple[str, ...]:
+        return tuple(self._movements)
+
+    def joint_of(self, body_part: Optional[str]) -> Optional[str]:
+        """Articulación de las tablas para una parte del cuerpo (None si no tiene umbrales)"""
+        joint = self.joint_aliases.get(body_part, body_part)
+        return joint if joint in self._movements else None
+
+    def movement_of(self, joint: str, metric: str) -> Optional[str]:
+        """Movimiento de la articulación que mide una métrica"""
+        return self._metric_movement.get((joint, metric))
+
+    def class_of(self, joint: str, movement: str, value: float) -> int:
+        """Clase (0-4) de un valor para un movimiento; NO_ROM_CLASS si no cae en ningún rango"""
+        intervals = self._intervals.get((joint, movement))
+        if intervals is None:
+            return NO_ROM_CLASS
+        lows, highs, classes = intervals
+        index = bisect_right(lows, value) - 1
+        if index >= 0 and value <= highs[index]:
+            return classes[index]
+        return NO_ROM_CLASS
+
+    def classify_joint(self, joint: Optional[str], metrics: Mapping[str, float]) -> Optional[int]:
+        """
+        Peor clase de los movimientos medidos de una articulación
+
+        Cada movimiento se clasifica con el peor (menor) valor de sus métricas, p. ej. el menor
+        entre flexión y abducción del hombro.
+
+        Returns:
+            Clase 0-4 (NO_ROM_CLASS si no hay métricas de sus movimientos), o None si la
+            articulación no tiene umbrales
+        """
+        movements = self._movements.get(joint)
+        if movements is None:
+            return None
+        worst = NO_ROM_CLASS
+        for movement, movement_metrics in movements.items():
+            values = [metrics[metric] for metric in movement_metrics if metrics.get(metric) is not None]
+            if values:
+                worst = max(worst, self.class_of(joint, movement, min(values)))
+        return worst
+
+    def classify_many(self, joints: Sequence[Optional[str]], metrics: Sequence[str],
+                      values: Sequence[float]) -> np.ndarray:
+        """
+        Clase (0-4) de muchas mediciones a la vez (p. ej. para revalorar una cartera)
+
+        Args:
+            joints: Articulación (o parte del cuerpo) de cada medición
+            metrics: Tipo de métrica de cada medición
+            values: Grados de cada medición
+
+        Returns:
+            Array de enteros alineado con las mediciones; NO_ROM_CLASS si la articulación o la
+            métrica no tienen umbrales o el valor no cae en ningún rango
+        """
+        values = np.asarray(values, dtype=float)
+        segment_of = self._pair_segments.get
+        segments = np.fromiter((segment_of(pair, -1) for pair in zip(joints, metrics)),
+                               dtype=np.int64, count=len(values))
+        valid = (segments >= 0) & (values >= 0) & (values <= MAX_ROM_DEGREES)
+        if not self._flat_keys.size:
+            return np.full(len(values), NO_ROM_CLASS, dtype=np.int64)
+        keys = np.where(valid, segments * self._SEGMENT_WIDTH + values, -1.0)
+        index = np.searchsorted(self._flat_keys, keys, side="right") - 1
+        safe = np.maximum(index, 0)
+        inside = (
+            valid & (index >= 0)
+            & (self._flat_segments[safe] == segments)
+            & (values <= self._flat_highs[safe])
+        )
+        return np.where(inside, self._flat_classes[safe], NO_ROM_CLASS)
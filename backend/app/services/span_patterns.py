@@ -0,0 +1,116 @@
+"""
+Patrones "ancla … cola" sin retroceso cuadrático.
+Una expresión `ancla(?:.|\\n)*?cola` con un tramo perezoso sin límite recorre el resto del
+texto desde cada ancla que no va seguida de la cola, así que en sentencias largas (y con
+ruido de OCR) el coste crece con el cuadrado de la longitud. LazySpanPattern da las mismas
+coincidencias (mismo inicio, fin y grupos, también si el tramo cruza un encabezado de
+sección) calculando una sola vez por texto las posiciones de la cola y buscando con
+bisección la primera que sigue a cada ancla.
+"""
+import re
+from bisect import bisect_left
+from typing import Iterator, List, Optional
+
+
+class SpanMatch:
+    """Coincidencia ancla + cola con la interfaz de `re.Match` que usa la extracción (grupo 1 = cola)"""
+
+    lastindex = 1
+
+    def __init__(self, text: str, start: int, tail: re.Match):
+        self._text = text
+        self._start = start
+        self._tail = tail
+
+    def start(self, group: int = 0) -> int:
+        return self._tail.start(group) if group else self._start
+
+    def end(self, group: int = 0) -> int:
+        return self._tail.end(group)
+
+    def group(self, group: int = 0) -> str:
+        return self._tail.group(group) if group else self._text[self._start:self.end()]
+
+
+class LazySpanPattern:
+    """
+    Equivale a `ancla(?:.|\\n)*?cola` (o `ancla(?:.|\\n){0,N}?cola` con `max_gap=N`) con `finditer`.
+
+    Como en la expresión regular, para cada ancla (de izquierda a derecha) gana la primera
+    cola que empieza a como mucho `max_gap` caracteres de su final; si no hay ninguna, se
+    prueban los finales más cortos del ancla, de mayor a menor (el retroceso de un ancla que
+    termina en un cuantificador voraz, p. ej. "SEXTO.- " -> "SEXTO." cuando la cola es "- X").
+    El ancla no debe contener grupos de captura ni aserciones al final (`$`, `\\b`, lookahead).
+
+    Args:
+        anchor: Expresión del ancla
+        tail: Expresión de la cola (el grupo 1 es el diagnóstico)
+        tail_prefix: Expresión corta con la que empieza toda coincidencia de la cola
+        max_gap: Separación máxima entre ancla y cola (None: sin límite)
+    """
+
+    def __init__(self, anchor: str, tail: str, tail_prefix: str, max_gap: Optional[int] = None,
+                 flags: int = re.IGNORECASE | re.MULTILINE):
+        self.anchor = re.compile(anchor, flags)
+        self.tail = re.compile(tail, flags)
+        self.tail_prefix = re.compile(tail_prefix, flags)
+        self.max_gap = max_gap
+
+    def _tail_matches(self, text: str) -> List[re.Match]:
+        """Todas las posiciones (incluso solapadas) donde coincide la cola"""
+        matches = []
+        candidate = self.tail_prefix.search(text)
+        while candidate:
+            tail = self.tail.match(text, candidate.start())
+            if tail:
+                matches.append(tail)
+            candidate = self.tail_prefix.search(text, candidate.start() + 1)
+        return matches
+
+    def _first_tail(self, tail_starts: List[int], anchor_end: int) -> Optional[int]:
+        """Índice de la primera cola dentro de la separación máxima tras un final del ancla"""
+        index = bisect_left(tail_starts, anchor_end)
+        if index == len(tail_starts):
+            return None
+        if self.max_gap is not None and tail_starts[index] > anchor_end + self.max_gap:
+            return None
+        return index
+
+    def _backtrack(self, text: str, anchor: re.Match, tail_starts: List[int]) -> Optional[int]:
+        """
+        Cola tras un final más corto del ancla. Solo puede haberla si alguna cola empieza dentro
+        del ancla: las que empiezan después ya estaban en la ventana del final más largo.
+        """
+        last_inside = bisect_left(tail_starts, anchor.end()) - 1
+        if last_inside < 0 or tail_starts[last_inside] <= anchor.start():
+            return None
+        for end in range(tail_starts[last_inside], anchor.start(), -1):
+            if self.anchor.fullmatch(text, anchor.start(), end):
+                index = self._first_tail(tail_starts, end)
+                if index is not None:
+                    return index
+        return None
+
+    def finditer(self, text: str) -> Iterator[SpanMatch]:
+        """Coincidencias sin solapamiento, de izquierda a derecha (como `re.finditer`)"""
+        tails: Optional[List[re.Match]] = None
+        tail_starts: List[int] = []
+
+        position = 0
+        while position <= len(text):
+            anchor = self.anchor.search(text, position)
+            if not anchor:
+                return
+            if tails is None:
+                tails = self._tail_matches(text)
+                tail_starts = [tail.start() for tail in tails]
+
+            index = self._first_tail(tail_starts, anchor.end())
+            if index is None:
+                index = self._backtrack(text, anchor, tail_starts)
+            if index is not None:
+                tail = tails[index]
+                yield SpanMatch(text, anchor.start(), tail)
+                position = tail.end()
+            else:
+                position = anchor.start() + 1
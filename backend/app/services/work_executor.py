@@ -0,0 +1,92 @@
+"""
+Ejecutor acotado para el trabajo bloqueante del pipeline (PDF/OCR/NLP/motor legal).
+Las etapas son las partes síncronas de los servicios (`*_sync`) y se llaman directamente
+en un hilo trabajador, sin crear un bucle de eventos por llamada; así el bucle de uvicorn
+queda libre (p. ej. /health sigue respondiendo durante un OCR).
+Incluye una cola de admisión: si está llena, las nuevas peticiones se rechazan.
+
+Hilos y procesos: la etapa más pesada, la extracción de entidades (expresiones regulares
+en Python, ~60 % del tiempo de CPU del análisis de una sentencia), se hace en NLPProcessPool
+si está configurado (NLP_PARALLEL_WORKERS), y el OCR de páginas escaneadas en OCRProcessPool;
+lo que queda en los hilos (lectura del PDF, motor legal) retiene el GIL en tramos de como
+mucho ~12 ms (~16 ms la extracción, si se hace en hilos). Medido con `benchmark.py health` (4 análisis simultáneos de un PDF nativo de
+240.000 caracteres, en una máquina de 1 CPU compartida con el cliente): /health responde en
+2,8 ms de mediana en reposo y en ~55 ms de mediana (p99 200-340 ms) con carga, igual con la
+extracción en hilos que en procesos: con un solo núcleo el bucle espera a la CPU, no al GIL.
+Con varios núcleos, sacar la extracción a procesos libera el GIL para el bucle de eventos.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class WorkExecutor:
+    """Pool de hilos con concurrencia limitada y cola de admisión acotada"""
+
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 8, retry_after: int = 30):
+        if max_concurrency < 1:
+            raise ValueError("La concurrencia máxima debe ser al menos 1")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="analysis")
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._running = 0
+        # Métricas
+        self._rejected = 0
+        self._completed = 0
+
+    def try_acquire(self) -> bool:
+        """Admite una petición si hay hueco (en ejecución + en cola); False si la cola está llena"""
+        with self._lock:
+            if self._admitted >= self.max_concurrency + self.max_queue:
+                self._rejected += 1
+                return False
+            self._admitted += 1
+            return True
+
+    def release(self):
+        """Libera el hueco de una petición admitida"""
+        with self._lock:
+            self._admitted -= 1
+            self._completed += 1
+
+    def _tracked(self, call: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._running += 1
+        try:
+            return call()
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Ejecuta una etapa bloqueante en el pool sin bloquear el bucle de eventos
+
+        Args:
+            func: Función síncrona (p. ej. OCRService.extract_text_sync)
+        """
+        if asyncio.iscoroutinefunction(func):
+            raise TypeError("Las etapas del ejecutor deben ser funciones síncronas")
+        call = functools.partial(func, *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._tracked, call)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "admitted": self._admitted,
+                "running": self._running,
+                "queued": max(self._admitted - self._running, 0),
+                "rejected": self._rejected,
+                "completed": self._completed,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,406 @@
+"""
+Benchmarks de rendimiento del pipeline de extracción
+
+Uso:
+    python benchmark.py render <documento.pdf> [--zoom 3] [--pages N]
+    python benchmark.py ocr <documento.pdf> [...] [--low-zoom 1.5] [--high-zoom 3] [--min-confidence 0.5]
+    python benchmark.py batch <texto.txt> [...] [--workers 0 2 4] [--repeat 1]
+    python benchmark.py valuation [--cases 50000] [--max-chapters 8] [--seed 0]
+    python benchmark.py rom [--measurements 200000] [--seed 0]
+    python benchmark.py health <documento.pdf> [...] [--url http://127.0.0.1:8000] [--clients 4] [--requests 2]
+"""
+import argparse
+import multiprocessing
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Agregar el directorio actual al path
+sys.path.insert(0, str(Path(__file__).parent))
+
+try:
+    import resource  # Solo disponible en Unix
+except ImportError:
+    resource = None
+
+
+def _peak_rss_mb():
+    """Pico de memoria residente del proceso en MB (None si no está disponible)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux devuelve KB, macOS devuelve bytes
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def _render_worker(method: str, pdf_path: str, zoom: float, max_pages, queue):
+    """Renderiza las páginas en un proceso aislado para medir su pico de memoria por separado"""
+    import fitz
+    from app.services.ocr_pages import render_page_array, render_page_array_png
+
+    renderers = {
+        "png": lambda page: render_page_array_png(page, zoom=zoom),
+        "numpy_rgb": lambda page: render_page_array(page, zoom=zoom),
+        "numpy_gray": lambda page: render_page_array(page, zoom=zoom, grayscale=True),
+    }
+    render = renderers[method]
+
+    doc = fitz.open(pdf_path)
+    total_pages = len(doc) if max_pages is None else min(len(doc), max_pages)
+    rss_before = _peak_rss_mb()
+    times = []
+    nbytes = 0
+    for page_num in range(total_pages):
+        start = time.perf_counter()
+        img_array = render(doc[page_num])
+        times.append(time.perf_counter() - start)
+        nbytes = max(nbytes, img_array.nbytes)
+        del img_array
+    doc.close()
+    queue.put({
+        "method": method,
+        "pages": total_pages,
+        "times": times,
+        "array_mb": nbytes / 1024 / 1024,
+        "rss_before_mb": rss_before,
+        "rss_peak_mb": _peak_rss_mb(),
+    })
+
+
+def benchmark_render(pdf_path: str, zoom: float, max_pages=None):
+    """Compara el renderizado PNG → PIL → NumPy con la vista NumPy sin copia (RGB y grises)"""
+    print("=" * 80)
+    print(f"BENCHMARK DE RENDERIZADO PARA OCR: {pdf_path} (zoom {zoom}x)")
+    print("=" * 80)
+    print()
+    print(f"{'Método':<12} {'Páginas':>7} {'ms/página':>10} {'p95 ms':>8} {'Array MB':>9} {'RSS pico MB':>12} {'Δ RSS MB':>9}")
+    print("-" * 80)
+
+    ctx = multiprocessing.get_context("spawn")
+    for method in ("png", "numpy_rgb", "numpy_gray"):
+        queue = ctx.Queue()
+        process = ctx.Process(target=_render_worker, args=(method, pdf_path, zoom, max_pages, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+
+        times_ms = [t * 1000 for t in result["times"]] or [0.0]
+        p95 = sorted(times_ms)[int(0.95 * (len(times_ms) - 1))]
+        if result["rss_peak_mb"] is not None:
+            rss_peak = f"{result['rss_peak_mb']:.1f}"
+            rss_delta = f"{result['rss_peak_mb'] - result['rss_before_mb']:.1f}"
+        else:
+            rss_peak = rss_delta = "N/D"
+        print(f"{method:<12} {result['pages']:>7} {statistics.mean(times_ms):>10.1f} {p95:>8.1f} "
+              f"{result['array_mb']:>9.1f} {rss_peak:>12} {rss_delta:>9}")
+    print()
+
+
+def _ocr_corpus(pdf_paths, options):
+    """OCR de todas las páginas de cada PDF; devuelve {ruta: (segundos, páginas, texto)}"""
+    import fitz
+    import easyocr
+    from app.services.ocr_pages import ocr_page
+
+    reader = easyocr.Reader(["es", "en"], gpu=False)
+    results = {}
+    for pdf_path in pdf_paths:
+        doc = fitz.open(pdf_path)
+        start = time.perf_counter()
+        page_texts = [ocr_page(reader, page, options) for page in doc]
+        results[pdf_path] = (time.perf_counter() - start, len(doc), "\n\n".join(page_texts))
+        doc.close()
+    return results
+
+
+def benchmark_ocr(pdf_paths, low_zoom: float, high_zoom: float, min_confidence: float):
+    """Compara el OCR de pasada única a alto zoom con el OCR adaptativo por confianza"""
+    import asyncio
+    from app.services.nlp_service import NLPService
+    from app.services.ocr_pages import OCRPageOptions
+
+    print("=" * 80)
+    print(f"BENCHMARK DE OCR ADAPTATIVO: {len(pdf_paths)} documento(s)")
+    print("=" * 80)
+    print()
+
+    single = _ocr_corpus(pdf_paths, OCRPageOptions(high_zoom=high_zoom))
+    adaptive = _ocr_corpus(pdf_paths, OCRPageOptions(
+        adaptive=True, low_zoom=low_zoom, high_zoom=high_zoom, min_confidence=min_confidence
+    ))
+
+    nlp_service = NLPService()
+
+    def diagnoses(text):
+        entities = asyncio.run(nlp_service.extract_entities(text))
+        return {d["text"].lower() for d in entities["DIAGNOSIS"]}
+
+    print(f"{'Documento':<30} {'Págs':>5} {'Única s':>8} {'Adapt. s':>9} {'Mejora':>7} {'Diag. única':>12} {'Perdidos':>9}")
+    print("-" * 86)
+    total_single = total_adaptive = 0.0
+    total_lost = 0
+    for pdf_path in pdf_paths:
+        single_time, pages, single_text = single[pdf_path]
+        adaptive_time, _, adaptive_text = adaptive[pdf_path]
+        single_diagnoses = diagnoses(single_text)
+        lost = single_diagnoses - diagnoses(adaptive_text)
+        total_single += single_time
+        total_adaptive += adaptive_time
+        total_lost += len(lost)
+        speedup = single_time / adaptive_time if adaptive_time else 0.0
+        print(f"{Path(pdf_path).name[:30]:<30} {pages:>5} {single_time:>8.2f} {adaptive_time:>9.2f} "
+              f"{speedup:>6.2f}x {len(single_diagnoses):>12} {len(lost):>9}")
+        for diagnosis in sorted(lost):
+            print(f"    - perdido: {diagnosis}")
+    print("-" * 86)
+    speedup = total_single / total_adaptive if total_adaptive else 0.0
+    print(f"{'TOTAL':<30} {'':>5} {total_single:>8.2f} {total_adaptive:>9.2f} {speedup:>6.2f}x {'':>12} {total_lost:>9}")
+    print()
+
+
+def benchmark_batch(text_paths, workers_list, repeat: int):
+    """Rendimiento de la extracción de entidades por lotes, secuencial y con pool de procesos"""
+    from app.services.nlp_process_pool import BatchThroughput
+    from app.services.nlp_service import NLPService
+
+    texts = [Path(path).read_text(encoding="utf-8", errors="replace") for path in text_paths] * repeat
+    total_chars = sum(len(text) for text in texts)
+
+    print("=" * 80)
+    print(f"BENCHMARK DE EXTRACCIÓN POR LOTES: {len(texts)} texto(s), {total_chars} caracteres")
+    print("=" * 80)
+    print()
+    print(f"{'Procesos':>8} {'Segundos':>9} {'Docs/s':>9} {'Caracteres/s':>13} {'Iguales':>8}")
+    print("-" * 52)
+
+    nlp_service = NLPService()
+    reference = None
+    for workers in workers_list:
+        throughput = BatchThroughput()
+        results = list(nlp_service.extract_entities_batch(texts, workers=workers, throughput=throughput))
+        if reference is None:
+            reference = results
+        same = "sí" if results == reference else "NO"
+        label = "secuencial" if workers == 0 else str(workers)
+        print(f"{label:>8} {throughput.seconds:>9.2f} {throughput.documents_per_second:>9.1f} "
+              f"{throughput.characters_per_second:>13.0f} {same:>8}")
+    print()
+
+
+def benchmark_valuation(case_count: int, max_chapters: int, seed: int):
+    """Fórmula de combinación: cálculo escalar caso a caso frente al cálculo por lotes con NumPy"""
+    import random
+    from app.services.legal_engine import LegalEngine
+
+    legal_engine = LegalEngine()
+    via_values = sorted({class_data["via"] for class_data in legal_engine.classes_via.values()})
+    rng = random.Random(seed)
+    cases = [[rng.choice(via_values) for _ in range(rng.randint(1, max_chapters))] for _ in range(case_count)]
+
+    print("=" * 80)
+    print(f"BENCHMARK DE VALORACIÓN COMBINADA: {case_count} caso(s), hasta {max_chapters} capítulo(s)")
+    print("=" * 80)
+    print()
+
+    start = time.perf_counter()
+    scalar = [
+        legal_engine._calculate_final_valuation([{"percentage": p, "confidence": 1.0} for p in case])
+        for case in cases
+    ]
+    scalar_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = legal_engine.valuate_batch(cases)
+    batch_seconds = time.perf_counter() - start
+
+    same = all(
+        result["bdgp_percentage"] == bdgp and result["final_class"] == final_class
+        for result, bdgp, final_class in zip(scalar, batch.bdgp_percentage.tolist(), batch.final_class.tolist())
+    )
+    print(f"{'Método':<10} {'Segundos':>9} {'Casos/s':>12}")
+    print("-" * 33)
+    print(f"{'escalar':<10} {scalar_seconds:>9.3f} {case_count / scalar_seconds:>12.0f}")
+    print(f"{'lotes':<10} {batch_seconds:>9.3f} {case_count / batch_seconds:>12.0f}")
+    print()
+    print(f"Aceleración: {scalar_seconds / batch_seconds:.1f}x - Resultados iguales: {'sí' if same else 'NO'}")
+    print()
+
+
+def benchmark_rom(measurement_count: int, seed: int):
+    """Clasificación por movilidad (ROM): bisección medición a medición frente a searchsorted por lotes"""
+    import random
+    from app.services.legal_engine import LegalEngine
+
+    legal_engine = LegalEngine()
+    rom_index = legal_engine.rom_index
+    pairs = [(joint, metric) for joint, movements in legal_engine.rom_thresholds.items()
+             for movement in movements.values() for metric in movement["metrics"]]
+    rng = random.Random(seed)
+    measurements = [(*rng.choice(pairs), rng.uniform(0, 180)) for _ in range(measurement_count)]
+
+    print("=" * 80)
+    print(f"BENCHMARK DE CLASIFICACIÓN POR MOVILIDAD: {measurement_count} medición(es), {len(pairs)} par(es) articulación/métrica")
+    print("=" * 80)
+    print()
+
+    start = time.perf_counter()
+    scalar = [rom_index.class_of(joint, rom_index.movement_of(joint, metric), value) for joint, metric, value in measurements]
+    scalar_seconds = time.perf_counter() - start
+
+    joints, metrics, values = zip(*measurements)
+    start = time.perf_counter()
+    batch = legal_engine.classify_rom_batch(joints, metrics, values)
+    batch_seconds = time.perf_counter() - start
+
+    same = scalar == batch.tolist()
+    print(f"{'Método':<10} {'Segundos':>9} {'Mediciones/s':>14}")
+    print("-" * 35)
+    print(f"{'escalar':<10} {scalar_seconds:>9.3f} {measurement_count / scalar_seconds:>14.0f}")
+    print(f"{'lotes':<10} {batch_seconds:>9.3f} {measurement_count / batch_seconds:>14.0f}")
+    print()
+    print(f"Aceleración: {scalar_seconds / batch_seconds:.1f}x - Resultados iguales: {'sí' if same else 'NO'}")
+    print()
+
+
+def _post_document(url: str, path: str) -> int:
+    """Envía un documento a /api/analyze (multipart) y devuelve el código de estado"""
+    import urllib.request
+    import uuid
+
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{Path(path).name}\"\r\n"
+        f"Content-Type: application/pdf\r\n\r\n"
+    ).encode() + Path(path).read_bytes() + f"\r\n--{boundary}--\r\n".encode()
+    request = urllib.request.Request(f"{url}/api/analyze", body,
+                                     {"Content-Type": f"multipart/form-data; boundary={boundary}"})
+    with urllib.request.urlopen(request, timeout=600) as response:
+        return response.status
+
+
+def _health_latencies(url: str, seconds: float, keep_going=lambda: True):
+    """Latencias (ms) de /health consultado cada 10 ms durante `seconds` o mientras `keep_going()`"""
+    import urllib.request
+
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline and keep_going():
+        start = time.perf_counter()
+        with urllib.request.urlopen(f"{url}/health", timeout=30) as response:
+            response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.01)
+    return latencies
+
+
+def benchmark_health(pdf_paths, url: str, clients: int, requests_per_client: int):
+    """Latencia de /health en reposo y con análisis simultáneos (contra un servidor en marcha)"""
+    import threading
+
+    def percentile(values, fraction):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    print("=" * 80)
+    print(f"BENCHMARK DE LATENCIA DE /health: {clients} cliente(s) x {requests_per_client} análisis")
+    print("=" * 80)
+    print()
+    print("Desactive las cachés del servidor (EXTRACTION_CACHE_ENABLED=false, ANALYSIS_CACHE_ENTRIES=0)")
+    print("y admita todos los clientes (ANALYSIS_MAX_CONCURRENCY) para medir el trabajo real.")
+    print()
+
+    idle = _health_latencies(url, 5)
+    durations = []
+    errors = []
+
+    def client(index: int):
+        for request in range(requests_per_client):
+            path = pdf_paths[(index * requests_per_client + request) % len(pdf_paths)]
+            start = time.perf_counter()
+            try:
+                _post_document(url, path)
+                durations.append(time.perf_counter() - start)
+            except Exception as e:
+                errors.append(str(e))
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    loaded = _health_latencies(url, float("inf"), lambda: any(thread.is_alive() for thread in threads))
+    for thread in threads:
+        thread.join()
+
+    print(f"{'Situación':<12} {'Muestras':>8} {'p50 (ms)':>9} {'p99 (ms)':>9} {'Máx (ms)':>9}")
+    print("-" * 51)
+    for label, latencies in (("reposo", idle), ("con carga", loaded)):
+        if latencies:
+            print(f"{label:<12} {len(latencies):>8} {percentile(latencies, 0.5):>9.1f} "
+                  f"{percentile(latencies, 0.99):>9.1f} {max(latencies):>9.1f}")
+    print()
+    if durations:
+        print(f"Análisis completados: {len(durations)} (media {statistics.mean(durations):.2f} s)")
+    if errors:
+        print(f"Análisis con error: {len(errors)} (primero: {errors[0]})")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del pipeline de JurisMed AI")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    render_parser = subparsers.add_parser("render", help="Tiempo y memoria del renderizado de páginas para OCR")
+    render_parser.add_argument("pdf", help="Ruta del PDF")
+    render_parser.add_argument("--zoom", type=float, default=3, help="Factor de zoom (por defecto 3)")
+    render_parser.add_argument("--pages", type=int, default=None, help="Número máximo de páginas")
+
+    ocr_parser = subparsers.add_parser("ocr", help="OCR de pasada única frente a OCR adaptativo por confianza")
+    ocr_parser.add_argument("pdfs", nargs="+", help="Rutas de los PDF escaneados")
+    ocr_parser.add_argument("--low-zoom", type=float, default=1.5, help="Zoom de la primera pasada (por defecto 1.5)")
+    ocr_parser.add_argument("--high-zoom", type=float, default=3, help="Zoom de alta resolución (por defecto 3)")
+    ocr_parser.add_argument("--min-confidence", type=float, default=0.5, help="Confianza mínima (por defecto 0.5)")
+
+    batch_parser = subparsers.add_parser("batch", help="Extracción de entidades por lotes (documentos/s y caracteres/s)")
+    batch_parser.add_argument("texts", nargs="+", help="Ficheros de texto ya extraído (UTF-8)")
+    batch_parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4],
+                              help="Número de procesos a probar (0 = secuencial; por defecto 0 2 4)")
+    batch_parser.add_argument("--repeat", type=int, default=1, help="Repetir la lista de textos N veces")
+
+    valuation_parser = subparsers.add_parser("valuation", help="Valoración combinada escalar frente a por lotes (NumPy)")
+    valuation_parser.add_argument("--cases", type=int, default=50000, help="Número de casos (por defecto 50000)")
+    valuation_parser.add_argument("--max-chapters", type=int, default=8, help="Capítulos máximos por caso (por defecto 8)")
+    valuation_parser.add_argument("--seed", type=int, default=0, help="Semilla de los casos aleatorios")
+
+    rom_parser = subparsers.add_parser("rom", help="Clasificación por movilidad (ROM) escalar frente a por lotes")
+    rom_parser.add_argument("--measurements", type=int, default=200000, help="Número de mediciones (por defecto 200000)")
+    rom_parser.add_argument("--seed", type=int, default=0, help="Semilla de las mediciones aleatorias")
+
+    health_parser = subparsers.add_parser("health", help="Latencia de /health con análisis simultáneos (servidor en marcha)")
+    health_parser.add_argument("pdfs", nargs="+", help="Rutas de los PDF que se envían a /api/analyze")
+    health_parser.add_argument("--url", default="http://127.0.0.1:8000", help="URL del servidor (por defecto http://127.0.0.1:8000)")
+    health_parser.add_argument("--clients", type=int, default=4, help="Clientes simultáneos (por defecto 4)")
+    health_parser.add_argument("--requests", type=int, default=2, help="Análisis por cliente (por defecto 2)")
+
+    args = parser.parse_args()
+    paths = {"render": lambda: [args.pdf], "ocr": lambda: args.pdfs, "batch": lambda: args.texts,
+             "valuation": lambda: [], "rom": lambda: [], "health": lambda: args.pdfs}[args.command]()
+    for path in paths:
+        if not Path(path).exists():
+            print(f"Error: No se encontró el archivo: {path}")
+            sys.exit(1)
+    if args.command == "render":
+        benchmark_render(args.pdf, args.zoom, args.pages)
+    elif args.command == "ocr":
+        benchmark_ocr(args.pdfs, args.low_zoom, args.high_zoom, args.min_confidence)
+    elif args.command == "batch":
+        benchmark_batch(args.texts, args.workers, args.repeat)
+    elif args.command == "valuation":
+        benchmark_valuation(args.cases, args.max_chapters, args.seed)
+    elif args.command == "rom":
+        benchmark_rom(args.measurements, args.seed)
+    elif args.command == "health":
+        benchmark_health(args.pdfs, args.url.rstrip("/"), args.clients, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,33 +2,184 @@
 Aplicación FastAPI principal para JurisMed AI
 Backend de análisis legal-médico con NLP basado en RD 888/2022
 """
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import Optional
+from fastapi.responses import JSONResponse, StreamingResponse
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
 import uvicorn
 
 # Importar modelos
 from app.models.schemas import (
     DocumentAnalysisResponse,
-    InconsistencyReport
+    InconsistencyReport,
+    WhatIfRequest
 )
 
 # Importar servicios
 from app.services.ocr_service import OCRService
+from app.services.nlp_process_pool import NLPProcessPool
 from app.services.nlp_service import NLPService
+from app.services.normalized_text import NormalizedDocument
 from app.services.legal_engine import LegalEngine
+from app.services.baremo_tables import configure_baremo_tables, baremo_store
+from app.services.analysis_cache import configure_analysis_cache, analysis_cache
 from app.services.report_generator import ReportGenerator
+from app.services.ocr_reader_pool import OCRReaderPool, EASYOCR_AVAILABLE
+from app.services.ocr_process_pool import OCRProcessPool
+from app.services.ocr_pages import OCRPageOptions
+from app.services.extraction_cache import ExtractionCache
+from app.services.work_executor import WorkExecutor
+from app.services.job_store import JobStore, FINISHED_STATUSES
+
+# Configuración del pool de lectores EasyOCR
+OCR_READER_POOL_SIZE = int(os.getenv("OCR_READER_POOL_SIZE", "1"))
+OCR_PREWARM = os.getenv("OCR_PREWARM", "false").lower() in ("1", "true", "yes")
+# OCR paralelo por páginas (0 = modo secuencial)
+OCR_PARALLEL_WORKERS = int(os.getenv("OCR_PARALLEL_WORKERS", "0"))
+OCR_WORKER_TORCH_THREADS = int(os.getenv("OCR_WORKER_TORCH_THREADS", "1"))
+# Renderizado/reconocimiento de cada página: escala de grises y OCR adaptativo por confianza
+OCR_PAGE_OPTIONS = OCRPageOptions(
+    grayscale=os.getenv("OCR_GRAYSCALE", "false").lower() in ("1", "true", "yes"),
+    adaptive=os.getenv("OCR_ADAPTIVE", "false").lower() in ("1", "true", "yes"),
+    low_zoom=float(os.getenv("OCR_LOW_ZOOM", "1.5")),
+    high_zoom=float(os.getenv("OCR_HIGH_ZOOM", "3")),
+    min_confidence=float(os.getenv("OCR_MIN_CONFIDENCE", "0.5"))
+)
+# Extracción de entidades por fragmentos para textos muy grandes (0 = una sola pasada)
+NLP_CHUNK_CHARS = int(os.getenv("NLP_CHUNK_CHARS", "0"))
+NLP_CHUNK_OVERLAP = int(os.getenv("NLP_CHUNK_OVERLAP", "2000"))
+NLP_PARALLEL_WORKERS = int(os.getenv("NLP_PARALLEL_WORKERS", "0"))
+# Caché de extracción por hash del documento
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+EXTRACTION_CACHE_PATH = os.getenv(
+    "EXTRACTION_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "jurismed_extraction_cache.sqlite3")
+)
+EXTRACTION_CACHE_MAX_MB = int(os.getenv("EXTRACTION_CACHE_MAX_MB", "256"))
+# Ejecutor acotado para las etapas bloqueantes del análisis y cola de admisión
+ANALYSIS_MAX_CONCURRENCY = int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "2"))
+ANALYSIS_MAX_QUEUE = int(os.getenv("ANALYSIS_MAX_QUEUE", "8"))
+ANALYSIS_RETRY_AFTER = int(os.getenv("ANALYSIS_RETRY_AFTER", "30"))
+# Tablas del baremo (RD 888/2022): fichero versionado, recargado si cambia en disco
+BAREMO_TABLES_PATH = os.getenv("BAREMO_TABLES_PATH") or None
+BAREMO_RELOAD_INTERVAL = float(os.getenv("BAREMO_RELOAD_INTERVAL", "5"))
+# Caché de análisis legales por huella de las entidades (memoria y, opcionalmente, SQLite)
+ANALYSIS_CACHE_ENTRIES = int(os.getenv("ANALYSIS_CACHE_ENTRIES", "512"))
+ANALYSIS_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH") or None
+ANALYSIS_CACHE_MAX_MB = int(os.getenv("ANALYSIS_CACHE_MAX_MB", "64"))
+# Trabajos de análisis asíncronos
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(tempfile.gettempdir(), "jurismed_jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "24"))
+JOB_EVENTS_POLL_SECONDS = 0.5
+
+# Número de página en los mensajes de progreso del OCR ("Procesando página 3/40...", "Página 3: ...")
+_PAGE_PROGRESS = re.compile(r"[Pp]ágina (\d+)(?:/(\d+))?")
+
+
+def _prewarm_ocr(reader_pool: OCRReaderPool, process_pool: Optional[OCRProcessPool]):
+    """Precarga los lectores OCR en segundo plano para no bloquear el arranque"""
+    try:
+        if process_pool is not None:
+            process_pool.warm_up()
+            print(f"[INFO] Pool de procesos OCR precargado: {process_pool.workers} proceso(s)")
+        else:
+            reader_pool.warm_up()
+            print(f"[INFO] Pool OCR precargado: {reader_pool.metrics()['created']} lector(es)")
+    except Exception as e:
+        print(f"[WARNING] No se pudo precargar el pool OCR: {e}", file=sys.stderr)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Crea los recursos compartidos por todas las peticiones"""
+    # Un fichero de tablas no válido impide arrancar (en la recarga en caliente se conserva la versión anterior)
+    configure_baremo_tables(BAREMO_TABLES_PATH, reload_interval=BAREMO_RELOAD_INTERVAL)
+    try:
+        configure_analysis_cache(
+            ANALYSIS_CACHE_ENTRIES,
+            disk_path=ANALYSIS_CACHE_PATH,
+            disk_max_bytes=ANALYSIS_CACHE_MAX_MB * 1024 * 1024
+        )
+    except Exception as e:
+        print(f"[WARNING] No se pudo abrir la caché de análisis en disco ({ANALYSIS_CACHE_PATH}): {e}", file=sys.stderr)
+        configure_analysis_cache(ANALYSIS_CACHE_ENTRIES)
+    app.state.ocr_reader_pool = OCRReaderPool(size=OCR_READER_POOL_SIZE)
+    app.state.work_executor = WorkExecutor(
+        max_concurrency=ANALYSIS_MAX_CONCURRENCY,
+        max_queue=ANALYSIS_MAX_QUEUE,
+        retry_after=ANALYSIS_RETRY_AFTER
+    )
+    app.state.ocr_process_pool = None
+    app.state.nlp_process_pool = None
+    app.state.extraction_cache = None
+    if EXTRACTION_CACHE_ENABLED:
+        try:
+            app.state.extraction_cache = ExtractionCache(
+                EXTRACTION_CACHE_PATH,
+                max_bytes=EXTRACTION_CACHE_MAX_MB * 1024 * 1024
+            )
+        except Exception as e:
+            print(f"[WARNING] No se pudo abrir la caché de extracción ({EXTRACTION_CACHE_PATH}): {e}", file=sys.stderr)
+    if OCR_PARALLEL_WORKERS > 0 and EASYOCR_AVAILABLE:
+        app.state.ocr_process_pool = OCRProcessPool(
+            workers=OCR_PARALLEL_WORKERS,
+            torch_threads=OCR_WORKER_TORCH_THREADS
+        )
+    if NLP_PARALLEL_WORKERS > 0 and NLP_CHUNK_CHARS > 0:
+        app.state.nlp_process_pool = NLPProcessPool(workers=NLP_PARALLEL_WORKERS)
+    if OCR_PREWARM and EASYOCR_AVAILABLE:
+        threading.Thread(
+            target=_prewarm_ocr,
+            args=(app.state.ocr_reader_pool, app.state.ocr_process_pool),
+            daemon=True
+        ).start()
+    
+    # Trabajos asíncronos: reanudar los que quedaron pendientes o interrumpidos por un reinicio
+    app.state.job_store = JobStore(JOBS_DB_PATH)
+    app.state.job_store.purge_finished(JOB_RETENTION_HOURS * 3600)
+    app.state.job_queue = asyncio.Queue()
+    # Trabajos que ocupan un hueco de admisión del ejecutor (se libera al terminar el trabajo)
+    app.state.admitted_jobs = set()
+    for job_id in app.state.job_store.pending_ids():
+        app.state.job_store.add_event(job_id, "[WARNING] Trabajo reanudado tras reinicio del servidor")
+        # Los reanudados se procesan aunque no quede hueco: ya estaban aceptados
+        if app.state.work_executor.try_acquire():
+            app.state.admitted_jobs.add(job_id)
+        app.state.job_queue.put_nowait(job_id)
+    job_workers = [asyncio.create_task(_job_worker()) for _ in range(max(JOB_WORKERS, 1))]
+    yield
+    for worker in job_workers:
+        worker.cancel()
+    # Primero el ejecutor (puede tener etapas de trabajos en curso) y después el almacén
+    app.state.work_executor.shutdown()
+    app.state.job_store.close()
+    if app.state.ocr_process_pool is not None:
+        app.state.ocr_process_pool.shutdown()
+    if app.state.nlp_process_pool is not None:
+        app.state.nlp_process_pool.shutdown()
+    if app.state.extraction_cache is not None:
+        app.state.extraction_cache.close()
+    analysis_cache().close()
+
 
 app = FastAPI(
     title="JurisMed AI API",
     description="API para análisis legal-médico basado en RD 888/2022",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configurar CORS
 # Permitir orígenes desde variables de entorno o valores por defecto
-import os
 # En Vercel, permitir todos los orígenes
 is_vercel = os.getenv("VERCEL") == "1"
 if is_vercel:
@@ -71,10 +222,137 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/api/metrics")
+async def metrics():
+    """Métricas de los recursos compartidos (ejecutor de análisis, pool de lectores OCR, cachés de extracción y de análisis, tablas del baremo)"""
+    extraction_cache = app.state.extraction_cache
+    return {
+        "work_executor": app.state.work_executor.metrics(),
+        "ocr_reader_pool": app.state.ocr_reader_pool.metrics(),
+        "extraction_cache": extraction_cache.metrics() if extraction_cache else None,
+        "analysis_cache": analysis_cache().metrics(),
+        "baremo": baremo_store().metrics()
+    }
+
+
+async def analysis_slot(request: Request):
+    """
+    Reserva un hueco en la cola de análisis durante la petición.
+    Si la cola está llena responde 503 con Retry-After en lugar de bloquear el servidor.
+    """
+    work_executor = request.app.state.work_executor
+    if not work_executor.try_acquire():
+        raise HTTPException(
+            status_code=503,
+            detail="El servidor está procesando demasiados documentos. Inténtelo de nuevo en unos segundos.",
+            headers={"Retry-After": str(work_executor.retry_after)}
+        )
+    try:
+        yield work_executor
+    finally:
+        work_executor.release()
+
+
+async def run_analysis_pipeline(
+    file_content: bytes,
+    filename: Optional[str],
+    content_type: Optional[str],
+    document_type: Optional[str],
+    work_executor: WorkExecutor,
+    on_log: Optional[Callable[[str], None]] = None
+) -> dict:
+    """
+    Pipeline completo OCR → NLP → motor legal, compartido por /api/analyze y los trabajos asíncronos
+    
+    Args:
+        on_log: Callback opcional que recibe cada mensaje de progreso en cuanto se produce
+    
+    Returns:
+        Datos de la respuesta (DocumentAnalysisResponse)
+    """
+    debug_logs = []
+    
+    def log(message: str):
+        debug_logs.append(message)
+        if on_log:
+            on_log(message)
+    
+    log(f"Archivo recibido: {filename}")
+    log(f"Tipo MIME: {content_type}")
+    log(f"Tamaño: {len(file_content)} bytes")
+    
+    # 1. Extraer texto usando OCRService
+    log("Iniciando extracción de texto...")
+    ocr_service = OCRService(
+        reader_pool=app.state.ocr_reader_pool,
+        process_pool=app.state.ocr_process_pool,
+        cache=app.state.extraction_cache,
+        on_log=on_log,
+        page_options=OCR_PAGE_OPTIONS
+    )
+    extracted_text = await work_executor.run(ocr_service.extract_text_sync, file_content, filename)
+    ocr_logs = ocr_service.get_logs()
+    debug_logs.extend(ocr_logs)
+    log(f"Texto extraído: {len(extracted_text)} caracteres")
+    
+    if not extracted_text or len(extracted_text.strip()) == 0:
+        raise HTTPException(
+            status_code=400, 
+            detail="No se pudo extraer texto del documento. Verifique que el archivo sea válido."
+        )
+    
+    # 2. Detectar tipo de documento y extraer entidades usando NLPService
+    log("Iniciando análisis NLP...")
+    nlp_service = NLPService(
+        process_pool=app.state.nlp_process_pool,
+        chunk_chars=NLP_CHUNK_CHARS,
+        chunk_overlap=NLP_CHUNK_OVERLAP
+    )
+    
+    # Texto normalizado una sola vez, compartido por la detección de tipo y la extracción
+    normalized = await work_executor.run(NormalizedDocument, extracted_text)
+    
+    # Detectar tipo de documento si no se proporcionó
+    if not document_type:
+        detected_type = await work_executor.run(nlp_service.detect_document_type_sync, extracted_text, normalized)
+        document_type = detected_type
+        log(f"Tipo de documento detectado: {detected_type}")
+    else:
+        log(f"Tipo de documento proporcionado: {document_type}")
+    
+    # Extraer entidades
+    entities = await work_executor.run(nlp_service.extract_entities_sync, extracted_text, document=normalized)
+    log(f"Entidades extraídas: {sum(len(v) for v in entities.values())} total")
+    
+    # 3. Análisis legal usando LegalEngine
+    log("Iniciando análisis legal...")
+    legal_engine = LegalEngine()
+    legal_analysis = await work_executor.run(legal_engine.analyze_sync, entities, document_type)
+    log("Análisis legal completado")
+    log(f"Diagnósticos detectados: {len(legal_analysis.get('detected_diagnoses', []))}")
+    if legal_analysis.get('detected_diagnoses'):
+        log(f"Lista de diagnósticos: {[d.get('text', str(d)) if isinstance(d, dict) else str(d) for d in legal_analysis.get('detected_diagnoses', [])]}")
+    
+    # Preparar respuesta
+    return {
+        "document_type": document_type or "unknown",
+        "extracted_text": extracted_text[:5000] if len(extracted_text) > 5000 else extracted_text,  # Limitar para respuesta
+        "segments": {},
+        "entities": entities,
+        "legal_analysis": legal_analysis,
+        "filename": filename,
+        "debug_logs": debug_logs,
+        "full_extracted_text": extracted_text,  # Texto completo para depuración
+        "full_extracted_text_length": len(extracted_text),
+        "downloaded_from_url": None
+    }
+
+
 @app.post("/api/analyze")
 async def analyze_document(
     file: UploadFile = File(...),
-    document_type: Optional[str] = Form(default=None)
+    document_type: Optional[str] = Form(default=None),
+    work_executor: WorkExecutor = Depends(analysis_slot)
 ):
     """
     Analiza un documento (PDF, DOC, DOCX)
@@ -89,64 +367,9 @@ async def analyze_document(
     try:
         # Leer el contenido del archivo
         file_content = await file.read()
-        debug_logs = []
-        debug_logs.append(f"Archivo recibido: {file.filename}")
-        debug_logs.append(f"Tipo MIME: {file.content_type}")
-        debug_logs.append(f"Tamaño: {len(file_content)} bytes")
-        
-        # 1. Extraer texto usando OCRService
-        debug_logs.append("Iniciando extracción de texto...")
-        ocr_service = OCRService()
-        extracted_text = await ocr_service.extract_text(file_content, file.filename)
-        ocr_logs = ocr_service.get_logs()
-        debug_logs.extend(ocr_logs)
-        debug_logs.append(f"Texto extraído: {len(extracted_text)} caracteres")
-        
-        if not extracted_text or len(extracted_text.strip()) == 0:
-            raise HTTPException(
-                status_code=400, 
-                detail="No se pudo extraer texto del documento. Verifique que el archivo sea válido."
-            )
-        
-        # 2. Detectar tipo de documento y extraer entidades usando NLPService
-        debug_logs.append("Iniciando análisis NLP...")
-        nlp_service = NLPService()
-        
-        # Detectar tipo de documento si no se proporcionó
-        if not document_type:
-            detected_type = await nlp_service.detect_document_type(extracted_text)
-            document_type = detected_type
-            debug_logs.append(f"Tipo de documento detectado: {detected_type}")
-        else:
-            debug_logs.append(f"Tipo de documento proporcionado: {document_type}")
-        
-        # Extraer entidades
-        entities = await nlp_service.extract_entities(extracted_text)
-        debug_logs.append(f"Entidades extraídas: {sum(len(v) for v in entities.values())} total")
-        
-        # 3. Análisis legal usando LegalEngine
-        debug_logs.append("Iniciando análisis legal...")
-        legal_engine = LegalEngine()
-        legal_analysis = await legal_engine.analyze(entities, document_type)
-        debug_logs.append("Análisis legal completado")
-        debug_logs.append(f"Diagnósticos detectados: {len(legal_analysis.get('detected_diagnoses', []))}")
-        if legal_analysis.get('detected_diagnoses'):
-            debug_logs.append(f"Lista de diagnósticos: {[d.get('text', str(d)) if isinstance(d, dict) else str(d) for d in legal_analysis.get('detected_diagnoses', [])]}")
-        
-        # Preparar respuesta
-        response_data = {
-            "document_type": document_type or "unknown",
-            "extracted_text": extracted_text[:5000] if len(extracted_text) > 5000 else extracted_text,  # Limitar para respuesta
-            "segments": {},
-            "entities": entities,
-            "legal_analysis": legal_analysis,
-            "filename": file.filename,
-            "debug_logs": debug_logs,
-            "full_extracted_text": extracted_text,  # Texto completo para depuración
-            "full_extracted_text_length": len(extracted_text),
-            "downloaded_from_url": None
-        }
-        
+        response_data = await run_analysis_pipeline(
+            file_content, file.filename, file.content_type, document_type, work_executor
+        )
         return JSONResponse(status_code=200, content=response_data)
         
     except HTTPException:
@@ -155,8 +378,6 @@ async def analyze_document(
         import traceback
         error_detail = f"Error al analizar el documento: {str(e)}"
         traceback_str = traceback.format_exc()
-        debug_logs.append(f"[ERROR] {error_detail}")
-        debug_logs.append(f"[ERROR] Traceback: {traceback_str}")
         # En Vercel, también loguear a stderr para que aparezca en los logs
         print(f"ERROR en /api/analyze: {error_detail}", file=sys.stderr)
         print(f"Traceback: {traceback_str}", file=sys.stderr)
@@ -166,6 +387,204 @@ async def analyze_document(
         )
 
 
+async def _run_job(job_id: str):
+    """Ejecuta un trabajo y libera su hueco de admisión al terminar"""
+    try:
+        await _run_stored_job(job_id)
+    finally:
+        if job_id in app.state.admitted_jobs:
+            app.state.admitted_jobs.discard(job_id)
+            app.state.work_executor.release()
+
+
+async def _run_stored_job(job_id: str):
+    """Ejecuta un trabajo de análisis guardado en el almacén y registra su progreso"""
+    job_store = app.state.job_store
+    # El almacén es SQLite síncrono (con un cerrojo que también toman los hilos de trabajo):
+    # sus llamadas se ejecutan en un hilo para no bloquear el bucle de eventos
+    job = await asyncio.to_thread(job_store.get, job_id, include_input=True)
+    if job is None or job["file_content"] is None:
+        return
+    
+    await asyncio.to_thread(job_store.mark_running, job_id)
+    try:
+        result = await run_analysis_pipeline(
+            job["file_content"],
+            job["filename"],
+            job["content_type"],
+            job["document_type"],
+            app.state.work_executor,
+            on_log=lambda message: job_store.add_event(job_id, message)
+        )
+        await asyncio.to_thread(job_store.complete, job_id, result)
+        await asyncio.to_thread(job_store.add_event, job_id, "[SUCCESS] Análisis completado")
+    except HTTPException as e:
+        await asyncio.to_thread(job_store.add_event, job_id, f"[ERROR] {e.detail}")
+        await asyncio.to_thread(job_store.fail, job_id, str(e.detail))
+    except Exception as e:
+        import traceback
+        print(f"ERROR en trabajo {job_id}: {str(e)}", file=sys.stderr)
+        print(f"Traceback: {traceback.format_exc()}", file=sys.stderr)
+        await asyncio.to_thread(job_store.add_event, job_id, f"[ERROR] Error al analizar el documento: {str(e)}")
+        await asyncio.to_thread(job_store.fail, job_id, f"Error al analizar el documento: {str(e)}")
+
+
+async def _job_worker():
+    """Consume la cola de trabajos de análisis"""
+    while True:
+        job_id = await app.state.job_queue.get()
+        try:
+            await _run_job(job_id)
+        finally:
+            app.state.job_queue.task_done()
+
+
+def _job_status(job: dict) -> dict:
+    """Representación pública de un trabajo"""
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "filename": job["filename"],
+        "document_type": job["document_type"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "error": job["error"],
+        "result": job["result"],
+        "status_url": f"/api/jobs/{job['id']}",
+        "events_url": f"/api/jobs/{job['id']}/events"
+    }
+
+
+@app.post("/api/jobs", status_code=202)
+async def create_job(
+    file: UploadFile = File(...),
+    document_type: Optional[str] = Form(default=None)
+):
+    """
+    Encola el análisis de un documento y devuelve inmediatamente el ID del trabajo
+    
+    Args:
+        file: Archivo a analizar
+        document_type: Tipo de documento (clinical, judicial, administrative)
+    
+    Returns:
+        Estado inicial del trabajo, con las URLs de consulta y de eventos (SSE)
+    """
+    # Misma admisión que el análisis síncrono: los trabajos en cola también ocupan hueco
+    work_executor = app.state.work_executor
+    if not work_executor.try_acquire():
+        raise HTTPException(
+            status_code=503,
+            detail="El servidor está procesando demasiados documentos. Inténtelo de nuevo en unos segundos.",
+            headers={"Retry-After": str(work_executor.retry_after)}
+        )
+    try:
+        file_content = await file.read()
+        job_store = app.state.job_store
+        job_id = await asyncio.to_thread(
+            job_store.create, file_content, file.filename, file.content_type, document_type
+        )
+    except BaseException:
+        work_executor.release()
+        raise
+    app.state.admitted_jobs.add(job_id)
+    await asyncio.to_thread(job_store.add_event, job_id, "[INFO] Trabajo en cola")
+    await app.state.job_queue.put(job_id)
+    job = await asyncio.to_thread(job_store.get, job_id)
+    return JSONResponse(status_code=202, content=_job_status(job))
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Estado de un trabajo de análisis (incluye el resultado cuando ha terminado)"""
+    job_store = app.state.job_store
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    status = _job_status(job)
+    events = await asyncio.to_thread(job_store.events, job_id)
+    status["progress"] = events[-1]["message"] if events else None
+    return status
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """
+    Flujo server-sent events con el progreso del trabajo (logs del pipeline, página a página)
+    
+    Admite la cabecera Last-Event-ID para reanudar el flujo tras una reconexión.
+    """
+    job_store = app.state.job_store
+    if await asyncio.to_thread(job_store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    
+    try:
+        last_seq = int(request.headers.get("last-event-id", "0"))
+    except ValueError:
+        last_seq = 0
+    
+    async def stream():
+        nonlocal last_seq
+        while True:
+            # Leer el estado antes que los eventos: los eventos previos a un estado final ya están guardados
+            job = await asyncio.to_thread(job_store.get, job_id)
+            events = await asyncio.to_thread(job_store.events, job_id, after=last_seq)
+            for event in events:
+                last_seq = event["seq"]
+                data = {"message": event["message"], "created_at": event["created_at"]}
+                page_match = _PAGE_PROGRESS.search(event["message"])
+                if page_match:
+                    data["page"] = int(page_match.group(1))
+                    if page_match.group(2):
+                        data["total_pages"] = int(page_match.group(2))
+                yield f"id: {last_seq}\nevent: progress\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+            if job["status"] in FINISHED_STATUSES:
+                yield f"event: {job['status']}\ndata: {json.dumps({'status': job['status'], 'error': job['error']}, ensure_ascii=False)}\n\n"
+                return
+            if await request.is_disconnected():
+                return
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/api/valuation/what-if")
+async def valuation_what_if(request: WhatIfRequest):
+    """
+    Simula la valoración final (GDA) al quitar cada deficiencia valorada o añadir cada candidata
+    
+    Args:
+        request: Valoraciones por capítulo de un análisis previo y deficiencias candidatas
+    
+    Returns:
+        GDA y clase actuales y, por escenario, el GDA resultante, su diferencia y si cambia la clase
+    """
+    legal_engine = LegalEngine()
+    result = legal_engine.what_if(
+        [deficiency.percentage for deficiency in request.chapter_valuations],
+        [deficiency.percentage for deficiency in request.candidates]
+    )
+    
+    def scenario_dict(scenario, deficiency):
+        return {**scenario._asdict(), "diagnosis": deficiency.diagnosis, "chapter": deficiency.chapter}
+    
+    return {
+        "gda_percentage": result.gda_percentage,
+        "final_class": result.final_class,
+        "removals": [
+            scenario_dict(scenario, request.chapter_valuations[scenario.index]) for scenario in result.removals
+        ],
+        "additions": [
+            scenario_dict(scenario, request.candidates[scenario.index]) for scenario in result.additions
+        ],
+        "legal_basis": "RD 888/2022, Art. 4.2 (Fórmula de combinación de deficiencias)"
+    }
+
+
 @app.post("/api/analyze/inconsistencies")
 async def analyze_inconsistencies(analyses: dict):
     """
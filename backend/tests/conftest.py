@@ -0,0 +1,5 @@
+"""Configuración común de las pruebas: el paquete `app` se importa desde backend/"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,92 @@
+"""
+La extracción por fragmentos da las mismas entidades que la de una sola pasada: mismas
+posiciones, mismo origen, los diagnósticos repetidos en el solapamiento una sola vez y en
+el mismo orden.
+"""
+import asyncio
+import random
+
+import pytest
+
+from app.services.chunked_extraction import plan_chunks
+from app.services.document_sections import index_sections
+from app.services.nlp_service import NLPService
+from app.services.normalized_text import NormalizedDocument
+
+# Páginas de una sentencia; cada coincidencia (con su contexto) queda dentro de su página
+PAGES = [
+    "HECHOS PROBADOS\n- Rotura del manguito rotador derecho\n- Lumbalgia crónica mecánica\n"
+    "El actor presenta el proceso de incapacidad con diagnóstico de Cervicalgia crónica.\n",
+    "Informe de valoración. Juicio clínico: Síndrome del túnel carpiano.\n"
+    "Flexión del hombro izquierdo: 90°. Abducción de 45°. Balance muscular: 3/5.\n"
+    "CIE-10: M75.1 y M54.5 CIE.\n",
+    "Con diagnóstico de Gonartrosis bilateral avanzada, en relación al cual se solicita revisión.\n"
+    "Tiene reconocido un grado de discapacidad del 45 %. Padece fibromialgia e hipertensión arterial.\n",
+    "Patología: Hernia discal lumbar, estenosis de canal y espondiloartrosis.\n"
+    "Extensión de la rodilla derecha 30°. Rotación: 40°. Se aprecia 20 % de pérdida.\n",
+    "Enfermedad: Trastorno de ansiedad generalizada.\n"
+    "La trabajadora refiere rotura del manguito rotador y lumbalgia crónica mecánica.\n",
+    "Sin otros antecedentes de interés. Se declara probado lo anterior.\n"
+    "Padece epicondilitis y fascitis plantar. Grado de discapacidad del 33 %.\n",
+]
+
+FIELDS = {
+    "DIAGNOSIS": ("text", "start", "end", "source"),
+    "METRIC": ("text", "start", "end", "is_proven_fact", "side", "body_part"),
+    "CODE": ("text", "start", "end"),
+    "RATING": ("text", "start", "end"),
+}
+
+
+def document(seed: int, pages: int = 24) -> str:
+    rng = random.Random(seed)
+    return "\f".join(rng.choice(PAGES) for _ in range(pages))
+
+
+def entities_key(entities):
+    return {
+        entity_type: [tuple(item.get(field) for field in fields) for item in entities[entity_type]]
+        for entity_type, fields in FIELDS.items()
+    }
+
+
+def extract(service: NLPService, text: str):
+    return asyncio.run(service.extract_entities(text))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_several_chunks_match_single_pass(seed):
+    text = document(seed)
+    chunked = NLPService(chunk_chars=1000, chunk_overlap=400)
+    assert len(plan_chunks(text, 1000, 400, index_sections(text).sections)) > 3
+
+    assert entities_key(extract(chunked, text)) == entities_key(extract(NLPService(), text))
+
+
+def test_one_chunk_matches_single_pass():
+    text = document(0)
+    chunked = NLPService(chunk_chars=len(text) + 1)
+
+    assert extract(chunked, text) == extract(NLPService(), text)
+
+
+def test_overlap_duplicates_are_kept_once_at_their_first_position():
+    # El mismo diagnóstico en todas las páginas: cada fragmento lo ve en su tramo y en el solapamiento
+    text = "\f".join([PAGES[0]] * 12)
+    chunked = extract(NLPService(chunk_chars=300, chunk_overlap=200), text)
+    single = extract(NLPService(), text)
+
+    texts = [item["text"] for item in chunked["DIAGNOSIS"]]
+    assert len(texts) == len(set(texts))
+    assert entities_key(chunked) == entities_key(single)
+    assert chunked["DIAGNOSIS"][0]["start"] == text.index("Rotura del manguito")
+
+
+def test_normalized_document_is_reused_only_for_its_text():
+    text = document(1, pages=4)
+    service = NLPService()
+
+    shared = asyncio.run(service.extract_entities(text, document=NormalizedDocument(text)))
+    other = asyncio.run(service.extract_entities(text, document=NormalizedDocument(PAGES[0])))
+
+    assert shared == extract(service, text) == other
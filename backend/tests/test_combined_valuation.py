@@ -0,0 +1,104 @@
+"""
+La valoración combinada por lotes (NumPy) da el mismo BDGP/GDA y la misma clase final que
+el cálculo escalar de LegalEngine._calculate_final_valuation, caso a caso.
+"""
+import random
+
+import numpy as np
+import pytest
+
+from app.services.baremo_tables import DEFAULT_BAREMO_PATH, load_baremo_tables
+from app.services.combined_valuation import (
+    MAX_COMBINED_PERCENTAGE, NO_CLASS, batch_valuation, combine_percentages, combine_ragged, near_rounding_tie,
+)
+from app.services.legal_engine import LegalEngine
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return LegalEngine(tables=load_baremo_tables(DEFAULT_BAREMO_PATH))
+
+
+def random_percentage(rng: random.Random) -> float:
+    """Enteros, uno o dos decimales, o valores en el borde de los rangos de clase"""
+    kind = rng.randrange(4)
+    if kind == 0:
+        return rng.randint(0, 100)
+    if kind == 1:
+        return round(rng.uniform(0, 100), 1)
+    if kind == 2:
+        return round(rng.uniform(0, 100), 2)
+    return rng.choice([4, 4.5, 5, 24, 24.5, 25, 49, 49.5, 50, 70, 70.5, 71, 99, 100])
+
+
+def random_cases(seed: int, count: int = 2000):
+    rng = random.Random(seed)
+    return [[random_percentage(rng) for _ in range(rng.choice([1, 1, 2, 2, 3, 4, 6, 9]))] for _ in range(count)]
+
+
+def scalar(engine, case):
+    return engine._calculate_final_valuation([{"percentage": p, "confidence": 0.5} for p in case])
+
+
+def assert_matches_scalar(engine, cases):
+    batch = batch_valuation(cases, engine.tables.class_ranges)
+    for index, case in enumerate(cases):
+        expected = scalar(engine, case)
+        assert batch.bdgp_percentage[index] == expected["bdgp_percentage"], case
+        assert batch.gda_percentage[index] == expected["gda_percentage"], case
+        assert batch.final_class[index] == expected["final_class"], case
+        assert batch.components_count[index] == expected["components_count"], case
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_cases_match_scalar_valuation(engine, seed):
+    assert_matches_scalar(engine, random_cases(seed))
+
+
+def test_rounding_ties_at_two_decimals_match_scalar_valuation(engine):
+    # Casos cuyo porcentaje combinado queda a medio camino entre dos centésimas
+    cases = [case for case in random_cases(100, count=20000)
+             if near_rounding_tie(combine_ragged(np.array(case, dtype=float), np.array([len(case)])))[0]]
+    assert len(cases) > 50
+    assert_matches_scalar(engine, cases)
+
+
+def test_combination_is_capped_at_99(engine):
+    cases = [[100], [99, 50], [90, 90, 90], [98.99, 0.5]]
+    batch = batch_valuation(cases, engine.tables.class_ranges)
+
+    assert batch.bdgp_percentage.tolist()[:3] == [MAX_COMBINED_PERCENTAGE] * 3
+    assert batch.bdgp_percentage[3] == round(combine_percentages([98.99, 0.5]), 2)
+    assert_matches_scalar(engine, cases)
+
+
+def test_percentages_between_class_ranges(engine):
+    # Los rangos del Anexo I son enteros: 4.5, 24.5, 49.5 y 70.5 no están en ninguno
+    cases = [[4.5], [24.5], [49.5], [70.5], [4], [5]]
+    batch = batch_valuation(cases, engine.tables.class_ranges)
+
+    assert batch.final_class.tolist() == [NO_CLASS, NO_CLASS, NO_CLASS, NO_CLASS, "0", "1"]
+    assert_matches_scalar(engine, cases)
+
+
+def test_empty_cases(engine):
+    batch = batch_valuation([[], [30], []], engine.tables.class_ranges)
+
+    # El cálculo escalar no valora un caso sin deficiencias; por lotes vale 0% (clase 0)
+    assert scalar(engine, []) is None
+    assert batch.bdgp_percentage.tolist() == [0.0, 30.0, 0.0]
+    assert batch.final_class.tolist() == ["0", "2", "0"]
+    assert batch.components_count.tolist() == [0, 1, 0]
+    assert batch_valuation([], engine.tables.class_ranges).bdgp_percentage.size == 0
+
+
+def test_combine_ragged_matches_scalar_combination():
+    cases = random_cases(7)
+    lengths = np.array([len(case) for case in cases])
+    values = np.array([p for case in cases for p in case], dtype=float)
+
+    combined = combine_ragged(values, lengths)
+
+    assert combined.tolist() == [combine_percentages(case) for case in cases]
+    with pytest.raises(ValueError):
+        combine_ragged(values, lengths + 1)
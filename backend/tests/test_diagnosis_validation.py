@@ -0,0 +1,50 @@
+"""
+La validación de diagnósticos no depende del texto normalizado: compara el candidato en
+minúsculas, con sus tildes. Estas pruebas fijan el resultado de los pares con y sin tilde.
+"""
+import pytest
+
+from app.services.nlp_service import NLPService
+
+
+@pytest.mark.parametrize("accented, unaccented", [
+    ("Tendinopatía del supraespinoso", "Tendinopatia del supraespinoso"),
+    ("Hipertensión arterial", "Hipertension arterial"),
+    ("Depresión mayor", "Depresion mayor"),
+    ("Limitación de la movilidad", "Limitacion de la movilidad"),
+])
+def test_pairs_listed_with_both_spellings_are_accepted(accented, unaccented):
+    assert NLPService.is_valid_diagnosis(accented)
+    assert NLPService.is_valid_diagnosis(unaccented)
+
+
+@pytest.mark.parametrize("accented, unaccented", [
+    ("Crónica", "Cronica"),
+    ("Ósea", "Osea"),
+])
+def test_vague_words_are_rejected_with_and_without_accents(accented, unaccented):
+    assert not NLPService.is_valid_diagnosis(accented)
+    assert not NLPService.is_valid_diagnosis(unaccented)
+
+
+@pytest.mark.parametrize("accented, unaccented", [
+    ("Síndrome del túnel carpiano", "Sindrome del tunel carpiano"),
+    ("Ciática", "Ciatica"),
+    ("Protrusión discal", "Protrusion discal"),
+    ("Lesión del hombro", "Lesion del hombro"),
+    ("Dolor en la muñeca", "Dolor en la muneca"),
+])
+def test_pairs_listed_only_with_accents_are_accent_sensitive(accented, unaccented):
+    assert NLPService.is_valid_diagnosis(accented)
+    assert not NLPService.is_valid_diagnosis(unaccented)
+
+
+def test_invalid_phrase_is_accent_sensitive():
+    # "crónica" es una frase inválida; "cronica" no está en la lista
+    assert not NLPService.is_valid_diagnosis("Cervicalgia crónica")
+    assert NLPService.is_valid_diagnosis("Cervicalgia cronica")
+
+
+@pytest.mark.parametrize("text", ["Sinovitis de rodilla", "sinovitis crónica", "Sin alteraciones"])
+def test_candidates_starting_with_sin_are_rejected(text):
+    assert not NLPService.is_valid_diagnosis(text)
@@ -0,0 +1,85 @@
+"""
+Clase por movilidad (ROM) de cada diagnóstico: solo cuentan las métricas de su articulación
+y de su lado (más las que no indican lado); las que no nombran parte del cuerpo solo se usan
+si la parte del cuerpo del diagnóstico es directamente una articulación de las tablas.
+"""
+import pytest
+
+from app.services.baremo_tables import DEFAULT_BAREMO_PATH, load_baremo_tables
+from app.services.legal_engine import LegalEngine
+
+# Confianza de una clase determinada por ROM
+ROM_CONFIDENCE = 0.8
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return LegalEngine(tables=load_baremo_tables(DEFAULT_BAREMO_PATH))
+
+
+def metric(metric_type, value, side=None, body_part=None):
+    return {"type": metric_type, "value": value, "unit": "°", "text": f"{metric_type} {value}°",
+            "side": side, "body_part": body_part}
+
+
+def classify(engine, diagnoses, metrics):
+    """Clase y confianza de cada diagnóstico (texto, parte del cuerpo), todos del capítulo 8"""
+    valuations = engine._classify_diagnoses(
+        [{"text": text, "chapter": "8", "body_part": body_part} for text, body_part in diagnoses],
+        engine._extract_metrics(metrics), engine._extract_lateral_metrics(metrics),
+        engine._group_metrics_by_joint(metrics)
+    )
+    return {valuation["diagnosis"]: (valuation["class"], valuation["confidence"]) for valuation in valuations}
+
+
+def test_left_and_right_use_their_own_side(engine):
+    result = classify(engine, [("Tendinitis del hombro derecho", "hombro"), ("Tendinitis del hombro izquierdo", "hombro")], [
+        metric("flexion", 100, "derecha", "hombro"),
+        metric("flexion", 40, "izquierda", "hombro"),
+    ])
+
+    assert result["Tendinitis del hombro derecho"] == ("2", ROM_CONFIDENCE)
+    assert result["Tendinitis del hombro izquierdo"] == ("3", ROM_CONFIDENCE)
+
+
+def test_metrics_without_side_count_for_both_sides(engine):
+    result = classify(engine, [("Tendinitis del hombro derecho", "hombro"), ("Tendinitis del hombro izquierdo", "hombro")], [
+        metric("abduccion", 100, None, "hombro"),
+        metric("flexion", 150, "derecha", "hombro"),
+        metric("flexion", 40, "izquierda", "hombro"),
+    ])
+
+    assert result["Tendinitis del hombro derecho"] == ("2", ROM_CONFIDENCE)
+    assert result["Tendinitis del hombro izquierdo"] == ("3", ROM_CONFIDENCE)
+
+
+def test_metrics_without_body_part_only_for_direct_joints(engine):
+    metrics = [metric("flexion", 40)]
+
+    result = classify(engine, [("Tendinitis del hombro", "hombro"), ("Artrosis de muñeca", "muñeca/mano")], metrics)
+
+    # "hombro" es una articulación de las tablas; "muñeca/mano" es un grupo (alias)
+    assert result["Tendinitis del hombro"] == ("3", ROM_CONFIDENCE)
+    assert result["Artrosis de muñeca"][0] == "1"
+
+
+def test_metrics_of_another_joint_are_ignored(engine):
+    result = classify(engine, [("Tendinitis del hombro", "hombro")], [metric("flexion", 40, None, "rodilla")])
+
+    assert result["Tendinitis del hombro"][1] != ROM_CONFIDENCE
+
+
+@pytest.mark.parametrize("body_part", ["mano", "muñeca"])
+def test_wrist_and_hand_share_the_wrist_thresholds(engine, body_part):
+    result = classify(engine, [("Artrosis de muñeca", "muñeca/mano")], [metric("extension", 20, None, body_part)])
+
+    assert result["Artrosis de muñeca"] == ("3", ROM_CONFIDENCE)
+
+
+def test_side_and_alias_together(engine):
+    result = classify(engine, [("Artrosis de la mano derecha", "muñeca/mano")], [
+        metric("flexion", 45, "derecha", "mano"),
+        metric("flexion", 5, "izquierda", "muñeca"),
+    ])
+
+    assert result["Artrosis de la mano derecha"] == ("2", ROM_CONFIDENCE)
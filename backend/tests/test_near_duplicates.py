@@ -0,0 +1,132 @@
+"""
+La deduplicación de diagnósticos con NearDuplicateIndex acepta y descarta exactamente los
+mismos diagnósticos que la comparación exhaustiva (O(n²)) de cada candidato con todos los
+aceptados, que es la implementación anterior de LegalEngine._deduplicate_diagnoses.
+"""
+import random
+
+import pytest
+
+from app.services.baremo_tables import DEFAULT_BAREMO_PATH, load_baremo_tables
+from app.services.legal_engine import LegalEngine
+from app.services.near_duplicates import NearDuplicateIndex, jaccard
+
+WORDS = [
+    "lumbalgia", "mecánica", "mecanica", "hernia", "protrusión", "prolapso", "discal", "disco", "lumbar",
+    "rotura", "lesión", "desgarro", "manguito", "rotador", "tendinitis", "tendinopatía", "artrosis",
+    "osteoartritis", "rodilla", "rodillas", "dilla", "gonartrosis", "hombro", "cervicalgia",
+    # Palabras de 3 caracteres o menos
+    "l5", "s1", "c5", "pie", "ojo", "mano", "tal", "x", "z",
+    # Palabras vacías (se eliminan al normalizar)
+    "de", "la", "del", "y", "crónica", "derecha", "izquierdo", "bilateral",
+]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return LegalEngine(tables=load_baremo_tables(DEFAULT_BAREMO_PATH))
+
+
+def exhaustive_deduplicate(engine, diagnoses):
+    """Implementación anterior: cada candidato contra todos los aceptados"""
+    unique = []
+    seen_normalized = []
+    for diag in sorted(diagnoses, key=lambda x: len(x.get("text", "")), reverse=True):
+        original_text = diag.get("text", "").strip()
+        if not original_text: continue
+        normalized_text = engine._normalize_text(original_text)
+        if not normalized_text: continue
+        normalized_with_synonyms = engine._normalize_with_synonyms(original_text)
+
+        is_duplicate = False
+        for seen_text in seen_normalized:
+            if normalized_text == seen_text:
+                is_duplicate = True
+                break
+            seen_normalized_with_synonyms = engine._normalize_with_synonyms(seen_text)
+            if normalized_with_synonyms == seen_normalized_with_synonyms:
+                is_duplicate = True
+                break
+            if normalized_text in seen_text or seen_text in normalized_text:
+                if len(normalized_text.split()) > 1 and len(seen_text.split()) > 1:
+                    is_duplicate = True
+                    break
+            if engine._calculate_similarity(normalized_text, seen_text) >= 0.75:
+                is_duplicate = True
+                break
+            if engine._calculate_similarity(normalized_with_synonyms, seen_normalized_with_synonyms) >= 0.75:
+                is_duplicate = True
+                break
+        if is_duplicate: continue
+
+        seen_normalized.append(normalized_text)
+        unique.append({"text": original_text, "normalized_text": normalized_text})
+    return unique
+
+
+def random_diagnoses(seed: int, count: int = 150):
+    """
+    Frases del vocabulario y trozos de ellas cortados en cualquier carácter (no solo entre
+    palabras). Algunas llevan palabras vacías delante: se ordenan por longitud del texto
+    original, así que un aceptado solo puede estar dentro de uno posterior si su texto
+    normalizado es más corto que el original.
+    """
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        if texts and rng.random() < 0.35:
+            source = rng.choice(texts)
+            start = rng.randrange(len(source))
+            text = source[start:rng.randint(start + 1, len(source))]
+        else:
+            text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 5)))
+        if rng.random() < 0.25:
+            text = " ".join(["de la"] * rng.randint(1, 4)) + " " + text
+        texts.append(text)
+    return [{"text": text, "start": index} for index, text in enumerate(texts)]
+
+
+def indexed(engine, diagnoses):
+    return [(item["text"], item["normalized_text"]) for item in engine._deduplicate_diagnoses(diagnoses)]
+
+
+def exhaustive(engine, diagnoses):
+    return [(item["text"], item["normalized_text"]) for item in exhaustive_deduplicate(engine, diagnoses)]
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_index_matches_exhaustive_comparison(engine, seed):
+    diagnoses = random_diagnoses(seed)
+
+    assert indexed(engine, diagnoses) == exhaustive(engine, diagnoses)
+
+
+@pytest.mark.parametrize("texts", [
+    # Contenido a través de una frontera de palabras ("lla rod" está dentro de "rodilla rodilla")
+    ["rodilla rodilla", "lla rod"],
+    ["hombro lumbalgia", "bro lum"],
+    # El aceptado (más largo antes de normalizar) está dentro del nuevo, también al final
+    ["de la de la de la ro lu", "hombro lumbalgia"],
+    ["de la de la x z", "l5 x z"],
+    # Textos normalizados de 3 caracteres o menos, de una y de varias palabras
+    ["l5 s1", "l5", "s1", "x y", "x l5", "pie", "ojo", "pie ojo", "c5 x"],
+    ["tal x", "a tal x", "tal", "x"],
+])
+def test_short_texts_and_containment_across_words(engine, texts):
+    diagnoses = [{"text": text} for text in texts]
+
+    assert indexed(engine, diagnoses) == exhaustive(engine, diagnoses)
+
+
+def test_containment_needs_several_words_on_both_sides():
+    index = NearDuplicateIndex()
+    index.add("rodilla rodilla", "rodilla rodilla")
+
+    assert index.is_duplicate("lla rod", "lla rod")
+    assert not index.is_duplicate("rodill", "rodill")
+    assert not index.is_duplicate("dilla", "dilla")
+
+
+def test_jaccard_of_empty_sets_is_zero():
+    assert jaccard(frozenset(), frozenset({"l5"})) == 0.0
+    assert jaccard(frozenset({"l5", "s1"}), frozenset({"l5"})) == 0.5
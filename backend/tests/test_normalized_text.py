@@ -0,0 +1,71 @@
+"""
+El mapa de posiciones de NormalizedDocument lleva cualquier tramo del texto normalizado al
+tramo del original que se normaliza en él.
+"""
+import random
+import re
+
+import pytest
+
+from app.services.normalized_text import NormalizedDocument, fold_pattern, fold_text
+
+# Letras con y sin tilde, marcas diacríticas sueltas, caracteres que se expanden y rachas de espacios
+ALPHABET = list("abcdeñáéíóúüÁÉÑ,.-") + [" ", "  ", "\n", "\t", "\f", " \n ", "é", "́", "İ"]
+
+
+def random_text(seed: int) -> str:
+    rng = random.Random(seed)
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 60)))
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_every_folded_span_maps_back_to_its_original_span(seed):
+    text = random_text(seed)
+    document = NormalizedDocument(text)
+
+    assert document.text == fold_text(text)
+    assert len(document.offsets) == len(document.text)
+    for start in range(len(document.text)):
+        for end in range(start + 1, len(document.text) + 1):
+            original_start, original_end = document.to_original(start, end)
+            assert fold_text(text[original_start:original_end]) == document.text[start:end]
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_from_original_keeps_the_characters_inside_the_original_span(seed):
+    text = random_text(seed)
+    document = NormalizedDocument(text)
+
+    for start in range(len(text) + 1):
+        for end in range(start, len(text) + 1):
+            folded_start, folded_end = document.from_original(start, end)
+            inside = [index for index, offset in enumerate(document.offsets) if start <= offset < end]
+            assert list(range(folded_start, folded_end)) == inside
+
+
+def test_match_maps_to_the_exact_original_spelling():
+    text = "Juicio clínico:  SÍNDROME   del\nTúnel carpiano derecho."
+    document = NormalizedDocument(text)
+    pattern = re.compile(fold_pattern(r"síndrome\s+del\s+túnel\s+carpiano"))
+
+    [(start, end, match)] = document.finditer(pattern)
+
+    assert text[start:end] == "SÍNDROME   del\nTúnel carpiano"
+    assert match.group() == "sindrome del tunel carpiano"
+
+
+def test_combining_marks_stay_inside_the_original_span():
+    text = "Tendinopatía crónica"
+    document = NormalizedDocument(text)
+
+    start, end = document.to_original(0, document.text.index(" "))
+
+    assert document.text == "tendinopatia cronica"
+    assert text[start:end] == "Tendinopatía"
+
+
+def test_empty_spans_and_text():
+    document = NormalizedDocument("Árbol")
+    assert document.to_original(2, 2) == (2, 2)
+    assert document.to_original(5, 5) == (5, 5)
+    assert NormalizedDocument("").to_original(0, 0) == (0, 0)
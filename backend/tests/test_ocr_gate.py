@@ -0,0 +1,89 @@
+"""
+El filtro de metadatos del OCR mide la ventana de ±100 caracteres alrededor de cada palabra
+clave de contenido en el texto original, como antes de normalizar: los espacios que el
+texto normalizado colapsa no acercan metadatos que en el documento están lejos.
+"""
+import random
+
+import pytest
+
+from app.services.normalized_text import NormalizedDocument, fold_text
+from app.services.ocr_service import OCRService
+
+FILLER = ["expediente", "texto", "n.º", "2023", "página", "del", "Junta", "solicitante"]
+
+
+@pytest.fixture(scope="module")
+def service():
+    return OCRService()
+
+
+def has_content(service, text: str) -> bool:
+    document = NormalizedDocument(text)
+    return service._has_content_outside_metadata(document, service.KEYWORD_SCANNER.scan(document.text))
+
+
+def reference_has_content(text: str) -> bool:
+    """Ventana sobre el texto sin colapsar (como `text.lower()` antes de normalizar)"""
+    folded = "".join(fold_text(char) if not char.isspace() else char for char in text)
+    for keyword in OCRService.CONTENT_KEYWORDS:
+        keyword_index = folded.find(fold_text(keyword))
+        if keyword_index < 0:
+            continue
+        context = folded[max(0, keyword_index - 100):keyword_index + len(keyword) + 100]
+        if not all(fold_text(meta_word) in context for meta_word in OCRService.METADATA_CONTEXT_KEYWORDS):
+            return True
+    return False
+
+
+METADATA = "Registro de salida. Localizador ABC. Fecha registro 01/02/2023. Sello"
+
+
+def test_metadata_next_to_keyword_is_not_content(service):
+    assert not has_content(service, f"Resolución {METADATA}")
+
+
+def test_collapsed_whitespace_does_not_bring_metadata_closer(service):
+    # 150 saltos de línea: en el original el sello está a más de 100 caracteres
+    text = f"Resolución {METADATA[:-5]}" + "\n" * 150 + "Sello"
+
+    assert has_content(service, text)
+    assert NormalizedDocument(text).text.endswith("2023. sello")
+
+
+@pytest.mark.parametrize("gap, expected", [(100 - len(" Sello"), False), (101 - len(" Sello"), True)])
+def test_window_bounds_in_original_offsets(service, gap, expected):
+    # Metadatos delante y "sello" terminando justo en el límite de la ventana (o un carácter después)
+    text = f"{METADATA[:-5]}Resolución" + " " * gap + " Sello"
+
+    assert has_content(service, text) == expected
+    assert reference_has_content(text) == expected
+
+
+@pytest.mark.parametrize("gap, expected", [(100 - len(" Sello"), False), (101 - len(" Sello"), True)])
+def test_decomposed_accents_are_measured_in_the_original(service, gap, expected):
+    # "Resolución" con la tilde como marca combinante: un carácter más en el original que en el normalizado
+    keyword = "Resolucio\u0301n"
+    text = f"{METADATA[:-5]}{keyword}" + "." * gap + " Sello"
+
+    assert len(NormalizedDocument(text).text) == len(text) - 1
+    assert has_content(service, text) == expected
+
+
+def random_text(rng: random.Random) -> str:
+    tokens = (
+        rng.sample(OCRService.CONTENT_KEYWORDS, rng.randint(0, 2))
+        + rng.sample(OCRService.METADATA_CONTEXT_KEYWORDS, rng.randint(0, 4))
+        + [rng.choice(FILLER) for _ in range(rng.randint(0, 30))]
+    )
+    rng.shuffle(tokens)
+    separators = [rng.choice([" ", " ", "\n", " " * rng.randint(2, 80), "\n\n\t "]) for _ in tokens]
+    return "".join(separator + token for separator, token in zip(separators, tokens))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_window_on_uncollapsed_text(service, seed):
+    rng = random.Random(seed)
+    for _ in range(100):
+        text = random_text(rng)
+        assert has_content(service, text) == reference_has_content(text), text
@@ -0,0 +1,78 @@
+"""
+El renderizado de páginas a arrays NumPy da arrays uint8 contiguos con la forma que espera
+EasyOCR, con los mismos píxeles que el renderizado anterior a través de PNG.
+"""
+import gc
+from types import SimpleNamespace
+
+import fitz  # PyMuPDF
+import numpy as np
+import pytest
+
+from app.services.ocr_pages import PixmapArray, pixmap_to_array, render_page_array, render_page_array_png
+
+
+@pytest.fixture(scope="module")
+def page():
+    document = fitz.open()
+    # Ancho impar: con 3 canales las filas no son múltiplo de 4 bytes
+    page = document.new_page(width=201, height=97)
+    page.insert_text((20, 50), "Informe médico: lumbalgia crónica", fontsize=11)
+    page.draw_rect(fitz.Rect(10, 60, 120, 80), color=(1, 0, 0), fill=(0, 0, 1))
+    yield page
+    document.close()
+
+
+@pytest.mark.parametrize("zoom", [1, 1.5, 3])
+def test_rgb_render_is_contiguous_and_matches_png(page, zoom):
+    array = render_page_array(page, zoom=zoom)
+
+    expected = render_page_array_png(page, zoom=zoom)
+    assert array.shape == expected.shape
+    assert array.shape[2] == 3
+    assert array.dtype == np.uint8
+    assert array.flags.c_contiguous
+    assert np.array_equal(array, expected)
+
+
+@pytest.mark.parametrize("zoom", [1, 1.5, 3])
+def test_grayscale_render_is_contiguous_2d(page, zoom):
+    array = render_page_array(page, zoom=zoom, grayscale=True)
+
+    rgb = render_page_array(page, zoom=zoom)
+    assert array.shape == rgb.shape[:2]
+    assert array.dtype == np.uint8
+    assert array.flags.c_contiguous
+
+
+def test_clip_render_is_contiguous(page):
+    pix = page.get_pixmap(matrix=fitz.Matrix(3, 3), clip=fitz.Rect(13.3, 41.7, 77.9, 63.1),
+                          colorspace=fitz.csRGB, alpha=False)
+
+    array = pixmap_to_array(pix)
+    assert array.shape == (pix.height, pix.width, 3)
+    assert array.flags.c_contiguous
+
+
+def test_array_keeps_the_pixmap_alive(page):
+    array = render_page_array(page, zoom=2)
+    expected = array.copy()
+    gc.collect()
+
+    assert isinstance(array, PixmapArray)
+    assert np.array_equal(array[10:, 5:], expected[10:, 5:])
+
+
+@pytest.mark.parametrize("n", [1, 3])
+def test_padded_rows_are_copied_to_a_contiguous_array(n):
+    height, width, padding = 4, 5, 3
+    stride = width * n + padding
+    samples = np.arange(height * stride, dtype=np.uint8)
+    pix = SimpleNamespace(samples_mv=memoryview(samples.tobytes()), width=width, height=height, n=n, stride=stride)
+
+    array = pixmap_to_array(pix)
+
+    expected = samples.reshape(height, stride)[:, :width * n].reshape(height, width, n)
+    assert array.flags.c_contiguous
+    assert array.dtype == np.uint8
+    assert np.array_equal(array, expected[:, :, 0] if n == 1 else expected)
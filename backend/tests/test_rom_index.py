@@ -0,0 +1,56 @@
+"""Índice de umbrales de movilidad: lateralidad, alias de articulaciones y clase por bisección"""
+import pytest
+
+from app.services.baremo_tables import DEFAULT_BAREMO_PATH, load_baremo_tables
+from app.services.rom_index import NO_ROM_CLASS, side_of
+
+
+@pytest.fixture(scope="module")
+def rom_index():
+    return load_baremo_tables(DEFAULT_BAREMO_PATH).rom_index
+
+
+@pytest.mark.parametrize("text, side", [
+    ("tendinitis del hombro derecho", "derecha"),
+    ("gonartrosis de rodilla izquierda", "izquierda"),
+    ("flexión de ambos hombros", None),
+    ("hombro derecho e izquierdo", None),
+    ("gonartrosis bilateral", None),
+    ("artrosis de muñeca", None),
+])
+def test_side_of(text, side):
+    assert side_of(text) == side
+
+
+@pytest.mark.parametrize("body_part, joint", [
+    ("muñeca", "muñeca"),
+    ("mano", "muñeca"),
+    ("muñeca/mano", "muñeca"),
+    ("pie", "tobillo"),
+    ("tobillo/pie", "tobillo"),
+    ("hombro", "hombro"),
+    ("columna", None),
+    (None, None),
+])
+def test_joint_of_resolves_aliases(rom_index, body_part, joint):
+    assert rom_index.joint_of(body_part) == joint
+
+
+def test_only_reviewed_joints_have_thresholds(rom_index):
+    assert set(rom_index.joints) == {"hombro", "codo", "muñeca", "cadera", "rodilla", "tobillo"}
+    assert rom_index.movement_of("hombro", "abduccion") == "flexion_abduccion"
+    assert rom_index.movement_of("cadera", "extension") is None
+    assert rom_index.movement_of("columna", "flexion") is None
+
+
+def test_class_of_range_bounds(rom_index):
+    assert rom_index.class_of("hombro", "flexion_abduccion", 121) == 1
+    assert rom_index.class_of("hombro", "flexion_abduccion", 120) == 2
+    assert rom_index.class_of("hombro", "flexion_abduccion", 30) == 4
+    assert rom_index.class_of("hombro", "flexion_abduccion", 180) == NO_ROM_CLASS
+
+
+def test_classify_joint_uses_worst_value_of_each_movement(rom_index):
+    assert rom_index.classify_joint("hombro", {"flexion": 150, "abduccion": 50}) == 3
+    assert rom_index.classify_joint("hombro", {"rodilla": 10}) == NO_ROM_CLASS
+    assert rom_index.classify_joint("columna", {"flexion": 10}) is None
@@ -0,0 +1,117 @@
+"""
+Los patrones "ancla … cola" sin retroceso cuadrático dan las mismas coincidencias que los
+tramos perezosos originales, también cuando el tramo cruza un encabezado de sección.
+"""
+import random
+import re
+
+import pytest
+
+from app.services.nlp_service import NLPService
+from app.services.span_patterns import LazySpanPattern
+
+FLAGS = re.IGNORECASE | re.MULTILINE
+
+# Patrones de NLPService antes de acotar los tramos perezosos, en el mismo orden
+OLD_DIAGNOSIS_PATTERNS = [re.compile(pattern, FLAGS) for pattern in [
+    r"(?:diagnóstico|diagnostico|juicio clínico|orientación diagnóstica)[\s:]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,]{5,100})(?:[\.;:\n]|$)",
+    r"(?:patología|patologia|enfermedad)[\s:]+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,]{5,100})(?:[\.;:\n]|$)",
+    r"(?:conclusiones|consideraciones médico-legales)[\s:](?:.|\n)*?presenta\s+([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,]{5,100})(?:[\.;:\n]|$)",
+    r"(?:hechos\s+probados|cuadro\s+clínico|presenta\s+el\s+siguiente)[\s:](?:.|\n)*?[-•]\s*([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,150})(?:[\.;:\n]|$)",
+    r"(?:SEXTO|SÉPTIMO|OCTAVO|NOVENO|DÉCIMO)[\.-]+\s*(?:.|\n)*?[-•]\s*([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,150})(?:[\.;:\n]|$)",
+    r"^[-•]\s*([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,150})(?:[\.;:\n]|$)",
+    r"(?:hechos\s+probados|hecho\s+probado)[\s:](?:.|\n){0,500}?(?:diagnóstico|diagnostico|con\s+diagnóstico|con\s+diagnostico)[\s:]+(?:de\s+)?([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,100})(?:[\.;,\n]|$)",
+    r"(?:incapacidad|enfermedad|proceso)[\s:]+(?:.|\n){0,200}?(?:diagnóstico|diagnostico|con\s+diagnóstico|con\s+diagnostico)[\s:]+(?:de\s+)?([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,100})(?:[\.;,\n]|$)",
+]]
+OLD_HECHOS_NARRATIVO_PATTERNS = [re.compile(pattern, FLAGS) for pattern in [
+    r"(?:con\s+diagnóstico|diagnóstico|diagnostico)[\s:]+(?:de\s+)?([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,100})(?:[\.;,\n]|$)",
+    r"(?:proceso|enfermedad|incapacidad)[\s:]+(?:.|\n){0,100}?(?:con\s+diagnóstico|diagnóstico|diagnostico)[\s:]+(?:de\s+)?([A-ZÁÉÍÓÚÑ][a-záéíóúñ\s,()0-9]{5,100})(?:[\.;,\n]|$)",
+]]
+
+PATTERN_PAIRS = (
+    list(zip(OLD_DIAGNOSIS_PATTERNS, NLPService.DIAGNOSIS_PATTERNS))
+    + list(zip(OLD_HECHOS_NARRATIVO_PATTERNS, NLPService.HECHOS_NARRATIVO_PATTERNS))
+)
+
+FIXTURES = [
+    # Diagnóstico en la primera línea bajo el encabezado: la viñeta está en otra sección
+    "HECHOS PROBADOS.-\nTendinitis del supraespinoso\n\nFUNDAMENTOS DE DERECHO\n- Lumbalgia crónica mecánica.\n",
+    # Hecho numerado en prosa: el tramo llega hasta la siguiente viñeta, en otra sección
+    "SEXTO.- El actor presenta Insuficiencia venosa crónica.\nFALLO\nSe estima.\n• Gonartrosis bilateral avanzada\n",
+    # Conclusiones … presenta, con un encabezado de sección en medio
+    "CONCLUSIONES: sin cambios.\nJUICIO CLÍNICO\nHECHOS PROBADOS\nEl paciente presenta Cervicalgia crónica.\n",
+    # Sin más viñetas en el documento: el ancla "SEXTO.- " retrocede a "SEXTO." y la cola es "- X"
+    "SEXTO.- Diabetes mellitus tipo dos.\n",
+    "SÉPTIMO.-- Lumbociatalgia derecha\nsin más",
+    "OCTAVO.-\n-\tEspondiloartrosis lumbar\n",
+    # Separación máxima de los tramos con límite (500, 200 y 100 caracteres)
+    *("HECHOS PROBADOS: " + "x" * gap + " diagnóstico: Fibromialgia severa.\n" for gap in (498, 499, 500, 501)),
+    *("Incapacidad: " + "y" * gap + " con diagnóstico de Síndrome del túnel carpiano\n" for gap in (198, 199, 200, 201)),
+    *("proceso " + "z" * gap + " diagnóstico: Hernia discal lumbar;" for gap in (98, 99, 100, 101)),
+    # Anclas sin cola y anclas repetidas antes de la cola
+    "hechos probados: nada relevante. cuadro clínico: tampoco. conclusiones: ninguna.",
+    "hechos probados: hechos probados: - Artrosis de rodilla izquierda\n- Gonartrosis",
+    "presenta el siguiente cuadro clínico: • Síndrome del hombro doloroso\n• Bursitis",
+    "",
+]
+
+HEADS = [
+    "HECHOS PROBADOS", "HECHOS PROBADOS.-\n", "hecho probado: ", "FUNDAMENTOS DE DERECHO\n", "\nFALLO\n",
+    "CONCLUSIONES: ", "consideraciones médico-legales: ", "JUICIO CLÍNICO\n", "cuadro clínico: ", "SEXTO.- ",
+    "SÉPTIMO.-", "NOVENO. ", "presenta el siguiente ", "incapacidad: ", "proceso ", "enfermedad: ",
+]
+PIECES = [
+    "presenta ", "diagnóstico: ", "con diagnóstico de ", "diagnostico ", "- ", "• ", "\n- ", "-", "\n",
+    "\n\n", " ", ": ", ". ", "el actor ", "según el informe ", "sin cambios ", "y ", "(2019) ",
+]
+DIAGNOSES = [
+    "Lumbalgia crónica", "Gonartrosis bilateral", "Síndrome del túnel carpiano", "Tendinitis del supraespinoso",
+    "Fibromialgia", "Trastorno depresivo mayor", "Artrosis de rodilla", "hernia discal lumbar", "Epicondilitis",
+]
+
+
+def random_document(seed: int) -> str:
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(rng.randint(1, 40)):
+        kind = rng.random()
+        if kind < 0.25:
+            parts.append(rng.choice(HEADS))
+        elif kind < 0.6:
+            parts.append(rng.choice(PIECES))
+        elif kind < 0.9:
+            parts.append(rng.choice(DIAGNOSES) + rng.choice(["", ".", ";", ",", "\n", "  "]))
+        else:
+            parts.append("ruido " * rng.randint(1, 40))
+    return "".join(parts)
+
+
+def matches(pattern, text):
+    return [(match.start(), match.end(), match.start(1), match.end(1), match.group(1))
+            for match in pattern.finditer(text)]
+
+
+@pytest.mark.parametrize("text", FIXTURES)
+def test_span_patterns_match_old_lazy_patterns_on_fixtures(text):
+    for old, new in PATTERN_PAIRS:
+        assert matches(new, text) == matches(old, text), old.pattern
+
+
+def test_span_patterns_match_old_lazy_patterns_on_random_documents():
+    for seed in range(1500):
+        text = random_document(seed)
+        for old, new in PATTERN_PAIRS:
+            assert matches(new, text) == matches(old, text), (seed, old.pattern)
+
+
+def test_span_pattern_crosses_section_headers():
+    text = "SEXTO.- El actor presenta dolor.\n\nFUNDAMENTOS DE DERECHO\n\nFALLO\n- Lumbalgia crónica\n"
+    pattern = NLPService.DIAGNOSIS_PATTERNS[4]
+    assert isinstance(pattern, LazySpanPattern)
+    assert [match.group(1).strip() for match in pattern.finditer(text)] == ["Lumbalgia crónica"]
+
+
+def test_span_pattern_max_gap_is_inclusive():
+    pattern = LazySpanPattern(r"ancla", r"(cola)", r"cola", max_gap=3)
+    assert [match.start(1) for match in pattern.finditer("ancla123cola")] == [8]
+    assert list(pattern.finditer("ancla1234cola")) == []
@@ -0,0 +1,141 @@
+"""
+Los escenarios "qué pasaría si" (quitar una deficiencia o añadir una candidata) dan el mismo
+GDA y la misma clase que recombinar la lista completa de porcentajes.
+"""
+import math
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.baremo_tables import DEFAULT_BAREMO_PATH, load_baremo_tables
+from app.services.combined_valuation import (
+    MAX_COMBINED_PERCENTAGE, NO_CLASS, combine_percentages, what_if_valuation,
+)
+
+
+@pytest.fixture(scope="module")
+def class_ranges():
+    return load_baremo_tables(DEFAULT_BAREMO_PATH).class_ranges
+
+
+def recombined(percentages, class_ranges):
+    gda = min(round(combine_percentages(percentages), 2), MAX_COMBINED_PERCENTAGE)
+    return gda, class_ranges.class_of(gda)
+
+
+def random_percentage(rng: random.Random) -> float:
+    kind = rng.randrange(3)
+    if kind == 0:
+        return rng.randint(0, 100)
+    if kind == 1:
+        return round(rng.uniform(0, 100), rng.choice([1, 2]))
+    return rng.choice([0, 4.5, 24.5, 49.5, 70.5, 99, 100])
+
+
+def assert_scenario(scenario, percentages, current, class_ranges):
+    gda, final_class = recombined(percentages, class_ranges)
+    assert scenario.gda_percentage == gda
+    assert scenario.final_class == final_class
+    assert scenario.gda_change == round(gda - current.gda_percentage, 2)
+    assert scenario.class_changed == (final_class != current.final_class)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_scenarios_match_full_recombination(seed, class_ranges):
+    rng = random.Random(seed)
+    for _ in range(300):
+        percentages = [random_percentage(rng) for _ in range(rng.randint(1, 8))]
+        candidates = [random_percentage(rng) for _ in range(rng.randint(0, 4))]
+        result = what_if_valuation(percentages, candidates, class_ranges)
+
+        assert (result.gda_percentage, result.final_class) == recombined(percentages, class_ranges)
+        assert [scenario.index for scenario in result.removals] == list(range(len(percentages)))
+        for index, scenario in enumerate(result.removals):
+            assert (scenario.action, scenario.percentage) == ("remove", percentages[index])
+            assert_scenario(scenario, percentages[:index] + percentages[index + 1:], result, class_ranges)
+        assert [scenario.index for scenario in result.additions] == list(range(len(candidates)))
+        for index, scenario in enumerate(result.additions):
+            assert (scenario.action, scenario.percentage) == ("add", candidates[index])
+            assert_scenario(scenario, percentages + [candidates[index]], result, class_ranges)
+
+
+def test_leaving_out_the_only_deficiency_gives_no_valuation(class_ranges):
+    result = what_if_valuation([30], [], class_ranges)
+
+    (removal,) = result.removals
+    assert (removal.gda_percentage, removal.final_class) == (0, NO_CLASS)
+    assert removal.gda_change == -30
+    assert removal.class_changed
+
+
+def test_empty_percentages(class_ranges):
+    result = what_if_valuation([], [12.5, 60], class_ranges)
+
+    assert (result.gda_percentage, result.final_class) == (0, NO_CLASS)
+    assert result.removals == []
+    assert [(s.gda_percentage, s.final_class, s.gda_change) for s in result.additions] == [
+        (12.5, "1", 12.5), (60, "3", 60),
+    ]
+    assert what_if_valuation([], [], class_ranges) == (0, NO_CLASS, [], [])
+
+
+def test_additions_are_capped(class_ranges):
+    result = what_if_valuation([95], [90, 100], class_ranges)
+
+    assert [s.gda_percentage for s in result.additions] == [MAX_COMBINED_PERCENTAGE] * 2
+
+
+@pytest.mark.parametrize("percentages, candidates", [
+    ([30], [-0.01]),
+    ([30], [100.01]),
+    ([30], [math.nan]),
+    ([-5, 30], []),
+    ([30, 150], [10]),
+])
+def test_percentages_outside_0_100_are_rejected(percentages, candidates, class_ranges):
+    with pytest.raises(ValueError):
+        what_if_valuation(percentages, candidates, class_ranges)
+
+
+def test_bounds_are_valid(class_ranges):
+    result = what_if_valuation([0, 100], [0, 100], class_ranges)
+
+    assert result.gda_percentage == MAX_COMBINED_PERCENTAGE
+    assert [s.gda_percentage for s in result.removals] == [MAX_COMBINED_PERCENTAGE, 0]
+
+
+@pytest.fixture(scope="module")
+def client():
+    import main
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("field, percentage", [
+    ("chapter_valuations", -1),
+    ("chapter_valuations", 100.5),
+    ("candidates", 101),
+    ("candidates", -0.5),
+])
+def test_request_outside_0_100_is_rejected(client, field, percentage):
+    body = {"chapter_valuations": [{"percentage": 30}], "candidates": [{"percentage": 10}]}
+    body[field].append({"percentage": percentage})
+
+    response = client.post("/api/valuation/what-if", json=body)
+
+    assert response.status_code == 422
+
+
+def test_request_matches_full_recombination(client, class_ranges):
+    body = {
+        "chapter_valuations": [{"diagnosis": "Lumbalgia", "chapter": "15", "percentage": 30},
+                               {"percentage": 20}],
+        "candidates": [{"diagnosis": "Gonartrosis", "percentage": 10}],
+    }
+
+    data = client.post("/api/valuation/what-if", json=body).json()
+
+    assert (data["gda_percentage"], data["final_class"]) == recombined([30, 20], class_ranges)
+    assert [r["gda_percentage"] for r in data["removals"]] == [20, 30]
+    assert data["removals"][0]["diagnosis"] == "Lumbalgia"
+    assert data["additions"][0]["gda_percentage"] == recombined([30, 20, 10], class_ranges)[0]
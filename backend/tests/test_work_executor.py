@@ -0,0 +1,34 @@
+"""Las etapas del ejecutor son funciones síncronas que se llaman directamente en un hilo trabajador"""
+import asyncio
+import threading
+
+import pytest
+
+from app.services.work_executor import WorkExecutor
+
+
+def test_runs_sync_stage_in_worker_thread():
+    executor = WorkExecutor(max_concurrency=1)
+    try:
+        def stage(value, offset=0):
+            return value + offset, threading.current_thread().name
+
+        result, thread_name = asyncio.run(executor.run(stage, 40, offset=2))
+
+        assert result == 42
+        assert thread_name.startswith("analysis")
+        assert executor.metrics()["running"] == 0
+    finally:
+        executor.shutdown()
+
+
+def test_rejects_coroutine_functions():
+    executor = WorkExecutor(max_concurrency=1)
+    try:
+        async def stage():
+            return 1
+
+        with pytest.raises(TypeError):
+            asyncio.run(executor.run(stage))
+    finally:
+        executor.shutdown()